@@ -0,0 +1,182 @@
+"""Times CursorConverterLogic.run_conversion on synthetic themes.
+
+Runs fully offline and without a GUI. Results are saved as JSON so runs can
+be compared, e.g.:
+
+    python -m benchmarks.bench_pipeline -o before.json
+    python -m benchmarks.bench_pipeline -o after.json --compare before.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cc_logic.archive import archive_path, available_formats
+from cc_logic.backends import BACKENDS
+from cc_logic.cache import ConversionCache
+from cc_logic.main_logic import CursorConverterLogic
+
+from .synthetic import generate_theme
+
+PROFILES = {
+    'small': dict(sizes=(32, 48), frames=4, aliases=5),
+    'default': dict(sizes=(32, 48, 64, 128), frames=8, aliases=20),
+    'large': dict(sizes=(64, 128, 256), frames=24, aliases=70),
+}
+
+SCENARIOS = ('cold', 'warm-cache', 'incremental-noop', 'incremental-one-cursor')
+
+
+def run_once(source_dir, dest_dir, map_file, cache_dir, args, incremental=False):
+    """Runs one conversion and returns its total and per-stage durations in seconds."""
+    logic = CursorConverterLogic()
+    logic.cache = ConversionCache(cache_dir)
+    result = []
+    logic.finished.connect(result.append)
+    if args.verbose:
+        logic.status_update.connect(print)
+    logic.set_conversion_parameters(str(source_dir), str(dest_dir), str(map_file), args.zip, False, 
+                                    max_workers=args.jobs, backend=args.backend, incremental=incremental, 
+                                    archive_format=args.archive_format, compression_level=args.compression_level, 
+                                    compression_workers=args.compression_jobs)
+    start = time.perf_counter()
+    logic.run_conversion()
+    total = time.perf_counter() - start
+    if not (result and result[0]):
+        raise RuntimeError(f"Conversion of {source_dir} failed; rerun with --verbose for details.")
+
+    stages = {}
+    for event in logic.tracer.events:
+        if event['category'] == 'stage':
+            stages[event['name']] = stages.get(event['name'], 0.0) + event['duration']
+    run = {'total': total, 'stages': stages}
+    if args.zip:
+        run['archive_bytes'] = archive_path(dest_dir, args.archive_format).stat().st_size
+    return run
+
+
+def run_scenario(profile, scenario, work_dir, args):
+    params = PROFILES[profile]
+    source_dir = work_dir / 'source' / profile
+    map_file = work_dir / 'source' / f"{profile}.map.json"
+    if not source_dir.exists():
+        generate_theme(source_dir, **params)
+
+    runs = []
+    for i in range(args.repeat):
+        run_dir = work_dir / 'runs' / f"{profile}-{scenario}-{i}"
+        dest_dir = run_dir / 'theme'
+        cache_dir = run_dir / 'cache'
+        if scenario == 'cold':
+            runs.append(run_once(source_dir, dest_dir, map_file, cache_dir, args))
+        elif scenario == 'warm-cache':
+            run_once(source_dir, run_dir / 'prime', map_file, cache_dir, args)
+            runs.append(run_once(source_dir, dest_dir, map_file, cache_dir, args))
+        else:
+            # Work on a private copy so edits never leak into other scenarios.
+            run_source = run_dir / 'source'
+            shutil.copytree(source_dir, run_source)
+            run_once(run_source, dest_dir, map_file, cache_dir, args, incremental=True)
+            if scenario == 'incremental-one-cursor':
+                # A different seed keeps the size but changes the hash of one cursor.
+                generate_theme(run_dir / 'edited', **params, seed=i + 1)
+                (run_source / 'Text.cur').write_bytes((run_dir / 'edited' / 'Text.cur').read_bytes())
+            runs.append(run_once(run_source, dest_dir, map_file, cache_dir, args, incremental=True))
+
+    stage_names = sorted({name for run in runs for name in run['stages']})
+    result = {
+        'profile': profile,
+        'scenario': scenario,
+        'params': {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()},
+        'runs': runs,
+        'median_total': statistics.median(run['total'] for run in runs),
+        'median_stages': {name: statistics.median(run['stages'].get(name, 0.0) for run in runs) 
+                          for name in stage_names},
+    }
+    if args.zip:
+        result['archive_bytes'] = runs[-1]['archive_bytes']
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Prints median deltas against a baseline. Returns True if any exceed threshold percent."""
+    previous = {(r['profile'], r['scenario']): r for r in baseline['results']}
+    regressed = False
+    print(f"{'profile':<10} {'scenario':<24} {'baseline':>10} {'current':>10} {'delta':>8}")
+    for result in results:
+        key = (result['profile'], result['scenario'])
+        if key not in previous:
+            continue
+        before, after = previous[key]['median_total'], result['median_total']
+        delta = 100.0 * (after - before) / before if before else 0.0
+        flag = ''
+        if threshold is not None and delta > threshold:
+            regressed = True
+            flag = '  REGRESSION'
+        print(f"{key[0]:<10} {key[1]:<24} {before:>9.3f}s {after:>9.3f}s {delta:>+7.1f}%{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the cursor conversion pipeline on synthetic themes.')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='Where to write the JSON results.')
+    parser.add_argument('-p', '--profile', action='append', choices=sorted(PROFILES), 
+                        help='Theme profile to run (repeatable, default: all).')
+    parser.add_argument('-s', '--scenario', action='append', choices=SCENARIOS, 
+                        help='Scenario to run (repeatable, default: all).')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs per scenario (default: 3).')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Conversion workers (default: CPU count).')
+    # The win2xcur backends may need ImageMagick or a network install, so they are only used when asked for.
+    parser.add_argument('--backend', choices=BACKENDS, default='native', 
+                        help='Conversion backend (default: native, which runs offline).')
+    parser.add_argument('--zip', action='store_true', help='Include the archive stage and record archive sizes.')
+    parser.add_argument('--archive-format', choices=available_formats(), default='zip', help='Archive format.')
+    parser.add_argument('--compression-level', type=int, default=None, help='Archive compression level.')
+    parser.add_argument('--compression-jobs', type=int, default=1, help='Archive compression threads.')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare against an earlier results file.')
+    parser.add_argument('--fail-threshold', type=float, metavar='PCT', 
+                        help='With --compare, exit with status 1 if a median slows down by more than PCT percent.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print conversion status messages.')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='ccpy-bench-') as tmp:
+        work_dir = Path(tmp)
+        for profile in args.profile or sorted(PROFILES):
+            for scenario in args.scenario or SCENARIOS:
+                result = run_scenario(profile, scenario, work_dir, args)
+                results.append(result)
+                print(f"{profile:<10} {scenario:<24} {result['median_total']:.3f}s", flush=True)
+
+    document = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'jobs': args.jobs,
+            'repeat': args.repeat,
+            'zip': args.zip,
+            'archive_format': args.archive_format if args.zip else None,
+            'compression_level': args.compression_level,
+            'compression_jobs': args.compression_jobs,
+        },
+        'results': results,
+    }
+    Path(args.output).write_text(json.dumps(document, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.fail_threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
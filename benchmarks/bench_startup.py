@@ -0,0 +1,116 @@
+"""Times cold startup of the GUI up to its first painted frame.
+
+Each run launches a fresh process with CCPY_STARTUP_BENCHMARK set, which
+makes the app report when its window was first painted and when deferred
+startup work finished, then quit. Without a display, Qt's offscreen
+platform is used. Packaged builds can be timed with --command, e.g.:
+
+    python -m benchmarks.bench_startup -o source.json
+    python -m benchmarks.bench_startup --command dist/ccpy/ccpy -o onedir.json --compare source.json
+"""
+import argparse
+import json
+import os
+import platform
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from cc_ui import STARTUP_BENCHMARK_ENV
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_once(command, env, timeout):
+    """Launches the app once and returns its first-paint, ready and exit times in seconds."""
+    start = time.monotonic()
+    process = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=timeout)
+    end = time.monotonic()
+    marks = {}
+    for line in process.stdout.splitlines():
+        name, _, value = line.partition(' ')
+        if name in ('first-paint', 'ready'):
+            # time.monotonic() is system-wide on Linux, so the child's marks compare with start.
+            marks[name] = float(value) - start
+    if process.returncode != 0 or 'first-paint' not in marks:
+        raise RuntimeError(f"{shlex.join(command)} exited with status {process.returncode} "
+                           f"without reporting its first paint:\n{process.stderr}")
+    return {'first_paint': marks['first-paint'], 'ready': marks['ready'], 'exit': end - start}
+
+
+def compare(result, baseline, threshold):
+    """Prints median deltas against a baseline. Returns True if any exceed threshold percent."""
+    regressed = False
+    print(f"{'metric':<12} {'baseline':>10} {'current':>10} {'delta':>8}")
+    for metric, after in result['median'].items():
+        before = baseline['result']['median'].get(metric)
+        if not before:
+            continue
+        delta = 100.0 * (after - before) / before
+        flag = ''
+        if threshold is not None and delta > threshold:
+            regressed = True
+            flag = '  REGRESSION'
+        print(f"{metric:<12} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms {delta:>+7.1f}%{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the time from launching the GUI to its first paint.')
+    parser.add_argument('-o', '--output', default='startup_results.json', help='Where to write the JSON results.')
+    parser.add_argument('-r', '--repeat', type=int, default=10, help='Launches to time (default: 10).')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='Untimed launches first, so every timed run finds files in the page cache (default: 1).')
+    parser.add_argument('--command', help='Command that starts the app (default: this Python running cc_ui.py).')
+    parser.add_argument('--platform', help='Qt platform plugin (default: offscreen when there is no display).')
+    parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for one launch (default: 60).')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare against an earlier results file.')
+    parser.add_argument('--fail-threshold', type=float, metavar='PCT',
+                        help='With --compare, exit with status 1 if a median slows down by more than PCT percent.')
+    args = parser.parse_args(argv)
+
+    command = shlex.split(args.command) if args.command else [sys.executable, str(REPO_DIR / 'cc_ui.py')]
+    env = dict(os.environ, **{STARTUP_BENCHMARK_ENV: '1'})
+    if args.platform:
+        env['QT_QPA_PLATFORM'] = args.platform
+    elif not (env.get('DISPLAY') or env.get('WAYLAND_DISPLAY')):
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    for _ in range(args.warmup):
+        run_once(command, env, args.timeout)
+    runs = [run_once(command, env, args.timeout) for _ in range(args.repeat)]
+    result = {
+        'command': command,
+        'runs': runs,
+        'median': {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]},
+        'min': {metric: min(run[metric] for run in runs) for metric in runs[0]},
+    }
+    for metric in runs[0]:
+        print(f"{metric:<12} median {result['median'][metric] * 1000:.1f}ms  min {result['min'][metric] * 1000:.1f}ms")
+
+    document = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt_platform': env.get('QT_QPA_PLATFORM'),
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+        },
+        'result': result,
+    }
+    Path(args.output).write_text(json.dumps(document, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(result, baseline, args.fail_threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
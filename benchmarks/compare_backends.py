@@ -0,0 +1,98 @@
+"""Checks the native backend against win2xcur on a corpus of cursor files.
+
+Every .cur/.ani file under the corpus directory (or a synthetic corpus when
+none is given) is converted by both backends. Outputs are compared byte for
+byte and, when the bytes differ, pixel for pixel. Needs win2xcur with a
+working ImageMagick installation.
+
+    python -m benchmarks.compare_backends path/to/themes
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cc_logic.backends import InProcessBackend, NativeBackend
+from cc_logic.xcursor import read_xcursor
+
+from .synthetic import generate_theme
+
+
+def compare_outputs(native, reference):
+    """Returns None if both Xcursor files hold the same images, else a description."""
+    native_images = read_xcursor(native)
+    reference_images = read_xcursor(reference)
+    if len(native_images) != len(reference_images):
+        return f"{len(native_images)} images, expected {len(reference_images)}"
+    for i, (a, b) in enumerate(zip(native_images, reference_images)):
+        for key in ('nominal', 'hotspot', 'delay'):
+            if a[key] != b[key]:
+                return f"image {i}: {key} {a[key]!r}, expected {b[key]!r}"
+        if a['pixels'].shape != b['pixels'].shape:
+            return f"image {i}: size {a['pixels'].shape[:2]}, expected {b['pixels'].shape[:2]}"
+        diff = np.abs(a['pixels'].astype(np.int16) - b['pixels'].astype(np.int16)).max()
+        if diff:
+            return f"image {i}: pixel values differ by up to {diff}"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the native backend with win2xcur.')
+    parser.add_argument('corpus', nargs='?', help='Directory searched recursively for .cur/.ani files.')
+    args = parser.parse_args(argv)
+
+    if not InProcessBackend.is_available():
+        print("Error: win2xcur (with Wand and ImageMagick) is required as the reference.", file=sys.stderr)
+        return 2
+
+    native = NativeBackend()
+    reference = InProcessBackend()
+    with tempfile.TemporaryDirectory(prefix='ccpy-compare-') as tmp:
+        tmp = Path(tmp)
+        corpus = Path(args.corpus) if args.corpus else tmp / 'synthetic'
+        if not args.corpus:
+            generate_theme(corpus, sizes=(32, 48, 64, 128, 256), frames=6, aliases=1)
+        files = sorted(p for p in corpus.rglob('*') if p.suffix.lower() in ('.cur', '.ani'))
+
+        identical = matching = 0
+        failures = []
+        times = {'native': 0.0, 'win2xcur': 0.0}
+        for path in files:
+            outputs = {}
+            for label, backend in (('native', native), ('win2xcur', reference)):
+                output = tmp / f"{label}.out"
+                start = time.perf_counter()
+                try:
+                    backend.convert(path, output)
+                except Exception as e:
+                    outputs[label] = e
+                else:
+                    outputs[label] = output.read_bytes()
+                times[label] += time.perf_counter() - start
+
+            if isinstance(outputs['win2xcur'], Exception):
+                print(f"SKIP {path}: win2xcur failed: {outputs['win2xcur']}")
+                continue
+            if isinstance(outputs['native'], Exception):
+                failures.append((path, f"native backend failed: {outputs['native']}"))
+            elif outputs['native'] == outputs['win2xcur']:
+                identical += 1
+            else:
+                problem = compare_outputs(outputs['native'], outputs['win2xcur'])
+                if problem is None:
+                    matching += 1
+                else:
+                    failures.append((path, problem))
+
+    for path, problem in failures:
+        print(f"FAIL {path}: {problem}")
+    print(f"{len(files)} file(s): {identical} byte-identical, {matching} pixel-identical, {len(failures)} different.")
+    print(f"native {times['native']:.3f}s, win2xcur {times['win2xcur']:.3f}s")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Generates reproducible synthetic Windows cursor themes for benchmarking."""
+import json
+import random
+import struct
+from pathlib import Path
+
+from cc_logic.conversion import CursorConverter
+
+ICON_DIR = struct.Struct('<HHH')
+ICON_DIR_ENTRY = struct.Struct('<BBBBHHII')
+BITMAP_INFO_HEADER = struct.Struct('<IiiHHIIiiII')
+RIFF_HEADER = struct.Struct('<4sI4s')
+CHUNK_HEADER = struct.Struct('<4sI')
+ANIH_HEADER = struct.Struct('<IIIIIIIII')
+
+ANIMATED = ('Busy', 'Working')
+
+
+def _bitmap(size, rng):
+    """Returns a 32-bit BGRA DIB (bottom-up) with its AND mask for a size x size image."""
+    header = BITMAP_INFO_HEADER.pack(BITMAP_INFO_HEADER.size, size, size * 2, 1, 32, 0, 0, 0, 0, 0, 0)
+    pixels = bytearray()
+    band = max(size // 8, 1)
+    for y in range(size):
+        if y % band == 0:
+            color = bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        for x in range(size):
+            # Opaque disc in the middle, transparent corners, so alpha handling is exercised.
+            inside = (x - size / 2) ** 2 + (y - size / 2) ** 2 < (size / 2.2) ** 2
+            pixels += color + (b'\xff' if inside else b'\x00')
+    mask_row = ((size + 31) // 32) * 4
+    mask = bytes(mask_row * size)
+    return header + bytes(pixels) + mask
+
+
+def make_cur(sizes, seed=0, hotspot=(0, 0)):
+    """Builds a .cur file containing one 32-bit image per size."""
+    rng = random.Random(seed)
+    images = [_bitmap(size, rng) for size in sizes]
+    offset = ICON_DIR.size + ICON_DIR_ENTRY.size * len(images)
+    entries = []
+    for size, image in zip(sizes, images):
+        dim = 0 if size >= 256 else size
+        entries.append(ICON_DIR_ENTRY.pack(dim, dim, 0, 0, hotspot[0], hotspot[1], len(image), offset))
+        offset += len(image)
+    return ICON_DIR.pack(0, 2, len(images)) + b''.join(entries) + b''.join(images)
+
+
+def _chunk(name, data):
+    padding = b'\0' if len(data) % 2 else b''
+    return CHUNK_HEADER.pack(name, len(data)) + data + padding
+
+
+def make_ani(size, frames, seed=0, rate=6, repeat=1):
+    """Builds a .ani file with frames icon frames, each repeated repeat times in a row."""
+    icons = [make_cur([size], seed=seed * 1000 + i) for i in range(frames)]
+    icons = [icon for icon in icons for _ in range(repeat)]
+    anih = ANIH_HEADER.pack(ANIH_HEADER.size, len(icons), len(icons), 0, 0, 0, 0, rate, 0x1)
+    frame_list = b'fram' + b''.join(_chunk(b'icon', icon) for icon in icons)
+    body = b'ACON' + _chunk(b'anih', anih) + _chunk(b'LIST', frame_list)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def generate_theme(dest_dir, sizes=(32, 48, 64, 128, 256), frames=8, aliases=20, repeat=1, seed=0):
+    """Writes a synthetic theme covering CursorConverter.FILES plus a matching cursor map.
+
+    Static cursors cycle through sizes, animated cursors use frames frames and
+    every map entry gets aliases alias names. Returns the cursor map path.
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    cursor_map = {}
+    for index, name in enumerate(CursorConverter.FILES):
+        size = sizes[index % len(sizes)]
+        if name in ANIMATED:
+            (dest_dir / f"{name}.ani").write_bytes(make_ani(size, frames, seed=seed + index, repeat=repeat))
+        else:
+            (dest_dir / f"{name}.cur").write_bytes(make_cur([size], seed=seed + index, hotspot=(size // 4, size // 4)))
+        cursor_map[name] = ' '.join(f"{name.lower()}-{i}" for i in range(aliases))
+
+    map_file = dest_dir.parent / f"{dest_dir.name}.map.json"
+    map_file.write_text(json.dumps(cursor_map, indent=2))
+    return map_file
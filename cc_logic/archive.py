@@ -0,0 +1,258 @@
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import posixpath
+import stat
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ARCHIVE_FORMATS = ('zip', 'tar.gz', 'tar.xz', 'tar.zst')
+
+# (minimum, default, maximum) compression level of each format.
+COMPRESSION_LEVELS = {
+    'zip': (0, 6, 9),
+    'tar.gz': (0, 6, 9),
+    'tar.xz': (0, 6, 9),
+    'tar.zst': (1, 3, 22),
+}
+
+
+def _zstd_module():
+    """Returns the zstandard module, or None if it is not installed."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_formats():
+    """Returns the archive formats that can be written in this environment."""
+    return tuple(f for f in ARCHIVE_FORMATS if f != 'tar.zst' or _zstd_module() is not None)
+
+
+def archive_path(dest_dir, archive_format):
+    """Returns the archive written next to the theme built in dest_dir."""
+    dest_dir = Path(dest_dir)
+    return dest_dir.parent / f"{dest_dir.name}.{archive_format}"
+
+
+def _zip_date_time(mtime):
+    """Converts mtime for a zip entry, clamping it to 1980 as ZipFile.write does."""
+    return max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0))
+
+
+class _BlockCompressor:
+    """Write-only stream that compresses fixed-size blocks on a thread pool.
+
+    Every block becomes a complete gzip member or xz stream. Concatenated
+    members are valid .gz and .xz files, so the output decompresses with
+    the standard tools. zlib and lzma release the GIL while compressing.
+    """
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, raw, compress, workers):
+        self.raw = raw
+        self.compress = compress
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = workers * 2
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.BLOCK_SIZE:
+            self._submit(bytes(self.buffer[:self.BLOCK_SIZE]))
+            del self.buffer[:self.BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, block):
+        self.pending.append(self.pool.submit(self.compress, block))
+        while len(self.pending) > self.max_pending:
+            self.raw.write(self.pending.popleft().result())
+
+    def close(self):
+        try:
+            if self.buffer or not self.pending:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self.raw.write(self.pending.popleft().result())
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+
+class ThemeArchive:
+    """Streams theme files into a zip or compressed tar archive.
+
+    Files are compressed as they are added; nothing is staged on disk besides
+    the archive itself, which is written under a temporary name and renamed
+    into place on success. A file whose content was already added is stored
+    as a symbolic link entry pointing at the first copy, and symbolic links
+    in the theme are stored as link entries.
+
+    workers > 1 compresses tar.gz and tar.xz archives in independent blocks
+    on a thread pool and tar.zst archives with zstd's own threads. Zip
+    members are always compressed serially.
+    """
+
+    def __init__(self, path, archive_format='zip', level=None, workers=1):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}'")
+        if archive_format not in available_formats():
+            raise ValueError(f"Archive format '{archive_format}' needs the zstandard package")
+        minimum, default, maximum = COMPRESSION_LEVELS[archive_format]
+        if level is None:
+            level = default
+        if not minimum <= level <= maximum:
+            raise ValueError(f"Compression level for {archive_format} must be between {minimum} and {maximum}")
+
+        self.path = Path(path)
+        self.archive_format = archive_format
+        self.level = level
+        self.workers = max(1, workers or 1)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+        # Names of the entries added so far.
+        self.members = set()
+        self._part_path = self.path.with_name(f"{self.path.name}.part")
+        self._first_member = {}
+        self._directories = set()
+        self._raw = None
+        self._stream = None
+        self._archive = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(discard=exc_type is not None)
+
+    def open(self):
+        self._raw = open(self._part_path, 'wb')
+        try:
+            if self.archive_format == 'zip':
+                self._archive = zipfile.ZipFile(self._raw, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.level)
+            else:
+                self._stream = self._open_compressor()
+                self._archive = tarfile.open(fileobj=self._stream, mode='w|', format=tarfile.PAX_FORMAT)
+        except Exception:
+            self._raw.close()
+            self._part_path.unlink(missing_ok=True)
+            raise
+
+    def _open_compressor(self):
+        if self.archive_format == 'tar.zst':
+            zstandard = _zstd_module()
+            compressor = zstandard.ZstdCompressor(level=self.level, threads=self.workers if self.workers > 1 else 0)
+            return compressor.stream_writer(self._raw, closefd=False)
+        if self.archive_format == 'tar.gz':
+            if self.workers > 1:
+                return _BlockCompressor(self._raw, lambda block: gzip.compress(block, self.level, mtime=0),
+                                        self.workers)
+            return gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=self.level, mtime=0)
+        if self.workers > 1:
+            return _BlockCompressor(self._raw, lambda block: lzma.compress(block, preset=self.level), self.workers)
+        return lzma.LZMAFile(self._raw, 'wb', preset=self.level)
+
+    def close(self, discard=False):
+        """Finishes the archive and moves it into place.
+
+        The partial archive is deleted instead if discard is set or finishing it fails.
+        """
+        finished = False
+        try:
+            try:
+                if self._archive is not None:
+                    self._archive.close()
+                if self._stream is not None:
+                    self._stream.close()
+            finally:
+                self._archive = self._stream = None
+                if self._raw is not None:
+                    self._raw.close()
+                    self._raw = None
+            if not discard:
+                os.replace(self._part_path, self.path)
+                finished = True
+        finally:
+            if not finished:
+                self._part_path.unlink(missing_ok=True)
+        if finished:
+            self.bytes_written = self.path.stat().st_size
+
+    def _add_parents(self, arcname, mtime):
+        """Adds tar directory entries for the parents of arcname."""
+        parent = posixpath.dirname(arcname)
+        if not parent or parent in self._directories or self.archive_format == 'zip':
+            return
+        self._add_parents(parent, mtime)
+        self._directories.add(parent)
+        info = tarfile.TarInfo(parent)
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o755
+        info.mtime = mtime
+        self._archive.addfile(info)
+
+    def add_symlink(self, arcname, target, mtime=None):
+        """Adds a symbolic link entry."""
+        mtime = time.time() if mtime is None else mtime
+        self.members.add(arcname)
+        if self.archive_format == 'zip':
+            # Info-ZIP convention: the mode lives in the high bits of
+            # external_attr and the member data is the link target.
+            info = zipfile.ZipInfo(arcname, _zip_date_time(mtime))
+            info.create_system = 3
+            info.external_attr = (stat.S_IFLNK | 0o777) << 16
+            self._archive.writestr(info, target)
+            return
+        self._add_parents(arcname, mtime)
+        info = tarfile.TarInfo(arcname)
+        info.type = tarfile.SYMTYPE
+        info.linkname = target
+        info.mode = 0o777
+        info.mtime = mtime
+        self._archive.addfile(info)
+
+    def add_bytes(self, arcname, data, mtime=None, mode=0o644):
+        """Adds a regular file, or a link entry if identical content was already added."""
+        mtime = time.time() if mtime is None else mtime
+        self.bytes_read += len(data)
+        self.members.add(arcname)
+        digest = hashlib.sha256(data).digest()
+        first = self._first_member.get(digest)
+        if first is not None:
+            self.duplicates += 1
+            self.duplicate_bytes += len(data)
+            self.add_symlink(arcname, posixpath.relpath(first, posixpath.dirname(arcname) or '.'), mtime)
+            return
+        self._first_member[digest] = arcname
+
+        if self.archive_format == 'zip':
+            info = zipfile.ZipInfo(arcname, _zip_date_time(mtime))
+            info.external_attr = (stat.S_IFREG | mode) << 16
+            self._archive.writestr(info, data, zipfile.ZIP_DEFLATED, self.level)
+            return
+        self._add_parents(arcname, mtime)
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mode = mode
+        info.mtime = mtime
+        self._archive.addfile(info, io.BytesIO(data))
+
+    def add_path(self, path, arcname):
+        """Adds a file or symbolic link from disk."""
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode):
+            self.add_symlink(arcname, os.readlink(path), st.st_mtime)
+        else:
+            self.add_bytes(arcname, Path(path).read_bytes(), st.st_mtime, stat.S_IMODE(st.st_mode))
@@ -0,0 +1,135 @@
+import importlib.metadata
+import subprocess
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+
+class ConversionError(Exception):
+    """Raised when a backend fails to convert a cursor file."""
+
+
+class ConversionCancelled(Exception):
+    """Raised when a conversion is stopped by a cancel request."""
+
+
+class SubprocessBackend:
+    """Converts each cursor by running the win2xcur executable from the venv."""
+    name = 'subprocess'
+
+    def __init__(self, win2xcur_path, version='unknown'):
+        self.win2xcur_path = win2xcur_path
+        self.version = version
+        self.options = {}
+        # Running win2xcur processes by output file, so a cancel can kill them.
+        self._processes = {}
+        self._lock = threading.Lock()
+
+    def convert(self, input_file, output_file):
+        """Converts input_file into the Xcursor file output_file."""
+        # win2xcur names its output after the input file, so run it in a
+        # private directory and move the result into place.
+        with tempfile.TemporaryDirectory(dir=output_file.parent) as tmp_dir:
+            process = subprocess.Popen([self.win2xcur_path, str(input_file), '-o', tmp_dir], 
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            with self._lock:
+                self._processes[output_file] = process
+            try:
+                _, stderr = process.communicate()
+            finally:
+                with self._lock:
+                    self._processes.pop(output_file, None)
+            if process.returncode != 0:
+                raise ConversionError(stderr.decode(errors='replace').strip() 
+                                      or f"win2xcur exited with status {process.returncode}")
+
+            produced = Path(tmp_dir) / input_file.stem
+            if not produced.exists():
+                raise ConversionError(f"win2xcur produced no output for {input_file.name}")
+            shutil.move(str(produced), str(output_file))
+
+    def kill(self, output_files):
+        """Kills the win2xcur processes that are writing any of output_files."""
+        with self._lock:
+            processes = [self._processes[f] for f in output_files if f in self._processes]
+        for process in processes:
+            process.kill()
+
+
+class InProcessBackend:
+    """Converts cursors with the win2xcur library loaded once in this process."""
+    name = 'inprocess'
+
+    def __init__(self):
+        # Importing pulls in Wand/ImageMagick and NumPy, so do it only once.
+        from win2xcur.parser import open_blob
+        from win2xcur.writer import to_x11
+        self._open_blob = open_blob
+        self._to_x11 = to_x11
+        try:
+            self.version = importlib.metadata.version('win2xcur')
+        except importlib.metadata.PackageNotFoundError:
+            self.version = 'unknown'
+        self.options = {}
+
+    @staticmethod
+    def is_available():
+        """Returns True if win2xcur and its native dependencies can be imported."""
+        try:
+            import win2xcur.parser
+            import win2xcur.writer
+        except ImportError:
+            return False
+        return True
+
+    def convert(self, input_file, output_file):
+        """Converts input_file into the Xcursor file output_file."""
+        try:
+            cursor = self._open_blob(input_file.read_bytes())
+            result = self._to_x11(cursor.frames)
+        except Exception as e:
+            raise ConversionError(str(e)) from e
+        output_file.write_bytes(result)
+
+
+class NativeBackend:
+    """Converts cursors with the NumPy decoder and Xcursor writer in cc_logic.xcursor.
+
+    Needs neither Wand nor ImageMagick. Files using features the native
+    decoder does not support are handed to the optional fallback backend.
+    """
+    name = 'native'
+
+    def __init__(self, fallback=None):
+        from . import xcursor
+        self._xcursor = xcursor
+        self.version = xcursor.NATIVE_VERSION
+        self.options = {}
+        self.fallback = fallback
+
+    @staticmethod
+    def is_available():
+        """Returns True if NumPy can be imported."""
+        try:
+            import numpy
+        except ImportError:
+            return False
+        return True
+
+    def convert(self, input_file, output_file):
+        """Converts input_file into the Xcursor file output_file."""
+        try:
+            cursor = self._xcursor.open_cursor(input_file.read_bytes())
+            result = self._xcursor.write_xcursor(cursor.frames())
+        except self._xcursor.CursorFormatError as e:
+            if self.fallback is None:
+                raise ConversionError(str(e)) from e
+            self.fallback.convert(input_file, output_file)
+            return
+        except Exception as e:
+            raise ConversionError(str(e)) from e
+        output_file.write_bytes(result)
+
+
+BACKENDS = ('auto', NativeBackend.name, InProcessBackend.name, SubprocessBackend.name)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+
+def default_cache_dir():
+    """Returns the per-user directory used for cached conversion results."""
+    base = os.environ.get('XDG_CACHE_HOME') or (Path.home() / '.cache')
+    return Path(base) / 'ccpy' / 'xcursor'
+
+
+class ConversionCache:
+    """Content-addressed on-disk store of converted Xcursor files.
+
+    Entries are keyed by the SHA-256 of the source cursor bytes together with
+    the backend name, converter version and options. Each hit refreshes the
+    entry's mtime, which is used for least-recently-used eviction.
+    """
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, blob, backend, extra=None):
+        """Returns the cache key for converting blob with backend.
+
+        extra holds additional options that change the output, such as a
+        resampled size.
+        """
+        digest = hashlib.sha256(blob)
+        options = json.dumps(dict(getattr(backend, 'options', {}), **(extra or {})), sort_keys=True)
+        digest.update(f"\0{backend.name}\0{backend.version}\0{options}".encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def fetch(self, key, output_file):
+        """Copies a cached entry to output_file. Returns False on a miss."""
+        entry = self._entry_path(key)
+        try:
+            shutil.copyfile(entry, output_file)
+            os.utime(entry)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None on a miss.
+
+        Used for partial results such as extra sizes, so lookups are not
+        counted in hits and misses, which count converted cursors.
+        """
+        entry = self._entry_path(key)
+        try:
+            data = entry.read_bytes()
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key, data):
+        """Stores bytes under key."""
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, entry)
+        except OSError:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def store(self, key, output_file):
+        """Adds a freshly converted output_file to the cache."""
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary name first so concurrent readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=entry.parent, prefix='.tmp-')
+        os.close(fd)
+        try:
+            shutil.copyfile(output_file, tmp_path)
+            os.replace(tmp_path, entry)
+        except OSError:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_size."""
+        if not self.cache_dir.exists():
+            return 0
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob('*/*'):
+            if path.name.startswith('.tmp-'):
+                continue
+            st = path.stat()
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """Deletes every cached entry."""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
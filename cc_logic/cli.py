@@ -0,0 +1,183 @@
+"""Headless batch converter: converts every theme folder in a directory."""
+import argparse
+import importlib.resources
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from .archive import ARCHIVE_FORMATS, COMPRESSION_LEVELS, available_formats
+from .backends import BACKENDS
+from .cache import ConversionCache
+from .main_logic import CursorConverterLogic
+from .theme_builder import ThemeBuilder
+from .utilities import destination_conflict
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+# Shipped as package data, so it is found in installed copies too.
+DEFAULT_MAP_FILE = Path(str(importlib.resources.files(__package__) / 'cursor_map.json'))
+
+
+def find_themes(input_dir):
+    """Returns the sub-directories of input_dir that contain .cur or .ani files."""
+    themes = []
+    for entry in sorted(Path(input_dir).iterdir()):
+        if entry.is_dir() and any(p.suffix.lower() in ('.cur', '.ani') for p in entry.iterdir()):
+            themes.append(entry)
+    return themes
+
+
+def parse_sizes(value):
+    """Parses a comma separated list of positive cursor sizes."""
+    try:
+        sizes = tuple(sorted({int(part) for part in value.split(',') if part.strip()}))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size list: {value!r}")
+    if any(size < 1 or size > 512 for size in sizes):
+        raise argparse.ArgumentTypeError("sizes must be between 1 and 512")
+    return sizes
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='colorcursor-converter-batch',
+        description='Convert a directory of Windows cursor themes to Linux Xcursor themes without a GUI.')
+    parser.add_argument('input_dir', help='Directory containing one sub-directory per Windows theme.')
+    parser.add_argument('-o', '--output', required=True, help='Directory that receives the converted themes.')
+    parser.add_argument('-m', '--map', default=str(DEFAULT_MAP_FILE), help='Cursor map JSON file.')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Size of the shared conversion worker pool (default: CPU count).')
+    parser.add_argument('--zip', action='store_true', help='Archive each converted theme (see --archive-format).')
+    parser.add_argument('--archive-format', choices=ARCHIVE_FORMATS, default='zip', 
+                        help='Archive format used with --zip (tar.zst needs the zstandard package).')
+    parser.add_argument('--compression-level', type=int, metavar='N', 
+                        help='Compression level (0-9, or 1-22 for tar.zst; default: format default).')
+    parser.add_argument('--compression-jobs', type=int, default=1, metavar='N', 
+                        help='Threads used to compress each tar archive (default: 1).')
+    parser.add_argument('--install', action='store_true', help='Install each converted theme into ~/.icons.')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Conversion backend.')
+    parser.add_argument('--link-strategy', choices=ThemeBuilder.LINK_STRATEGIES, default='symlink',
+                        help='How cursor aliases are written.')
+    parser.add_argument('--sizes', type=parse_sizes, default=(), metavar='N[,N...]', 
+                        help='Extra nominal sizes to include in every cursor, e.g. 24,32,48,64,96.')
+    parser.add_argument('--keep-duplicate-frames', action='store_true', 
+                        help='Do not merge repeated frames of animated cursors.')
+    parser.add_argument('--incremental', action='store_true', help='Only rebuild outputs whose inputs changed.')
+    parser.add_argument('--restart', action='store_true', 
+                        help='Ignore checkpoints of interrupted runs instead of resuming them.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the conversion cache.')
+    parser.add_argument('--clear-cache', action='store_true', help='Clear the conversion cache before converting.')
+    parser.add_argument('--refresh-environment', action='store_true',
+                        help='Re-check Python, pip and win2xcur instead of trusting the environment stamp.')
+    parser.add_argument('--trace', metavar='DIR', 
+                        help='Write a timing trace for each theme to DIR/<theme>.trace.json.')
+    parser.add_argument('--trace-format', choices=('chrome', 'json'), default='chrome', 
+                        help='Trace file format (default: Chrome trace events).')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every status message.')
+    return parser
+
+
+def convert_theme(theme_dir, args, executor, log):
+    """Converts one theme and returns (success, seconds)."""
+    logic = CursorConverterLogic()
+    result = []
+    logic.finished.connect(result.append)
+    if args.verbose:
+        logic.status_update.connect(lambda message: log(f"[{theme_dir.name}] {message}"))
+
+    logic.set_conversion_parameters(str(theme_dir), str(Path(args.output) / theme_dir.name), args.map, 
+                                    args.zip, args.install, backend=args.backend, use_cache=not args.no_cache, 
+                                    link_strategy=args.link_strategy, incremental=args.incremental, 
+                                    refresh_environment=args.refresh_environment, executor=executor, 
+                                    sizes=args.sizes, dedupe_frames=not args.keep_duplicate_frames, 
+                                    archive_format=args.archive_format, compression_level=args.compression_level, 
+                                    compression_workers=args.compression_jobs, resume=not args.restart)
+    if args.trace:
+        logic.trace_path = str(Path(args.trace) / f"{theme_dir.name}.trace.json")
+        logic.trace_format = args.trace_format
+    start = time.perf_counter()
+    logic.run_conversion()
+    return bool(result and result[0]), time.perf_counter() - start
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        print(f"Error: Input directory does not exist: {input_dir}", file=sys.stderr)
+        return EXIT_USAGE
+    if not Path(args.map).is_file():
+        print(f"Error: Cursor map file does not exist: {args.map}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.jobs < 1:
+        print("Error: --jobs must be at least 1.", file=sys.stderr)
+        return EXIT_USAGE
+    if args.compression_jobs < 1:
+        print("Error: --compression-jobs must be at least 1.", file=sys.stderr)
+        return EXIT_USAGE
+    if args.zip and args.archive_format not in available_formats():
+        print(f"Error: Archive format {args.archive_format} needs the zstandard package.", file=sys.stderr)
+        return EXIT_USAGE
+    if args.compression_level is not None:
+        minimum, _, maximum = COMPRESSION_LEVELS[args.archive_format]
+        if not minimum <= args.compression_level <= maximum:
+            print(f"Error: --compression-level for {args.archive_format} must be between {minimum} and {maximum}.", 
+                  file=sys.stderr)
+            return EXIT_USAGE
+    output_res = Path(args.output).resolve()
+    if output_res == input_dir.resolve() or input_dir.resolve() in output_res.parents:
+        print("Error: The output directory cannot be inside the input directory.", file=sys.stderr)
+        return EXIT_USAGE
+
+    themes = find_themes(input_dir)
+    if not themes:
+        print(f"Error: No cursor themes found in {input_dir}", file=sys.stderr)
+        return EXIT_USAGE
+    # Each theme's output directory is deleted and rebuilt, so it must not hold any input.
+    for theme in themes:
+        conflict = destination_conflict(input_dir, Path(args.output) / theme.name)
+        if conflict:
+            print(f"Error: {theme.name}: {conflict}", file=sys.stderr)
+            return EXIT_USAGE
+
+    if args.trace:
+        Path(args.trace).mkdir(parents=True, exist_ok=True)
+
+    if args.clear_cache:
+        ConversionCache().clear()
+
+    def log(message):
+        print(message, flush=True)
+
+    log(f"Converting {len(themes)} theme(s) with {args.jobs} worker(s)...")
+    start = time.perf_counter()
+    failures = []
+    # Themes are driven from their own threads; every cursor conversion runs on the shared pool.
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor, \
+            ThreadPoolExecutor(max_workers=min(args.jobs, len(themes))) as theme_pool:
+        futures = {theme_pool.submit(convert_theme, theme, args, executor, log): theme for theme in themes}
+        for future in as_completed(futures):
+            theme = futures[future]
+            try:
+                success, seconds = future.result()
+            except Exception as e:
+                success, seconds = False, 0.0
+                log(f"[{theme.name}] {e}")
+            log(f"{'OK  ' if success else 'FAIL'} {theme.name} ({seconds:.2f}s)")
+            if not success:
+                failures.append(theme.name)
+
+    log(f"Converted {len(themes) - len(failures)}/{len(themes)} theme(s) in {time.perf_counter() - start:.2f}s.")
+    if failures:
+        log(f"Failed: {', '.join(sorted(failures))}")
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
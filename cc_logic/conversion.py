@@ -1,8 +1,40 @@
-import subprocess
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from .backends import ConversionCancelled, ConversionError
+
+class SourceIndex:
+    """Case-insensitive index of a source directory, built with a single scandir pass."""
+
+    EXTENSIONS = ('.cur', '.ani')
+
+    def __init__(self, source_dir):
+        self.source_dir = Path(source_dir)
+        self._files = {}
+        with os.scandir(self.source_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    self._files.setdefault(entry.name.lower(), []).append(entry.name)
+
+    def find(self, name):
+        """Returns the source file for a cursor name (.cur preferred over .ani), or None."""
+        for extension in self.EXTENSIONS:
+            candidates = self._files.get(f"{name}{extension}".lower())
+            if candidates:
+                exact = f"{name}{extension}"
+                return self.source_dir / (exact if exact in candidates else sorted(candidates)[0])
+        return None
+
+    def missing(self, names):
+        """Returns the names that have neither a .cur nor an .ani file."""
+        return [name for name in names if self.find(name) is None]
+
+
 class CursorConverter(QObject):
     status_update = pyqtSignal(str)
     
@@ -12,43 +44,239 @@ class CursorConverter(QObject):
         "Precision", "Text", "Unavailable", "Vertical", "Working"
     ]
     
-    def __init__(self, win2xcur_path, parent=None):
+    def __init__(self, backend, max_workers=None, cache=None, executor=None, parent=None):
         super().__init__(parent)
-        self.win2xcur_path = win2xcur_path
+        self.backend = backend
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # A shared executor lets several converters (e.g. batch jobs) use one pool.
+        self.executor = executor
+        self.tracer = None
+        self.source_index = None
+        # Extra nominal sizes resampled into every Xcursor file.
+        self.sizes = ()
+        self.dedupe_frames = False
+        self._cancelled = threading.Event()
+        self._futures = ()
+        self._outputs = ()
+
+    @property
+    def signature(self):
+        """Identifies everything about the converter that affects its output."""
+        options = json.dumps(getattr(self.backend, 'options', {}), sort_keys=True)
+        signature = f"{self.backend.name}:{self.backend.version}:{options}"
+        if self.sizes:
+            signature += f":sizes={','.join(map(str, sorted(self.sizes)))}"
+        if self.dedupe_frames:
+            signature += ":dedupe"
+        return signature
+
+    def index_source_dir(self, source_dir):
+        """Returns the SourceIndex for source_dir, scanning it only once."""
+        if self.source_index is None or self.source_index.source_dir != Path(source_dir):
+            self.source_index = SourceIndex(source_dir)
+        return self.source_index
 
     def check_source_files(self, source_dir):
         """Checks for the presence of all required cursor files."""
         self.status_update.emit("Checking for required files...")
         
-        for f in self.FILES:
-            if not (source_dir / f"{f}.cur").exists() and not (source_dir / f"{f}.ani").exists():
-                self.status_update.emit(f"Missing file: {source_dir / f} (.cur or .ani)")
-                return False
+        self.source_index = None
+        missing = self.index_source_dir(source_dir).missing(self.FILES)
+        for f in missing:
+            self.status_update.emit(f"Missing file: {source_dir / f} (.cur or .ani)")
+        if missing:
+            self.status_update.emit(f"{len(missing)} required file(s) are missing.")
+            return False
         
         self.status_update.emit("All required files are present.")
         return True
 
-    def convert_files(self, source_dir, dest_dir):
-        """Converts Windows cursors to Linux format using win2xcur."""
-        self.status_update.emit("Starting initial cursor conversion...")
+    def find_source_file(self, source_dir, name):
+        """Returns the .cur or .ani source file for a cursor name, ignoring case."""
+        return self.index_source_dir(source_dir).find(name)
+
+    def _convert_file(self, input_file, output_file):
+        """Converts one cursor, reusing a cached result when available.
+
+        Returns the file's timing event (None without a tracer) and the
+        number of bytes saved by duplicate-frame elimination.
+        """
+        if self._cancelled.is_set():
+            raise ConversionCancelled()
+        start = self.tracer.now() if self.tracer else 0.0
+        cached = False
+        blob = input_file.read_bytes() if self.cache is not None or self.sizes else None
+        if self.cache is None:
+            self.backend.convert(input_file, output_file)
+        else:
+            key = self.cache.key(blob, self.backend)
+            cached = self.cache.fetch(key, output_file)
+            if not cached:
+                self.backend.convert(input_file, output_file)
+                self.cache.store(key, output_file)
+        if self.sizes:
+            self._add_sizes(blob, output_file)
+        saved = self._dedupe_frames(output_file) if self.dedupe_frames else 0
+
+        if self.tracer is None:
+            return None, saved
+        return self.tracer.make_event(input_file.name, 'file', start, self.tracer.now(), 
+                                      bytes_read=input_file.stat().st_size, 
+                                      bytes_written=output_file.stat().st_size, 
+                                      cached=cached, backend=self.backend.name), saved
+
+    def _add_sizes(self, blob, output_file):
+        """Adds the extra nominal sizes to a converted Xcursor file.
+
+        Each size is cached on its own, so adding a size later only resamples
+        that size.
+        """
+        from . import xcursor
+
+        try:
+            images = xcursor.read_xcursor(output_file.read_bytes())
+            for size in sorted(self.sizes):
+                key = None
+                data = None
+                if self.cache is not None:
+                    key = self.cache.key(blob, self.backend, {'size': size, 'resample': xcursor.RESAMPLE_VERSION})
+                    data = self.cache.get(key)
+                if data is None:
+                    data = xcursor.write_xcursor_images(xcursor.images_for_size(images, size))
+                    if key is not None:
+                        self.cache.put(key, data)
+                images += xcursor.read_xcursor(data)
+        except xcursor.CursorFormatError as e:
+            raise ConversionError(f"Could not add sizes: {e}") from e
+        output_file.write_bytes(xcursor.write_xcursor_images(images))
+
+    def _dedupe_frames(self, output_file):
+        """Merges repeated animation frames in an Xcursor file. Returns the bytes saved."""
+        from . import xcursor
+
+        data = output_file.read_bytes()
+        try:
+            images = xcursor.read_xcursor(data)
+        except xcursor.CursorFormatError as e:
+            raise ConversionError(f"Could not optimize frames: {e}") from e
+        if len(images) < 2:
+            return 0
+        optimized = xcursor.write_xcursor_images(xcursor.merge_duplicate_frames(images), share_identical=True)
+        if len(optimized) >= len(data):
+            return 0
+        output_file.write_bytes(optimized)
+        return len(data) - len(optimized)
+
+    @contextmanager
+    def _executor(self):
+        if self.executor is not None:
+            yield self.executor
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            yield executor
+
+    def convert_files(self, source_dir, dest_dir, names=None, on_converted=None):
+        """Converts Windows cursors to Linux format using a pool of backend workers.
+
+        names restricts the conversion to a subset of FILES. on_converted is
+        called with each cursor name as soon as its conversion finishes, on
+        the calling thread, while the remaining conversions keep running.
+        Returns the total number of bytes read and written.
+        """
+        if self.executor is None:
+            self.status_update.emit(f"Starting initial cursor conversion with {self.max_workers} worker(s) "
+                                    f"({self.backend.name} backend)...")
+        else:
+            self.status_update.emit(f"Starting initial cursor conversion on the shared worker pool "
+                                    f"({self.backend.name} backend)...")
         
-        for f in self.FILES:
-            input_file = (source_dir / f"{f}.cur") if (source_dir / f"{f}.cur").exists() else (source_dir / f"{f}.ani")
-            self.status_update.emit(f"Converting {input_file.name}...")
+        if self.cache is not None:
+            self.cache.reset_stats()
+
+        bytes_read = bytes_written = 0
+        # Signals, callbacks and trace events only run on this thread; workers just run the backend.
+        with self._executor() as executor:
+            futures = {}
             try:
-                # Use the explicitly found win2xcur_path
-                subprocess.run([self.win2xcur_path, str(input_file), '-o', str(dest_dir)], 
-                               check=True, 
-                               capture_output=True)
-            except subprocess.CalledProcessError as e:
-                self.status_update.emit(f"Conversion failed for {input_file.name}: {e.stderr.strip()}")
-                raise e
+                for f in (self.FILES if names is None else names):
+                    if self._cancelled.is_set():
+                        break
+                    input_file = self.find_source_file(source_dir, f)
+                    self.status_update.emit(f"Converting {input_file.name}...")
+                    futures[executor.submit(self._convert_file, input_file, dest_dir / f)] = (f, input_file)
+                self._futures = list(futures)
+                self._outputs = {dest_dir / name for name, _ in futures.values()}
+                if self._cancelled.is_set():
+                    self.cancel()
+
+                failure = None
+                for future in as_completed(futures):
+                    name, input_file = futures[future]
+                    if future.cancelled():
+                        continue
+                    try:
+                        event, saved = future.result()
+                    except (ConversionError, ConversionCancelled) as e:
+                        # Cursors that finished before a cancel are still linked below.
+                        if self._cancelled.is_set():
+                            continue
+                        self.status_update.emit(f"Conversion failed for {input_file.name}: {e}")
+                        if failure is None:
+                            failure = e
+                            # Queued cursors are skipped; running ones finish and are linked, so a resume keeps them.
+                            for pending in futures:
+                                pending.cancel()
+                        continue
+                    self.status_update.emit(f"Converted {input_file.name}.")
+                    if saved:
+                        self.status_update.emit(f"Removed duplicate frames from {input_file.name}, "
+                                                f"saving {saved / 1024:.1f} KiB.")
+                    if on_converted is not None:
+                        on_converted(name)
+                    if event is not None:
+                        bytes_read += event['bytes_read']
+                        bytes_written += event['bytes_written']
+                        # Recorded once the cursor is fully processed, so progress counts finished items.
+                        self.tracer.record(event)
+                if failure is not None:
+                    raise failure
+            except BaseException:
+                for pending in futures:
+                    pending.cancel()
+                raise
+            finally:
+                self._futures = ()
+                self._outputs = ()
+
+        if self._cancelled.is_set():
+            raise ConversionCancelled()
+
+        if self.cache is not None:
+            self.status_update.emit(f"Conversion cache: {self.cache.hits} hit(s), {self.cache.misses} miss(es).")
+            evicted = self.cache.evict()
+            if evicted:
+                self.status_update.emit(f"Evicted {evicted} least recently used cache entries.")
+        return bytes_read, bytes_written
+
+    def cancel(self):
+        """Stops convert_files: queued cursors are dropped and running win2xcur processes are killed.
+
+        Cursors that already finished are still passed to on_converted before
+        convert_files raises ConversionCancelled. Safe to call from any thread.
+        """
+        self._cancelled.set()
+        for future in list(self._futures):
+            future.cancel()
+        kill = getattr(self.backend, 'kill', None)
+        if kill is not None:
+            kill(set(self._outputs))
 
     def cleanup_intermediate_files(self, dest_dir):
-        """Removes the intermediate converted files."""
+        """Removes intermediate converted files that were not moved into cursors/."""
         self.status_update.emit("Cleaning up intermediate files...")
         for f in self.FILES:
             intermediate_file = dest_dir / f
             if intermediate_file.exists():
                 intermediate_file.unlink()
-        self.status_update.emit("Cleanup complete.")
\ No newline at end of file
+        self.status_update.emit("Cleanup complete.")
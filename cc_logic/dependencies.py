@@ -1,9 +1,13 @@
+import json
+import os
 import subprocess
 import shutil
 import sys
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from .cache import default_cache_dir
+
 class DependenciesManager(QObject):
     status_update = pyqtSignal(str)
     
@@ -12,7 +16,51 @@ class DependenciesManager(QObject):
         self.venv_path = Path.home() / '.venvs/win2xcur-env'
         self.venv_python_path = None
         self.win2xcur_path = None
+        self.win2xcur_version = None
         self.system_python_path = None
+        self.stamp_path = default_cache_dir().parent / 'env-stamp.json'
+        self.refresh_environment = False
+
+    def _venv_mtime(self):
+        return self.venv_path.stat().st_mtime_ns
+
+    def _load_valid_stamp(self):
+        """Returns the environment stamp if it still describes the venv, else None."""
+        if self.refresh_environment:
+            return None
+        try:
+            stamp = json.loads(self.stamp_path.read_text())
+            if (stamp['system_python'] != self.system_python_path
+                    or stamp['venv_path'] != str(self.venv_path)
+                    or stamp['venv_mtime'] != self._venv_mtime()
+                    or not Path(stamp['venv_python']).exists()
+                    or not Path(stamp['win2xcur_path']).exists()):
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return stamp
+
+    def _write_stamp(self):
+        """Records the verified environment so later runs can skip ensurepip and pip."""
+        stamp = {
+            'system_python': self.system_python_path,
+            'venv_path': str(self.venv_path),
+            'venv_mtime': self._venv_mtime(),
+            'venv_python': self.venv_python_path,
+            'win2xcur_path': self.win2xcur_path,
+            'win2xcur_version': self.win2xcur_version,
+        }
+        try:
+            self.stamp_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.stamp_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(stamp, indent=2))
+            os.replace(tmp_path, self.stamp_path)
+        except OSError as e:
+            self.status_update.emit(f"Warning: Could not write environment stamp: {e}")
+
+    def invalidate_stamp(self):
+        """Forgets the verified environment so the next run re-checks everything."""
+        self.stamp_path.unlink(missing_ok=True)
 
     def _find_system_python(self):
         """Finds the system's Python interpreter path."""
@@ -33,13 +81,20 @@ class DependenciesManager(QObject):
         
         if not self._find_system_python():
             return False
+
+        if self.refresh_environment:
+            self.invalidate_stamp()
             
-        required_cmds = ['pip', 'wget', 'zip']
+        required_cmds = ['pip', 'wget']
         missing_cmds = [cmd for cmd in required_cmds if shutil.which(cmd) is None]
 
         if missing_cmds:
             self.status_update.emit(f"Error: The following commands are not installed: {', '.join(missing_cmds)}")
             return False
+
+        if self._load_valid_stamp() is not None:
+            self.status_update.emit("All system dependencies are met (verified environment).")
+            return True
         
         try:
             subprocess.run([self.system_python_path, '-m', 'ensurepip', '--version'], 
@@ -53,9 +108,29 @@ class DependenciesManager(QObject):
         self.status_update.emit("All system dependencies are met.")
         return True
 
+    def _query_win2xcur_version(self):
+        """Returns the win2xcur version installed in the virtual environment."""
+        try:
+            result = subprocess.run([self.venv_python_path, '-c', 
+                                     'import importlib.metadata as m; print(m.version("win2xcur"))'], 
+                                    check=True, 
+                                    capture_output=True, 
+                                    text=True)
+        except subprocess.CalledProcessError:
+            return 'unknown'
+        return result.stdout.strip() or 'unknown'
+
     def setup_python_env(self):
         """Creates a virtual environment and installs win2xcur."""
         self.status_update.emit("Setting up Python virtual environment...")
+
+        stamp = self._load_valid_stamp()
+        if stamp is not None:
+            self.venv_python_path = stamp['venv_python']
+            self.win2xcur_path = stamp['win2xcur_path']
+            self.win2xcur_version = stamp['win2xcur_version']
+            self.status_update.emit(f"Using verified environment (win2xcur {self.win2xcur_version}).")
+            return True
         
         if not self.venv_path.exists():
             try:
@@ -88,6 +163,8 @@ class DependenciesManager(QObject):
             self.status_update.emit(f"Failed to install win2xcur: {e.stderr.strip()}")
             return False
 
+        self.win2xcur_version = self._query_win2xcur_version()
+
         if sys.platform == 'win32':
             win2xcur_exe_path = venv_bin_path / 'win2xcur.exe'
         else:
@@ -102,5 +179,6 @@ class DependenciesManager(QObject):
             self.status_update.emit("Error: win2xcur executable not found in the virtual environment.")
             return False
 
+        self._write_stamp()
         self.status_update.emit("Python environment is ready.")
         return True
\ No newline at end of file
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+import threading
+from collections import deque
+
+
+class StatusLogBuffer:
+    """Thread-safe buffer between the worker's status messages and the UI log.
+
+    Messages are appended from the worker thread and drained in batches by
+    the UI. Pending messages are capped at max_pending (oldest dropped, with
+    a note); the complete log is spooled to a temporary file so it can be
+    saved without keeping it in memory.
+    """
+
+    def __init__(self, max_pending=10000):
+        self._pending = deque()
+        self._max_pending = max_pending
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._history = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+
+    def append(self, message):
+        with self._lock:
+            self._history.write(message + '\n')
+            if len(self._pending) >= self._max_pending:
+                self._pending.popleft()
+                self._dropped += 1
+            self._pending.append(message)
+
+    def drain(self):
+        """Returns and removes all pending messages."""
+        with self._lock:
+            messages = list(self._pending)
+            self._pending.clear()
+            if self._dropped:
+                messages.insert(0, f"... {self._dropped} message(s) omitted from view, see saved log ...")
+                self._dropped = 0
+        return messages
+
+    def clear(self):
+        """Discards pending messages and the saved history."""
+        with self._lock:
+            self._pending.clear()
+            self._dropped = 0
+            self._history.seek(0)
+            self._history.truncate()
+
+    def save(self, path):
+        """Writes the full log to path."""
+        with self._lock:
+            self._history.flush()
+            self._history.seek(0)
+            with open(path, 'w', encoding='utf-8') as f:
+                shutil.copyfileobj(self._history, f)
+            self._history.seek(0, 2)
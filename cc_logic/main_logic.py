@@ -1,9 +1,15 @@
 import shutil
+import threading
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 
 from .dependencies import DependenciesManager
 from .conversion import CursorConverter
+from .archive import archive_path
+from .backends import ConversionCancelled, ConversionError, InProcessBackend, NativeBackend, SubprocessBackend
+from .cache import ConversionCache
+from .manifest import BuildManifest
+from .tracing import ProgressTracker, Tracer
 from .theme_builder import ThemeBuilder
 from .utilities import Utilities
 
@@ -11,12 +17,19 @@ class CursorConverterLogic(QObject):
     status_update = pyqtSignal(str)
     finished = pyqtSignal(bool)
     progress_update = pyqtSignal(int)
+    timing_event = pyqtSignal(dict)
+
+    # Serializes venv creation and pip when several conversions run at once.
+    _environment_lock = threading.Lock()
+    _shared_backends_lock = threading.Lock()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         
         self.dependencies_manager = DependenciesManager(self)
         self.converter = None 
+        # Archive that converted cursors are added to while the conversion runs.
+        self.archive = None
         self.theme_builder = ThemeBuilder(self)
         self.utilities = Utilities(self)
         
@@ -29,72 +42,338 @@ class CursorConverterLogic(QObject):
         self.map_file_path = ""
         self.zip_theme = False
         self.install_theme = False
+        self.max_workers = None
+        self.backend = 'auto'
+        self.use_cache = True
+        self.link_strategy = 'symlink'
+        self.incremental = False
+        self.executor = None
+        self.trace_path = None
+        self.trace_format = 'chrome'
+        self.sizes = None
+        self.dedupe_frames = True
+        self.archive_format = 'zip'
+        self.compression_level = None
+        self.compression_workers = 1
+        self.resume = True
+        self._cancelled = threading.Event()
+        self.cache = ConversionCache()
+        # Backends by name, reused across runs (e.g. by the conversion service) when set.
+        self.shared_backends = None
+        self.tracer = Tracer()
+        self.progress = None
     
-    def set_conversion_parameters(self, source_path, destination_path, map_file_path, zip_theme, install_theme):
+    def set_conversion_parameters(self, source_path, destination_path, map_file_path, zip_theme, install_theme, 
+                                  max_workers=None, backend='auto', use_cache=True, link_strategy='symlink', 
+                                  incremental=False, refresh_environment=False, executor=None, 
+                                  trace_path=None, trace_format='chrome', sizes=None, 
+                                  dedupe_frames=True, archive_format='zip', compression_level=None, 
+                                  compression_workers=1, resume=True):
         self.source_path = source_path
         self.destination_path = destination_path
         self.map_file_path = map_file_path
         self.zip_theme = zip_theme
         self.install_theme = install_theme
+        self.max_workers = max_workers
+        self.backend = backend
+        self.use_cache = use_cache
+        self.link_strategy = link_strategy
+        self.incremental = incremental
+        self.dependencies_manager.refresh_environment = refresh_environment
+        self.executor = executor
+        self.trace_path = trace_path
+        self.trace_format = trace_format
+        self.sizes = sizes
+        self.dedupe_frames = dedupe_frames
+        self.archive_format = archive_format
+        self.compression_level = compression_level
+        self.compression_workers = compression_workers
+        self.resume = resume
+
+    def clear_conversion_cache(self):
+        """Deletes all cached conversion results."""
+        self.cache.clear()
+        self.status_update.emit(f"Cleared conversion cache at {self.cache.cache_dir}")
+
+    def _create_backend(self):
+        """Creates the conversion backend selected by self.backend.
+
+        'auto' prefers the in-process win2xcur library, then the subprocess
+        backend, which needs the win2xcur virtual environment. The native
+        NumPy backend is used only when selected, and falls back to the
+        in-process library for files it cannot decode.
+        """
+        if self.backend == NativeBackend.name:
+            if not NativeBackend.is_available():
+                self.status_update.emit("Error: NumPy is not available in this environment.")
+                return None
+            fallback = InProcessBackend() if InProcessBackend.is_available() else None
+            self.status_update.emit("Using native conversion backend.")
+            return NativeBackend(fallback)
+
+        if self.backend in ('auto', InProcessBackend.name):
+            if InProcessBackend.is_available():
+                self.status_update.emit("Using in-process win2xcur backend.")
+                return InProcessBackend()
+            if self.backend == InProcessBackend.name:
+                self.status_update.emit("Error: The win2xcur library is not available in this environment.")
+                return None
+            self.status_update.emit("win2xcur library not available, falling back to subprocess backend.")
+        elif self.backend != SubprocessBackend.name:
+            self.status_update.emit(f"Error: Unknown conversion backend '{self.backend}'.")
+            return None
+
+        with self._environment_lock:
+            if not self.dependencies_manager.check_system_dependencies(): 
+                return None
+            if not self.dependencies_manager.setup_python_env(): 
+                return None
+        return SubprocessBackend(self.dependencies_manager.win2xcur_path, 
+                                 self.dependencies_manager.win2xcur_version or 'unknown')
+
+    def cancel(self):
+        """Stops the running conversion as soon as possible. Safe to call from any thread.
+
+        Running win2xcur processes are killed and queued cursors are dropped;
+        cursors that already finished stay checkpointed, so the next run
+        resumes with the rest.
+        """
+        self._cancelled.set()
+        converter = self.converter
+        if converter is not None:
+            converter.cancel()
+
+    def _raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise ConversionCancelled()
+
+    def _get_backend(self):
+        """Returns a backend from shared_backends, creating and sharing it on first use."""
+        if self.shared_backends is None:
+            return self._create_backend()
+        with self._shared_backends_lock:
+            backend = self.shared_backends.get(self.backend)
+            if backend is None:
+                backend = self._create_backend()
+                if backend is not None:
+                    self.shared_backends[self.backend] = backend
+            else:
+                self.status_update.emit(f"Reusing loaded {backend.name} conversion backend.")
+        return backend
+
+    def _stage_count(self):
+        """Returns the number of progress units outside of per-file conversion."""
+        # prepare, environment, inputs, link, cleanup, theme_files (+ archive, install)
+        return 6 + int(self.zip_theme) + int(self.install_theme)
+
+    def _on_timing_event(self, event):
+        if event['category'] == 'file' or (event['category'] == 'stage' and event['name'] != 'convert'):
+            self.progress.advance()
+        self.timing_event.emit(event)
+
+    def _finish(self, success):
+        self.tracer.record(Tracer.make_event('run_conversion', 'run', 0.0, self.tracer.now(), success=success))
+        if self.trace_path:
+            try:
+                self.tracer.export(self.trace_path, self.trace_format)
+                self.status_update.emit(f"Timing trace written to {self.trace_path}")
+            except (OSError, ValueError) as e:
+                self.status_update.emit(f"Warning: Could not write timing trace: {e}")
+        if success:
+            self.progress_update.emit(100)
+        self._cancelled.clear()
+        self.finished.emit(success)
+
+    def _archive_cursor(self, dest_dir, asset):
+        """Adds a cursor placed by link_asset to the archive, primary name first so aliases can refer to it."""
+        compiled_map = self.theme_builder.compiled_map
+        primary_name = compiled_map.primary_of[asset]
+        names = [primary_name] + [n for n in compiled_map.aliases_of.get(asset, ()) if n != primary_name]
+        try:
+            for cursor_name in names:
+                self.utilities.add_to_archive(self.archive, dest_dir, dest_dir / 'cursors' / cursor_name)
+        except Exception as e:
+            self.status_update.emit(f"Failed to archive theme: {e}")
+            self._discard_archive()
+
+    def _discard_archive(self):
+        if self.archive is not None:
+            self.archive.close(discard=True)
+            self.archive = None
 
     def run_conversion(self):
         self.status_update.emit("Starting conversion process...")
         self.status_update.emit(f"Source directory: {self.source_path}")
         self.status_update.emit(f"Destination directory: {self.destination_path}")
+
+        self.tracer = Tracer()
+        self.progress = ProgressTracker(self.progress_update.emit, 
+                                        self._stage_count() + len(CursorConverter.FILES))
+        self.tracer.listeners.append(self._on_timing_event)
         
         try:
             source_dir = Path(self.source_path)
             dest_dir = Path(self.destination_path)
             
-            self.progress_update.emit(5)
-            if dest_dir.exists():
-                shutil.rmtree(dest_dir)
+            with self.tracer.stage('prepare'):
+                checkpoint = (BuildManifest.load(dest_dir, BuildManifest.CHECKPOINT_FILENAME) 
+                              if self.resume else BuildManifest())
+                resuming = bool(checkpoint.data['converter'])
+                previous = BuildManifest.load(dest_dir) if self.incremental or resuming else BuildManifest()
+                if dest_dir.exists() and not (self.incremental or resuming):
+                    shutil.rmtree(dest_dir)
 
-            dest_dir.mkdir(parents=True)
+                dest_dir.mkdir(parents=True, exist_ok=True)
+            self._raise_if_cancelled()
 
-            self.progress_update.emit(10)
-            if not self.dependencies_manager.check_system_dependencies(): 
-                self.finished.emit(False)
-                return
-            if not self.dependencies_manager.setup_python_env(): 
-                self.finished.emit(False)
+            with self.tracer.stage('environment'):
+                backend = self._get_backend()
+            if backend is None: 
+                self._finish(False)
                 return
             
-            self.converter = CursorConverter(self.dependencies_manager.win2xcur_path, self)
+            self.converter = CursorConverter(backend, self.max_workers, 
+                                             self.cache if self.use_cache else None, self.executor, self)
+            self.converter.tracer = self.tracer
+            self.converter.sizes = tuple(self.sizes or ())
+            self.converter.dedupe_frames = self.dedupe_frames
             self.converter.status_update.connect(self.status_update)
 
-            self.progress_update.emit(25)
-            if not self.theme_builder.load_cursor_map(self.map_file_path, self.converter.FILES): 
-                self.finished.emit(False)
-                return
-            if not self.converter.check_source_files(source_dir): 
-                self.finished.emit(False)
+            with self.tracer.stage('inputs') as counters:
+                ready = (self.theme_builder.load_cursor_map(self.map_file_path, self.converter.FILES) 
+                         and self.converter.check_source_files(source_dir))
+                if ready:
+                    manifest = BuildManifest()
+                    sources = {f: self.converter.find_source_file(source_dir, f) for f in self.converter.FILES}
+                    manifest.record_inputs(self.converter.signature, self.map_file_path, self.theme_builder.compiled_map.primary_of, 
+                                           self.link_strategy, sources)
+                    counters['bytes_read'] = sum(p.stat().st_size for p in sources.values())
+                    if resuming and (checkpoint.data['converter'], checkpoint.data['link_strategy']) == \
+                            (manifest.data['converter'], manifest.data['link_strategy']):
+                        stale = checkpoint.stale_cursors(manifest, dest_dir / 'cursors')
+                        self.status_update.emit(f"Resuming interrupted conversion: "
+                                                f"{len(manifest.cursors) - len(stale)} cursor(s) already done.")
+                    else:
+                        stale = previous.stale_cursors(manifest, dest_dir / 'cursors')
+            if not ready: 
+                self._finish(False)
                 return
+            self._raise_if_cancelled()
+            self.progress.set_total(self._stage_count() + len(stale))
             
-            self.progress_update.emit(40)
-            self.converter.convert_files(source_dir, dest_dir)
+            # Each cursor is linked into cursors/ as soon as it is converted, while
+            # the remaining conversions keep running; the link stage only finishes up.
+            # A new link strategy keeps every converted cursor but rewrites all aliases.
+            strategy_changed = previous.data['link_strategy'] != manifest.data['link_strategy']
+            relink = bool(stale) or strategy_changed or previous.data['map_hash'] != manifest.data['map_hash']
+            if relink:
+                self.theme_builder.begin_linking(dest_dir, self.link_strategy, 
+                                                 previous.links if self.incremental or resuming else None, stale,
+                                                 rewrite_aliases=strategy_changed)
+
+            # The checkpoint lists every cursor whose output is final, and grows as cursors finish.
+            checkpoint = BuildManifest()
+            checkpoint.data['converter'] = manifest.data['converter']
+            checkpoint.data['link_strategy'] = manifest.data['link_strategy']
+            checkpoint.data['cursors'] = {name: entry for name, entry in manifest.cursors.items() if name not in stale}
+            checkpoint.save(dest_dir, BuildManifest.CHECKPOINT_FILENAME)
+
+            # Converting any cursor changes the theme, so its archive is written as cursors finish.
+            streaming = self.zip_theme and bool(stale)
+            if streaming:
+                try:
+                    self.archive = self.utilities.open_archive(dest_dir, self.archive_format, 
+                                                               self.compression_level, self.compression_workers)
+                except Exception as e:
+                    self.status_update.emit(f"Failed to archive theme: {e}")
+
+            def on_converted(name):
+                linked = self.theme_builder.link_asset(name)
+                if linked or name not in self.theme_builder.compiled_map.primary_of:
+                    checkpoint.cursors[name] = manifest.cursors[name]
+                    checkpoint.save(dest_dir, BuildManifest.CHECKPOINT_FILENAME)
+                if linked and self.archive is not None:
+                    self._archive_cursor(dest_dir, name)
 
-            self.progress_update.emit(60)
-            self.theme_builder.copy_assets(dest_dir)
+            with self.tracer.stage('convert', files=len(stale)) as counters:
+                if stale:
+                    counters['bytes_read'], counters['bytes_written'] = \
+                        self.converter.convert_files(source_dir, dest_dir, stale, on_converted)
+                else:
+                    self.status_update.emit("All converted cursors are up to date.")
 
-            self.progress_update.emit(75)
-            self.converter.cleanup_intermediate_files(dest_dir)
+            with self.tracer.stage('link') as counters:
+                if relink:
+                    manifest.data['links'] = self.theme_builder.finish_linking()
+                    counters['bytes_written'] = self.theme_builder.bytes_written
+                else:
+                    manifest.data['links'] = previous.links
+                    self.status_update.emit("Cursor links are up to date.")
 
-            self.progress_update.emit(85)
-            self.theme_builder.build_theme_files(dest_dir)
+            with self.tracer.stage('cleanup'):
+                if stale:
+                    self.converter.cleanup_intermediate_files(dest_dir)
 
+            with self.tracer.stage('theme_files'):
+                manifest.stages['theme_files'] = dest_dir.name
+                if (previous.stages.get('theme_files') != dest_dir.name
+                        or not (dest_dir / 'index.theme').exists() or not (dest_dir / 'cursor.theme').exists()):
+                    self.theme_builder.build_theme_files(dest_dir)
+
+            # The theme itself is complete, so the checkpoint is no longer needed.
+            manifest.save(dest_dir)
+            (dest_dir / BuildManifest.CHECKPOINT_FILENAME).unlink(missing_ok=True)
+            self._raise_if_cancelled()
+
+            digest = manifest.theme_digest()
             if self.zip_theme:
-                self.progress_update.emit(90)
-                self.utilities.zip_theme(dest_dir)
+                with self.tracer.stage('archive', format=self.archive_format) as counters:
+                    archive_key = f"{digest}:{self.archive_format}:{self.compression_level}"
+                    archive, self.archive = self.archive, None
+                    if streaming:
+                        archived = archive is not None and self.utilities.finish_archive(archive, dest_dir)
+                    elif (previous.stages.get('archive') == archive_key 
+                            and archive_path(dest_dir, self.archive_format).exists()):
+                        self.status_update.emit("Theme archive is up to date.")
+                        manifest.stages['archive'] = archive_key
+                        archived = False
+                    else:
+                        archived = self.utilities.archive_theme(dest_dir, self.archive_format, 
+                                                                self.compression_level, self.compression_workers)
+                    if archived:
+                        manifest.stages['archive'] = archive_key
+                        counters['bytes_read'] = self.utilities.bytes_read
+                        counters['bytes_written'] = self.utilities.bytes_written
             if self.install_theme:
-                self.progress_update.emit(95)
-                self.utilities.install_theme(dest_dir)
+                self._raise_if_cancelled()
+                with self.tracer.stage('install') as counters:
+                    if (previous.stages.get('install') == digest 
+                            and self.utilities.installed_theme_path(dest_dir).exists()):
+                        self.status_update.emit("Installed theme is up to date.")
+                        manifest.stages['install'] = digest
+                    elif self.utilities.install_theme(dest_dir):
+                        manifest.stages['install'] = digest
+                        counters['bytes_read'] = self.utilities.bytes_read
+                        counters['bytes_written'] = self.utilities.bytes_written
 
+            manifest.save(dest_dir)
             self.status_update.emit("Conversion process completed successfully!")
-            self.progress_update.emit(100)
-            self.finished.emit(True)
+            self._finish(True)
 
+        except ConversionCancelled:
+            self._discard_archive()
+            self.status_update.emit("Conversion cancelled. Finished cursors were kept; "
+                                    "run the conversion again to resume.")
+            self._finish(False)
+        except ConversionError:
+            # The converter has already reported which cursor failed and why.
+            self._discard_archive()
+            self.status_update.emit("Conversion failed. Finished cursors were kept; "
+                                    "run the conversion again to resume.")
+            self.progress_update.emit(0)
+            self._finish(False)
         except Exception as e:
+            self._discard_archive()
             self.status_update.emit(f"An unexpected error occurred: {e}")
             self.progress_update.emit(0)
-            self.finished.emit(False)
\ No newline at end of file
+            self._finish(False)
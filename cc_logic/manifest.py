@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import secrets
+from pathlib import Path
+
+
+def hash_file(path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Records what each stage of a theme build produced, for incremental rebuilds.
+
+    The manifest lives in the destination directory and stores the converter
+    signature, the cursor map hash, the hash and primary alias of every
+    source cursor, the alias links written to cursors/ and a digest for each
+    output stage (theme files, archive, install).
+    """
+    FILENAME = '.ccpy-manifest.json'
+    # Written while a build runs: the cursors converted and linked so far, so
+    # that an interrupted or failed build can resume where it stopped.
+    CHECKPOINT_FILENAME = '.ccpy-checkpoint.json'
+    FORMAT = 1
+
+    def __init__(self, data=None):
+        self.data = data or {
+            'format': self.FORMAT,
+            'converter': None,
+            'map_hash': None,
+            'link_strategy': None,
+            'cursors': {},
+            'links': {},
+            'stages': {},
+        }
+
+    @classmethod
+    def load(cls, dest_dir, filename=FILENAME):
+        """Loads the manifest (or checkpoint) from dest_dir, or returns an empty one."""
+        try:
+            data = json.loads((Path(dest_dir) / filename).read_text())
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get('format') != cls.FORMAT:
+            return cls()
+        return cls(data)
+
+    def save(self, dest_dir, filename=FILENAME):
+        """Atomically writes the manifest (or checkpoint) into dest_dir."""
+        # Created with the umask applied like the theme's other files, unlike mkstemp's 0600.
+        tmp_path = Path(dest_dir) / f".tmp-manifest-{secrets.token_hex(8)}"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, Path(dest_dir) / filename)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    @property
+    def cursors(self):
+        return self.data['cursors']
+
+    @property
+    def links(self):
+        return self.data['links']
+
+    @property
+    def stages(self):
+        return self.data['stages']
+
+    def record_inputs(self, converter_signature, map_file_path, primary_of, link_strategy, sources):
+        """Records the inputs of a build.
+
+        primary_of maps cursor names to their primary alias and sources maps
+        cursor names to source files.
+        """
+        self.data['converter'] = converter_signature
+        self.data['map_hash'] = hash_file(map_file_path)
+        self.data['link_strategy'] = link_strategy
+        for name, source_file in sources.items():
+            self.cursors[name] = {
+                'source': source_file.name,
+                'hash': hash_file(source_file),
+                'primary': primary_of.get(name),
+            }
+
+    def stale_cursors(self, current, cursor_dir):
+        """Returns the cursors in current whose conversion output cannot be reused.
+
+        The link strategy does not change converted bytes; a change of strategy
+        only needs the aliases rewritten, which is left to the link stage.
+        """
+        if self.data['converter'] != current.data['converter']:
+            return list(current.cursors)
+
+        stale = []
+        for name, entry in current.cursors.items():
+            previous = self.cursors.get(name)
+            if (previous is None
+                    or previous['hash'] != entry['hash']
+                    or previous['primary'] != entry['primary']
+                    or (entry['primary'] and not os.path.lexists(cursor_dir / entry['primary']))):
+                stale.append(name)
+        return stale
+
+    def theme_digest(self):
+        """Returns a digest of everything that ends up in the built theme."""
+        content = json.dumps([self.data['converter'], self.data['link_strategy'], 
+                              self.cursors, self.links, self.stages.get('theme_files')], sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
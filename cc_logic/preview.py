@@ -0,0 +1,237 @@
+"""Background decoding of cursor thumbnails for the preview panel."""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from . import xcursor
+
+PREVIEW_SUFFIXES = ('.cur', '.ani')
+
+
+def list_cursor_files(directory):
+    """Returns the cursors in directory worth previewing, sorted by name.
+
+    Windows cursors are listed by suffix. In a converted theme's cursors/
+    directory every regular file is listed; alias symlinks are skipped.
+    """
+    directory = Path(directory)
+    try:
+        entries = sorted(directory.iterdir(), key=lambda path: path.name.lower())
+    except OSError:
+        return []
+    if any(path.suffix.lower() in PREVIEW_SUFFIXES for path in entries):
+        return [path for path in entries if path.suffix.lower() in PREVIEW_SUFFIXES and path.is_file()]
+    return [path for path in entries if path.is_file() and not path.is_symlink()]
+
+
+def scale_pixels(pixels, nominal, size):
+    """Downscales premultiplied BGRA pixels from nominal size to size.
+
+    Uses the same triangle filter as xcursor.resample_images, applied as two
+    BLAS matrix products, which release the GIL (einsum does not) so the UI
+    thread stays responsive while thumbnails are decoded.
+    """
+    height, width = pixels.shape[:2]
+    scale = size / nominal
+    out_height, out_width = max(1, round(height * scale)), max(1, round(width * scale))
+    rows = xcursor._resample_weights(height, out_height)
+    cols = xcursor._resample_weights(width, out_width)
+    data = rows @ pixels.astype(np.float32).reshape(height, width * 4)
+    data = cols @ data.reshape(out_height, width, 4).transpose(1, 0, 2).reshape(width, out_height * 4)
+    data = data.reshape(out_width, out_height, 4).transpose(1, 0, 2)
+    scaled = np.clip(np.rint(data), 0, 255).astype(np.uint8)
+    # Premultiplied colour channels may not exceed alpha.
+    np.minimum(scaled[..., :3], scaled[..., 3:4], out=scaled[..., :3])
+    return scaled
+
+
+class PreviewFrame:
+    """One decoded animation step of a cursor, scaled to thumbnail size.
+
+    pixels are premultiplied BGRA of shape (H, W, 4); delay is in seconds.
+    """
+
+    def __init__(self, pixels, delay, frame_count):
+        self.pixels = pixels
+        self.delay = delay
+        self.frame_count = frame_count
+
+
+class LRUCache:
+    """Least-recently-used mapping bounded by the total size of its values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, nbytes):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._items[key] = (value, nbytes)
+        self.size += nbytes
+        while self.size > self.max_bytes and len(self._items) > 1:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.size -= evicted
+
+
+class _XcursorFrames:
+    """Adapts an Xcursor file to the frame interface of xcursor.CursorFile."""
+
+    def __init__(self, blob, size):
+        by_nominal = {}
+        for image in xcursor.read_xcursor(blob):
+            by_nominal.setdefault(image['nominal'], []).append(image)
+        if not by_nominal:
+            raise xcursor.CursorFormatError('Xcursor file has no images')
+        nominals = sorted(by_nominal)
+        self.images = by_nominal[next((nominal for nominal in nominals if nominal >= size), nominals[-1])]
+
+    @property
+    def frame_count(self):
+        return len(self.images)
+
+
+class PreviewDecoder(QObject):
+    """Decodes cursor thumbnails one animation step at a time on its own thread.
+
+    request() may be called from any thread; requests are queued and served
+    in order by process(), which runs in the thread this object lives in.
+    Decoded frames are kept in an LRU cache keyed by the SHA-256 of the
+    file, the step and the thumbnail size, and parsed files in a smaller
+    one, so later steps of an animation are decoded without re-reading it.
+    Only the steps that are requested are ever decoded.
+    """
+    frame_ready = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, str)
+    _wake = pyqtSignal()
+
+    CACHE_SIZE = 64 * 1024 * 1024
+    PARSED_CACHE_SIZE = 128 * 1024 * 1024
+
+    def __init__(self, size=48, cache_size=CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.frames = LRUCache(cache_size)
+        self.parsed = LRUCache(self.PARSED_CACHE_SIZE)
+        self._digests = {}
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake.connect(self.process)
+
+    def request(self, path, step=0):
+        """Queues decoding of one animation step of the cursor at path."""
+        with self._lock:
+            first = not self._pending
+            self._pending[(str(path), step)] = None
+        if first:
+            self._wake.emit()
+
+    def retain(self, paths):
+        """Drops queued requests for cursors that are no longer in paths."""
+        paths = {str(path) for path in paths}
+        with self._lock:
+            for key in [key for key in self._pending if key[0] not in paths]:
+                del self._pending[key]
+
+    # Declared as a slot so the queued connection from _wake runs it in this object's thread;
+    # a plain method would be called through a proxy that stays in the creating thread.
+    @pyqtSlot()
+    def process(self):
+        """Serves queued requests until none are left."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                path, step = self._pending.popitem(last=False)[0]
+            try:
+                frame = self.decode(path, step)
+            # An exception escaping a slot aborts the application, so any decoding error only fails its item.
+            except Exception as e:
+                self.failed.emit(path, str(e))
+                continue
+            self.frame_ready.emit(path, step, frame)
+
+    READ_CHUNK = 1024 * 1024
+
+    def _read(self, path):
+        """Returns the file's content and SHA-256.
+
+        Reading in chunks keeps the GIL free for the UI thread; a single
+        read() of a large animation holds it for tens of milliseconds.
+        """
+        digest = hashlib.sha256()
+        chunks = []
+        with open(path, 'rb') as f:
+            while chunk := f.read(self.READ_CHUNK):
+                digest.update(chunk)
+                chunks.append(chunk)
+        return b''.join(chunks), digest.hexdigest()
+
+    def _digest(self, path):
+        """Returns the file's SHA-256, re-reading it only when its size or mtime changed."""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        cached = self._digests.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1], None
+        blob, digest = self._read(path)
+        self._digests[path] = (stamp, digest)
+        return digest, blob
+
+    def _parse(self, path, digest, blob):
+        cursor = self.parsed.get(digest)
+        if cursor is not None:
+            return cursor
+        if blob is None:
+            blob, _ = self._read(path)
+        if blob[:len(xcursor.XCURSOR_MAGIC)] == xcursor.XCURSOR_MAGIC:
+            cursor = _XcursorFrames(blob, self.size)
+        else:
+            # A memoryview makes the ANI frame slices zero-copy, so parsing a large animation
+            # does not hold the GIL while copying every frame.
+            cursor = xcursor.open_cursor(memoryview(blob))
+        self.parsed.put(digest, cursor, len(blob))
+        return cursor
+
+    def decode(self, path, step=0):
+        """Returns the PreviewFrame for one animation step of the cursor at path."""
+        digest, blob = self._digest(path)
+        key = (digest, step, self.size)
+        frame = self.frames.get(key)
+        if frame is not None:
+            return frame
+
+        cursor = self._parse(path, digest, blob)
+        step %= cursor.frame_count
+        if isinstance(cursor, _XcursorFrames):
+            image = cursor.images[step]
+            frame = self._scaled(image['pixels'], image['nominal'], image['delay'] / 1000, cursor.frame_count)
+        else:
+            # Decoded directly rather than with cursor.frame(), which would keep every icon it decodes.
+            images = sorted(xcursor.decode_icon(cursor.icons[cursor.sequence[step]]), key=lambda image: image.nominal)
+            image = next((image for image in images if image.nominal >= self.size), images[-1])
+            frame = self._scaled(xcursor.premultiply_alpha(image.pixels), image.nominal, cursor.delays[step],
+                                 cursor.frame_count)
+        self.frames.put(key, frame, frame.pixels.nbytes)
+        return frame
+
+    def _scaled(self, pixels, nominal, delay, frame_count):
+        if nominal > self.size:
+            pixels = scale_pixels(pixels, nominal, self.size)
+        return PreviewFrame(pixels, delay, frame_count)
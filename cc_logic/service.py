@@ -0,0 +1,559 @@
+"""Long-running conversion service that accepts theme jobs over a Unix domain socket.
+
+Clients send one JSON object per line and receive one JSON object per line:
+
+    {"op": "submit", "job": {"source_path": ..., "destination_path": ..., ...}}
+        -> {"ok": true, "id": "3"}
+    {"op": "status"} or {"op": "status", "id": "3"}
+        -> {"ok": true, "jobs": [...]} or {"ok": true, "job": {...}}
+    {"op": "cancel", "id": "3"}
+        -> {"ok": true, "job": {...}}; a running job stops and can be resumed
+    {"op": "stream", "id": "3"}
+        -> {"ok": true}, then every status, progress and finished event of the
+           job (including those already emitted) until it ends.
+
+Errors are reported as {"ok": false, "error": "..."}.
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .archive import ARCHIVE_FORMATS, COMPRESSION_LEVELS, available_formats
+from .backends import BACKENDS
+from .cache import default_cache_dir
+from .cli import DEFAULT_MAP_FILE, EXIT_FAILED, EXIT_OK, EXIT_USAGE, parse_sizes
+from .main_logic import CursorConverterLogic
+from .theme_builder import ThemeBuilder
+from .utilities import destination_conflict
+
+# Optional job fields, passed to CursorConverterLogic.set_conversion_parameters.
+JOB_OPTIONS = ('zip_theme', 'install_theme', 'backend', 'use_cache', 'link_strategy', 'incremental', 'sizes',
+               'dedupe_frames', 'archive_format', 'compression_level', 'compression_workers', 'resume',
+               'refresh_environment')
+BOOLEAN_OPTIONS = ('zip_theme', 'install_theme', 'use_cache', 'incremental', 'dedupe_frames', 'resume',
+                   'refresh_environment')
+
+
+def default_socket_path():
+    """Returns the per-user socket path of the conversion service."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    base = Path(runtime_dir) / 'ccpy' if runtime_dir else default_cache_dir().parent
+    return base / 'service.sock'
+
+
+class ServiceError(Exception):
+    """Raised for invalid requests and for errors reported by the service."""
+    pass
+
+
+def validate_options(params):
+    """Checks the JOB_OPTIONS in params as the command line checks its arguments.
+
+    Returns a copy of params with sizes normalized. Raises ServiceError for invalid values.
+    """
+    params = dict(params)
+    for key in BOOLEAN_OPTIONS:
+        if not isinstance(params.get(key, False), bool):
+            raise ServiceError(f"'{key}' must be true or false")
+    if params.get('backend', 'auto') not in BACKENDS:
+        raise ServiceError(f"unknown backend '{params['backend']}'")
+    if params.get('link_strategy', 'symlink') not in ThemeBuilder.LINK_STRATEGIES:
+        raise ServiceError(f"unknown link strategy '{params['link_strategy']}'")
+
+    sizes = params.get('sizes')
+    if sizes is not None:
+        if isinstance(sizes, list) and all(isinstance(size, int) and not isinstance(size, bool) for size in sizes):
+            sizes = ','.join(map(str, sizes))
+        if not isinstance(sizes, str):
+            raise ServiceError("'sizes' must be a list of integers")
+        try:
+            params['sizes'] = list(parse_sizes(sizes))
+        except argparse.ArgumentTypeError as e:
+            raise ServiceError(str(e))
+
+    archive_format = params.get('archive_format', 'zip')
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ServiceError(f"unknown archive format '{archive_format}'")
+    if params.get('zip_theme') and archive_format not in available_formats():
+        raise ServiceError(f"archive format {archive_format} needs the zstandard package")
+    level = params.get('compression_level')
+    if level is not None:
+        minimum, _, maximum = COMPRESSION_LEVELS[archive_format]
+        if not isinstance(level, int) or isinstance(level, bool) or not minimum <= level <= maximum:
+            raise ServiceError(f"'compression_level' for {archive_format} must be between {minimum} and {maximum}")
+    workers = params.get('compression_workers', 1)
+    if not isinstance(workers, int) or isinstance(workers, bool) or workers < 1:
+        raise ServiceError("'compression_workers' must be at least 1")
+    return params
+
+
+class Job:
+    """One theme conversion submitted to the service."""
+
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.state = 'queued'
+        self.progress = 0
+        self.events = []
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.logic = None
+        self.cancel_requested = False
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in ('succeeded', 'failed', 'cancelled')
+
+    def add_event(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, state):
+        with self.condition:
+            self.state = state
+            self.finished = time.time()
+            self.events.append({'event': 'finished', 'state': state, 'success': state == 'succeeded'})
+            self.condition.notify_all()
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'progress': self.progress,
+            'source_path': self.params['source_path'],
+            'destination_path': self.params['destination_path'],
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class ConversionService:
+    """Runs conversion jobs from any number of clients on a bounded pool.
+
+    Backends, the compiled cursor map and imported libraries stay loaded
+    between jobs, and every job shares one cursor conversion pool, so small
+    jobs skip the environment checks and start-up work of a fresh run.
+    """
+
+    # Finished jobs kept for status queries.
+    MAX_FINISHED_JOBS = 100
+
+    def __init__(self, max_jobs=2, max_workers=None):
+        self.job_pool = ThreadPoolExecutor(max_workers=max_jobs)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        self.max_jobs = max_jobs
+        self.backends = {}
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._destination_locks = {}
+
+    def submit(self, params):
+        """Queues a job. params holds source_path, destination_path and optional JOB_OPTIONS."""
+        if not isinstance(params, dict):
+            raise ServiceError("job must be an object")
+        for key in ('source_path', 'destination_path'):
+            if not isinstance(params.get(key), str) or not params[key]:
+                raise ServiceError(f"job needs '{key}'")
+        if not isinstance(params.get('map_file_path') or '', str):
+            raise ServiceError("'map_file_path' must be a string")
+        unknown = set(params) - {'source_path', 'destination_path', 'map_file_path'} - set(JOB_OPTIONS)
+        if unknown:
+            raise ServiceError(f"unknown job option(s): {', '.join(sorted(unknown))}")
+        params = validate_options(params)
+        conflict = destination_conflict(params['source_path'], params['destination_path'])
+        if conflict:
+            raise ServiceError(conflict)
+
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.done]
+            for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS + 1)]:
+                del self.jobs[job_id]
+            job = Job(str(next(self._ids)), params)
+            # Listed only once it has a future, so cancel never sees a job without one.
+            job.future = self.job_pool.submit(self._run, job)
+            self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        job = self.jobs.get(str(job_id))
+        if job is None:
+            raise ServiceError(f"no such job: {job_id}")
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a queued job, or stops a running one at its next checkpoint."""
+        job = self.get(job_id)
+        if job.done:
+            return job
+        job.cancel_requested = True
+        if job.future.cancel():
+            job.finish('cancelled')
+        elif job.logic is not None:
+            job.logic.cancel()
+        return job
+
+    def stream(self, job_id):
+        """Returns an iterator over every event of a job that waits for new ones until the job ends."""
+        return self._events(self.get(job_id))
+
+    @staticmethod
+    def _events(job):
+        index = 0
+        while True:
+            with job.condition:
+                while index >= len(job.events):
+                    job.condition.wait()
+                events = job.events[index:]
+                index = len(job.events)
+            for event in events:
+                yield event
+                if event['event'] == 'finished':
+                    return
+
+    def _run(self, job):
+        job.state = 'running'
+        job.started = time.time()
+        params = job.params
+        logic = CursorConverterLogic()
+        logic.shared_backends = self.backends
+        job.logic = logic
+
+        def on_progress(value):
+            job.progress = value
+            job.add_event({'event': 'progress', 'value': value})
+
+        result = []
+        logic.status_update.connect(lambda message: job.add_event({'event': 'status', 'message': message}))
+        logic.progress_update.connect(on_progress)
+        logic.finished.connect(result.append)
+        options = {key: params[key] for key in JOB_OPTIONS if key in params and key not in ('zip_theme', 'install_theme')}
+        logic.set_conversion_parameters(params['source_path'], params['destination_path'],
+                                        params.get('map_file_path') or str(DEFAULT_MAP_FILE),
+                                        bool(params.get('zip_theme')), bool(params.get('install_theme')),
+                                        executor=self.executor, **options)
+        with self._lock:
+            destination_lock = self._destination_locks.setdefault(
+                str(Path(params['destination_path']).absolute()), threading.Lock())
+        # Jobs writing to the same destination run one after another.
+        with destination_lock:
+            try:
+                if job.cancel_requested:
+                    logic.cancel()
+                logic.run_conversion()
+            except Exception as e:
+                job.add_event({'event': 'status', 'message': f"An unexpected error occurred: {e}"})
+        job.logic = None
+        if result and result[0]:
+            job.finish('succeeded')
+        else:
+            job.finish('cancelled' if job.cancel_requested else 'failed')
+
+    def handle(self, request):
+        """Answers one non-streaming request."""
+        op = request.get('op') if isinstance(request, dict) else None
+        if op == 'submit':
+            return {'ok': True, 'id': self.submit(request.get('job')).id}
+        if op == 'status':
+            if request.get('id') is None:
+                return {'ok': True, 'jobs': [job.summary() for job in list(self.jobs.values())]}
+            return {'ok': True, 'job': self.get(request['id']).summary()}
+        if op == 'cancel':
+            return {'ok': True, 'job': self.cancel(request.get('id')).summary()}
+        raise ServiceError(f"unknown op: {op!r}")
+
+    def shutdown(self):
+        self.job_pool.shutdown(wait=True, cancel_futures=True)
+        self.executor.shutdown(wait=True)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b'\n')
+        self.wfile.flush()
+
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if isinstance(request, dict) and request.get('op') == 'stream':
+                    events = service.stream(request.get('id'))
+                    self._send({'ok': True})
+                    for event in events:
+                        self._send(event)
+                    continue
+                reply = service.handle(request)
+            except (ServiceError, ValueError) as e:
+                reply = {'ok': False, 'error': str(e)}
+            except BrokenPipeError:
+                return
+            self._send(reply)
+
+
+class ServiceServer(socketserver.ThreadingUnixStreamServer):
+    """Serves a ConversionService on a Unix domain socket that only the current user can open."""
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.socket_path = Path(socket_path)
+        self.service = service
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        if self.socket_path.exists():
+            if ServiceClient.is_running(self.socket_path):
+                raise ServiceError(f"A conversion service is already running on {self.socket_path}")
+            self.socket_path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class ServiceClient:
+    """Submits jobs to a running conversion service and follows their progress."""
+
+    def __init__(self, socket_path=None, timeout=5.0):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.timeout = timeout
+
+    @staticmethod
+    def is_running(socket_path=None):
+        """Returns True if a service answers on socket_path."""
+        try:
+            ServiceClient(socket_path, timeout=1.0).status()
+        except (OSError, ServiceError):
+            return False
+        return True
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _read_reply(reader):
+        line = reader.readline()
+        if not line:
+            raise ServiceError("The conversion service closed the connection")
+        reply = json.loads(line)
+        if not reply.get('ok', True):
+            raise ServiceError(reply.get('error', 'unknown error'))
+        return reply
+
+    def request(self, request):
+        """Sends one request and returns the reply. Raises ServiceError if it failed."""
+        with self._connect() as sock, sock.makefile('rwb') as stream:
+            stream.write(json.dumps(request).encode() + b'\n')
+            stream.flush()
+            return self._read_reply(stream)
+
+    def submit(self, source_path, destination_path, map_file_path=None, **options):
+        """Submits a job and returns its id. Paths are made absolute for the service."""
+        job = {'source_path': str(Path(source_path).absolute()),
+               'destination_path': str(Path(destination_path).absolute())}
+        if map_file_path:
+            job['map_file_path'] = str(Path(map_file_path).absolute())
+        job.update(options)
+        return self.request({'op': 'submit', 'job': job})['id']
+
+    def status(self, job_id=None):
+        """Returns the summary of one job, or of every job when job_id is None."""
+        if job_id is None:
+            return self.request({'op': 'status'})['jobs']
+        return self.request({'op': 'status', 'id': job_id})['job']
+
+    def cancel(self, job_id):
+        return self.request({'op': 'cancel', 'id': job_id})['job']
+
+    def stream(self, job_id):
+        """Yields the events of a job until it finishes."""
+        with self._connect() as sock, sock.makefile('rwb') as stream:
+            # Jobs can run for a long time between events.
+            sock.settimeout(None)
+            stream.write(json.dumps({'op': 'stream', 'id': job_id}).encode() + b'\n')
+            stream.flush()
+            self._read_reply(stream)
+            for line in stream:
+                event = json.loads(line)
+                yield event
+                if event['event'] == 'finished':
+                    return
+        raise ServiceError("The conversion service closed the connection")
+
+
+class RemoteConverterLogic(QObject):
+    """Drop-in replacement for CursorConverterLogic that runs conversions in the service."""
+    status_update = pyqtSignal(str)
+    finished = pyqtSignal(bool)
+    progress_update = pyqtSignal(int)
+    timing_event = pyqtSignal(dict)
+
+    def __init__(self, socket_path=None, parent=None):
+        super().__init__(parent)
+        self.client = ServiceClient(socket_path)
+        self.job = None
+        self.job_id = None
+        self._cancel_requested = False
+
+    def set_conversion_parameters(self, source_path, destination_path, map_file_path, zip_theme, install_theme,
+                                  **options):
+        """Takes the same parameters as CursorConverterLogic, except those the service decides itself.
+
+        Raises ServiceError for parameters that cannot be sent to the service, such as executor.
+        """
+        unsupported = set(options) - set(JOB_OPTIONS)
+        if unsupported:
+            raise ServiceError(f"not supported by the conversion service: {', '.join(sorted(unsupported))}")
+        self.job = dict(options, source_path=source_path, destination_path=destination_path,
+                        map_file_path=map_file_path, zip_theme=zip_theme, install_theme=install_theme)
+
+    def run_conversion(self):
+        try:
+            self.job_id = self.client.submit(**self.job)
+            self.status_update.emit(f"Submitted job {self.job_id} to the conversion service.")
+            if self._cancel_requested:
+                self.cancel()
+            for event in self.client.stream(self.job_id):
+                if event['event'] == 'status':
+                    self.status_update.emit(event['message'])
+                elif event['event'] == 'progress':
+                    self.progress_update.emit(event['value'])
+                elif event['event'] == 'finished':
+                    self.finished.emit(event['success'])
+                    return
+        except (OSError, ValueError, ServiceError) as e:
+            self.status_update.emit(f"Conversion service error: {e}")
+        self.finished.emit(False)
+
+    def cancel(self):
+        """Asks the service to stop the submitted job. Safe to call from any thread."""
+        self._cancel_requested = True
+        if self.job_id is None:
+            return
+        try:
+            self.client.cancel(self.job_id)
+        except (OSError, ServiceError) as e:
+            self.status_update.emit(f"Conversion service error: {e}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='colorcursor-converter-service',
+                                     description='Run or talk to the background cursor conversion service.')
+    parser.add_argument('--socket', default=None, help=f'Socket path (default: {default_socket_path()}).')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Run the service in the foreground.')
+    serve.add_argument('--jobs', type=int, default=2, help='Themes converted at the same time (default: 2).')
+    serve.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Size of the shared cursor conversion pool (default: CPU count).')
+
+    submit = commands.add_parser('submit', help='Submit a theme for conversion.')
+    submit.add_argument('source_dir', help='Directory containing the Windows theme.')
+    submit.add_argument('-o', '--output', required=True, help='Directory that receives the converted theme.')
+    submit.add_argument('-m', '--map', default=None, help='Cursor map JSON file.')
+    submit.add_argument('--zip', action='store_true', help='Archive the converted theme.')
+    submit.add_argument('--install', action='store_true', help='Install the theme into ~/.icons.')
+    submit.add_argument('--backend', choices=BACKENDS, default='auto', help='Conversion backend.')
+    submit.add_argument('--incremental', action='store_true', help='Only rebuild outputs whose inputs changed.')
+    submit.add_argument('--sizes', type=parse_sizes, default=(), metavar='N[,N...]',
+                        help='Extra nominal sizes to include in every cursor.')
+    submit.add_argument('--wait', action='store_true', help='Print progress and wait for the job to finish.')
+
+    status = commands.add_parser('status', help='Show one job or all jobs.')
+    status.add_argument('id', nargs='?', help='Job id.')
+
+    cancel = commands.add_parser('cancel', help='Cancel a queued or running job.')
+    cancel.add_argument('id', help='Job id.')
+
+    stream = commands.add_parser('stream', help='Print the progress of a job until it finishes.')
+    stream.add_argument('id', help='Job id.')
+    return parser
+
+
+def _follow(client, job_id):
+    """Prints the events of a job and returns the exit code."""
+    for event in client.stream(job_id):
+        if event['event'] == 'status':
+            print(event['message'], flush=True)
+        elif event['event'] == 'finished':
+            print(f"Job {job_id} {event['state']}.")
+            return EXIT_OK if event['success'] else EXIT_FAILED
+    return EXIT_FAILED
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    socket_path = args.socket or default_socket_path()
+
+    if args.command == 'serve':
+        if args.jobs < 1 or args.workers < 1:
+            print("Error: --jobs and --workers must be at least 1.", file=sys.stderr)
+            return EXIT_USAGE
+        service = ConversionService(args.jobs, args.workers)
+        try:
+            server = ServiceServer(socket_path, service)
+        except ServiceError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        print(f"Conversion service listening on {socket_path} "
+              f"({args.jobs} job(s), {args.workers} worker(s)).", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.shutdown()
+        return EXIT_OK
+
+    client = ServiceClient(socket_path)
+    try:
+        if args.command == 'submit':
+            source_dir = Path(args.source_dir)
+            job_id = client.submit(source_dir, Path(args.output) / source_dir.name, args.map,
+                                   zip_theme=args.zip, install_theme=args.install, backend=args.backend,
+                                   incremental=args.incremental, sizes=list(args.sizes))
+            print(job_id, flush=True)
+            return _follow(client, job_id) if args.wait else EXIT_OK
+        if args.command == 'status':
+            print(json.dumps(client.status(args.id), indent=2))
+        elif args.command == 'cancel':
+            print(f"Cancel requested for job {client.cancel(args.id)['id']}.")
+        elif args.command == 'stream':
+            return _follow(client, args.id)
+    except (OSError, ServiceError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
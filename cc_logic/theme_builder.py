@@ -1,56 +1,263 @@
+import hashlib
 import json
+import os
 import shutil
+import threading
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 
+class CompiledCursorMap:
+    """A validated cursor map with a reverse index from alias to source cursor.
+
+    Each alias is claimed by exactly one entry. The first alias of an entry
+    is its primary file and takes precedence over aliases of other entries;
+    otherwise the first entry in map order wins. Conflicts and aliases
+    repeated within one entry are recorded rather than resolved silently.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.type_errors = []
+        self.entries = {}
+        self.duplicates = []
+        self.conflicts = []
+        self.index = {}
+        self.primary_of = {}
+        self.aliases_of = {}
+
+        for asset, value in raw.items():
+            if not isinstance(value, str):
+                self.type_errors.append((asset, type(value).__name__))
+                continue
+            aliases = []
+            for alias in value.split():
+                if alias in aliases:
+                    self.duplicates.append((asset, alias))
+                else:
+                    aliases.append(alias)
+            self.entries[asset] = tuple(aliases)
+
+        for asset, aliases in self.entries.items():
+            if aliases:
+                self._claim(aliases[0], asset)
+        for asset, aliases in self.entries.items():
+            for alias in aliases[1:]:
+                self._claim(alias, asset)
+
+        for alias, asset in self.index.items():
+            self.primary_of.setdefault(asset, alias)
+        # Keep the entry's own first alias as primary whenever it won it.
+        for asset, aliases in self.entries.items():
+            if aliases and self.index.get(aliases[0]) == asset:
+                self.primary_of[asset] = aliases[0]
+        for alias, asset in self.index.items():
+            self.aliases_of.setdefault(asset, []).append(alias)
+
+    def _claim(self, alias, asset):
+        owner = self.index.setdefault(alias, asset)
+        if owner != asset:
+            self.conflicts.append((alias, owner, asset))
+
+
+_compiled_maps = {}
+_compiled_maps_lock = threading.Lock()
+
+
+def load_compiled_map(map_file_path):
+    """Returns (CompiledCursorMap, from_cache) for a cursor map JSON file.
+
+    Compiled maps are cached per path and reused while the file's mtime and
+    size are unchanged, or while its content hash still matches.
+    """
+    path = os.path.abspath(map_file_path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _compiled_maps_lock:
+        cached = _compiled_maps.get(path)
+    if cached and cached[0] == stamp:
+        return cached[2], True
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached and cached[1] == digest:
+        compiled = cached[2]
+        from_cache = True
+    else:
+        raw = json.loads(data)
+        if not isinstance(raw, dict):
+            raise ValueError("The cursor map must be a JSON object.")
+        compiled = CompiledCursorMap(raw)
+        from_cache = False
+    with _compiled_maps_lock:
+        _compiled_maps[path] = (stamp, digest, compiled)
+    return compiled, from_cache
+
+
 class ThemeBuilder(QObject):
     status_update = pyqtSignal(str)
+
+    LINK_STRATEGIES = ('symlink', 'hardlink', 'copy')
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.cursor_map = {}
+        self.compiled_map = CompiledCursorMap({})
+        self.bytes_written = 0
+        self._linking = None
 
     def load_cursor_map(self, map_file_path, required_files):
         """Loads and validates cursor mapping from a JSON file."""
         self.status_update.emit("Loading cursor mapping from file...")
         try:
-            with open(map_file_path, 'r') as f:
-                self.cursor_map = json.load(f)
-            
-            self.status_update.emit("Validating cursor map content...")
-            
-            for f in required_files:
-                if f not in self.cursor_map:
-                    self.status_update.emit(f"Error: Missing required cursor map entry for '{f}'.")
-                    return False
-            
-            for key, value in self.cursor_map.items():
-                if not isinstance(value, str):
-                    self.status_update.emit(f"Error: The value for key '{key}' is not a string. Found type: {type(value).__name__}.")
-                    return False
-            
-            self.status_update.emit("Cursor mapping loaded and validated successfully.")
-            return True
+            compiled, from_cache = load_compiled_map(map_file_path)
         except json.JSONDecodeError as e:
             self.status_update.emit(f"Error: Failed to parse JSON from '{map_file_path}'. Please check the file's format. Details: {e}")
             return False
+        except ValueError as e:
+            self.status_update.emit(f"Error: {e}")
+            return False
 
-    def copy_assets(self, dest_dir):
-        """Creates symbolic links for the converted cursors."""
-        self.status_update.emit("Copying and linking cursor assets...")
-        cursor_dir = dest_dir / 'cursors'
-        cursor_dir.mkdir(exist_ok=True)
+        if from_cache:
+            self.status_update.emit("Cursor map unchanged since last load, reusing compiled map.")
+        self.status_update.emit("Validating cursor map content...")
         
-        for asset, cursor_names in self.cursor_map.items():
-            source_file = dest_dir / asset
-            if not source_file.exists():
+        for f in required_files:
+            if f not in compiled.raw:
+                self.status_update.emit(f"Error: Missing required cursor map entry for '{f}'.")
+                return False
+        
+        for key, type_name in compiled.type_errors:
+            self.status_update.emit(f"Error: The value for key '{key}' is not a string. Found type: {type_name}.")
+            return False
+
+        for asset, alias in compiled.duplicates:
+            self.status_update.emit(f"Warning: '{alias}' is listed more than once for '{asset}'.")
+        for alias, owner, other in compiled.conflicts:
+            self.status_update.emit(f"Warning: '{alias}' is claimed by both '{owner}' and '{other}'. Using '{owner}'.")
+
+        self.cursor_map = compiled.raw
+        self.compiled_map = compiled
+        self.status_update.emit("Cursor mapping loaded and validated successfully.")
+        return True
+
+    def copy_assets(self, dest_dir, link_strategy='symlink', previous_links=None, changed_assets=None):
+        """Creates symbolic links for the converted cursors.
+
+        The primary alias of each entry (see CompiledCursorMap) receives the
+        converted file and every other alias is written exactly once, pointing
+        at it using the given link_strategy:
+        'symlink' (relative symlinks), 'hardlink' or 'copy'.
+
+        previous_links is the mapping returned by an earlier call for the same
+        directory. When it is given, only aliases that changed or belong to one
+        of changed_assets are rewritten, and aliases no longer in the map are
+        removed. Returns the alias -> asset mapping now present in cursors/.
+        """
+        self.begin_linking(dest_dir, link_strategy, previous_links, changed_assets)
+        return self.finish_linking()
+
+    def begin_linking(self, dest_dir, link_strategy='symlink', previous_links=None, changed_assets=None,
+                      rewrite_aliases=False):
+        """Prepares to link converted cursors one at a time with link_asset.
+
+        Takes the same arguments as copy_assets. With rewrite_aliases, the
+        aliases of unchanged cursors are written again too, e.g. because the
+        link strategy changed. finish_linking links whatever was not passed to
+        link_asset and returns the alias -> asset mapping.
+        """
+        if link_strategy not in self.LINK_STRATEGIES:
+            raise ValueError(f"Unknown link strategy '{link_strategy}'.")
+
+        self.status_update.emit(f"Copying and linking cursor assets ({link_strategy})...")
+        self._linking = {
+            'dest_dir': dest_dir,
+            'cursor_dir': dest_dir / 'cursors',
+            'strategy': link_strategy,
+            'incremental': previous_links is not None,
+            'previous': previous_links or {},
+            'rewrite': rewrite_aliases,
+            'changed': set(self.cursor_map) if changed_assets is None else set(changed_assets),
+            'linked': set(),
+            'written': 0,
+        }
+        self._linking['cursor_dir'].mkdir(exist_ok=True)
+        self.bytes_written = 0
+
+    def link_asset(self, asset):
+        """Moves one converted cursor into cursors/ under its primary alias and writes its other aliases.
+
+        Returns False if the converted file does not exist or the cursor has no aliases.
+        """
+        state = self._linking
+        intermediate = state['dest_dir'] / asset
+        if asset not in self.compiled_map.primary_of or not intermediate.exists():
+            return False
+        cursor_dir = state['cursor_dir']
+        primary_name = self.compiled_map.primary_of[asset]
+        primary = cursor_dir / primary_name
+        self._remove_existing(primary)
+        os.replace(intermediate, primary)
+        state['written'] += 1
+        state['linked'].add(asset)
+
+        for cursor_name in self.compiled_map.aliases_of.get(asset, ()):
+            if cursor_name != primary_name:
+                self._write_alias(cursor_dir / cursor_name, primary, state['strategy'])
+                state['written'] += 1
+        return True
+
+    def _write_alias(self, dest_file, primary, link_strategy):
+        self._remove_existing(dest_file)
+        if link_strategy == 'symlink':
+            # Relative target so the theme can be moved, zipped or installed as-is.
+            dest_file.symlink_to(primary.name)
+        elif link_strategy == 'hardlink':
+            os.link(primary, dest_file)
+        else:
+            shutil.copy2(primary, dest_file)
+            self.bytes_written += dest_file.stat().st_size
+
+    def finish_linking(self):
+        """Links the remaining cursors, removes stale aliases and returns the alias -> asset mapping."""
+        state = self._linking
+        cursor_dir = state['cursor_dir']
+        incremental = state['incremental']
+        previous_links = state['previous']
+
+        available_assets = set()
+        for asset, primary_name in self.compiled_map.primary_of.items():
+            if asset in state['linked'] or (asset in state['changed'] and self.link_asset(asset)):
+                available_assets.add(asset)
+            elif asset not in state['changed'] and incremental and os.path.lexists(cursor_dir / primary_name):
+                # Unchanged cursor: only aliases that moved to it need writing, unless all are rewritten.
+                available_assets.add(asset)
+                primary = cursor_dir / primary_name
+                for cursor_name in self.compiled_map.aliases_of.get(asset, ()):
+                    if cursor_name != primary_name and (state['rewrite'] or previous_links.get(cursor_name) != asset):
+                        self._write_alias(cursor_dir / cursor_name, primary, state['strategy'])
+                        state['written'] += 1
+            else:
                 self.status_update.emit(f"Warning: Converted file '{asset}' not found. Skipping links.")
-                continue
 
-            for cursor_name in cursor_names.split():
-                dest_file = cursor_dir / cursor_name
-                shutil.copy2(source_file, dest_file)
+        links = {alias: asset for alias, asset in self.compiled_map.index.items() if asset in available_assets}
+
+        removed = 0
+        for cursor_name in previous_links:
+            if cursor_name not in links:
+                self._remove_existing(cursor_dir / cursor_name)
+                removed += 1
+
+        if incremental:
+            self.status_update.emit(f"Updated {state['written']} cursor file(s) and removed {removed} stale alias(es).")
         self.status_update.emit("Assets successfully copied and linked.")
+        self._linking = None
+        return links
+
+    @staticmethod
+    def _remove_existing(path):
+        if path.is_symlink() or path.exists():
+            path.unlink()
 
     def build_theme_files(self, dest_dir):
         """Creates the cursor.theme and index.theme files."""
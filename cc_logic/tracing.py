@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    """Collects timing events for pipeline stages and individual files.
+
+    Each event is a dict with name, category, start, end and duration (in
+    seconds relative to the tracer's creation), thread id and byte counters.
+    Listeners are called for every finished event on the recording thread.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    def record(self, event):
+        """Adds a finished event and notifies listeners."""
+        with self._lock:
+            self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+
+    @staticmethod
+    def make_event(name, category, start, end, bytes_read=0, bytes_written=0, **args):
+        return {
+            'name': name,
+            'category': category,
+            'start': start,
+            'end': end,
+            'duration': end - start,
+            'thread': threading.get_ident(),
+            'bytes_read': bytes_read,
+            'bytes_written': bytes_written,
+            'args': args,
+        }
+
+    @contextmanager
+    def stage(self, name, category='stage', **args):
+        """Times the enclosed block. The yielded dict may set bytes_read/bytes_written."""
+        counters = {'bytes_read': 0, 'bytes_written': 0}
+        start = self.now()
+        try:
+            yield counters
+        finally:
+            self.record(self.make_event(name, category, start, self.now(), **counters, **args))
+
+    def export_json(self, path):
+        """Writes all events as a plain JSON document."""
+        with open(path, 'w') as f:
+            json.dump({'events': self.events}, f, indent=2)
+
+    def export_chrome_trace(self, path):
+        """Writes all events in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        trace_events = []
+        for event in self.events:
+            trace_events.append({
+                'name': event['name'],
+                'cat': event['category'],
+                'ph': 'X',
+                'ts': round(event['start'] * 1e6),
+                'dur': round(event['duration'] * 1e6),
+                'pid': os.getpid(),
+                'tid': event['thread'],
+                'args': dict(event['args'], bytes_read=event['bytes_read'], bytes_written=event['bytes_written']),
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, path, trace_format='chrome'):
+        if trace_format == 'chrome':
+            self.export_chrome_trace(path)
+        elif trace_format == 'json':
+            self.export_json(path)
+        else:
+            raise ValueError(f"Unknown trace format '{trace_format}'.")
+
+
+class ProgressTracker:
+    """Turns completed units of work into a 0-100 percentage."""
+
+    def __init__(self, callback, total=1):
+        self.callback = callback
+        self.total = max(total, 1)
+        self.done = 0
+        self._last = -1
+
+    def set_total(self, total):
+        self.total = max(total, self.done, 1)
+        self._emit()
+
+    def advance(self, units=1):
+        self.done = min(self.done + units, self.total)
+        self._emit()
+
+    def _emit(self):
+        percent = int(100 * self.done / self.total)
+        if percent != self._last:
+            self._last = percent
+            self.callback(percent)
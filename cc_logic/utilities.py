@@ -1,30 +1,309 @@
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import glob
+import json
+import os
 import shutil
+import stat
+import tempfile
+import time
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 
+from .archive import ThemeArchive, archive_path
+from .manifest import BuildManifest, hash_file
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 class Utilities(QObject):
     status_update = pyqtSignal(str)
 
+    # Checksums of the installed files, kept inside the installed theme.
+    INSTALL_MANIFEST = '.ccpy-install.json'
+    # Without file locks, younger leftovers may belong to an install that is still running.
+    STALE_LEFTOVER_AGE = 24 * 60 * 60
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        # Byte counters of the most recent zip or install operation.
+        self.bytes_read = 0
+        self.bytes_written = 0
     
-    def zip_theme(self, dest_dir):
-        """Zips the theme directory."""
-        self.status_update.emit("Zipping theme...")
+    def archive_theme(self, dest_dir, archive_format='zip', level=None, workers=1):
+        """Streams the finished theme directory into an archive next to it, storing identical files once."""
+        try:
+            archive = self.open_archive(dest_dir, archive_format, level, workers)
+        except Exception as e:
+            self.status_update.emit(f"Failed to archive theme: {e}")
+            return False
+        return self.finish_archive(archive, dest_dir)
+
+    def open_archive(self, dest_dir, archive_format='zip', level=None, workers=1):
+        """Starts an archive next to the theme directory, so files can be added while the theme is built."""
+        self.status_update.emit(f"Archiving theme as {archive_format}...")
+        self.bytes_read = self.bytes_written = 0
+        archive = ThemeArchive(archive_path(dest_dir, archive_format), archive_format, level, workers)
+        archive.open()
+        return archive
+
+    @staticmethod
+    def add_to_archive(archive, dest_dir, path):
+        """Adds one file of the theme in dest_dir to an archive from open_archive."""
+        archive.add_path(path, path.relative_to(dest_dir.parent).as_posix())
+
+    def finish_archive(self, archive, dest_dir):
+        """Adds the theme files that are not in the archive yet and moves it into place."""
         try:
-            shutil.make_archive(dest_dir, 'zip', root_dir=dest_dir.parent, base_dir=dest_dir.name)
-            self.status_update.emit(f"Successfully zipped theme to {dest_dir}.zip")
+            for root, dirs, files in os.walk(dest_dir):
+                dirs.sort()
+                for name in sorted(files):
+                    if name == BuildManifest.FILENAME:
+                        continue
+                    file_path = Path(root) / name
+                    if file_path.relative_to(dest_dir.parent).as_posix() not in archive.members:
+                        self.add_to_archive(archive, dest_dir, file_path)
+            archive.close()
         except Exception as e:
-            self.status_update.emit(f"Failed to zip theme: {e}")
+            archive.close(discard=True)
+            self.status_update.emit(f"Failed to archive theme: {e}")
+            return False
+        self.bytes_read = archive.bytes_read
+        self.bytes_written = archive.bytes_written
+        if archive.duplicates:
+            self.status_update.emit(f"Stored {archive.duplicates} duplicate file(s) as links, "
+                                    f"saving {archive.duplicate_bytes / 1024:.1f} KiB before compression.")
+        self.status_update.emit(f"Successfully archived theme to {archive.path}")
+        return True
+
+    def zip_theme(self, dest_dir):
+        """Zips the theme directory, storing symbolic links as link entries."""
+        return self.archive_theme(dest_dir, 'zip')
+
+    @staticmethod
+    def installed_theme_path(dest_dir):
+        """Returns where install_theme puts the theme built in dest_dir."""
+        return Path.home() / '.icons' / dest_dir.name
 
     def install_theme(self, dest_dir):
-        """Installs the theme by copying it to ~/.icons/."""
+        """Installs the theme into ~/.icons/, replacing any earlier version atomically.
+
+        The new version is assembled in a staging directory next to the
+        installed theme. Files whose checksum matches the installed copy are
+        hard-linked from it instead of copied, then the staging directory is
+        swapped into place with a single rename.
+        """
         self.status_update.emit("Installing theme...")
+        self.bytes_read = self.bytes_written = 0
+        staging = None
         try:
-            icons_dir = Path.home() / '.icons'
+            target = self.installed_theme_path(dest_dir)
+            icons_dir = target.parent
             icons_dir.mkdir(parents=True, exist_ok=True)
-            
-            shutil.copytree(dest_dir, icons_dir / dest_dir.name, dirs_exist_ok=True)
-            self.status_update.emit(f"Successfully installed theme to {icons_dir / dest_dir.name}")
+            with self._install_lock(icons_dir, target.name) as locked:
+                # Under the lock no other install of this theme is running, so every leftover is stale.
+                self._remove_leftovers(icons_dir, target.name, None if locked else self.STALE_LEFTOVER_AGE)
+
+                listing = self._list_theme(dest_dir)
+                previous = self._load_install_manifest(target)
+                if previous == listing and self._matches_listing(target, listing):
+                    self.status_update.emit(f"Installed theme at {target} is already up to date.")
+                    return True
+
+                staging = Path(tempfile.mkdtemp(dir=icons_dir, prefix=f".{target.name}.ccpy-staging-"))
+                reused = self._stage_theme(dest_dir, target, staging, listing, previous or {})
+                with open(staging / self.INSTALL_MANIFEST, 'w') as f:
+                    json.dump(listing, f, indent=2, sort_keys=True)
+                os.chmod(staging, 0o755)
+
+                self._swap_into_place(staging, target)
+                staging = None
+            self.status_update.emit(f"Successfully installed theme to {target} ({reused} unchanged file(s) reused, "
+                                    f"{self.bytes_written / 1024:.1f} KiB copied).")
+            return True
         except Exception as e:
-            self.status_update.emit(f"Failed to install theme: {e}")
\ No newline at end of file
+            self.status_update.emit(f"Failed to install theme: {e}")
+            return False
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    @contextlib.contextmanager
+    def _install_lock(self, icons_dir, name):
+        """Holds an exclusive lock on installing the theme called name.
+
+        Yields False, without locking, where file locks are not supported.
+        """
+        if fcntl is None:
+            yield False
+            return
+        with open(icons_dir / f".{name}.ccpy-lock", 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.status_update.emit(f"Waiting for another install of {name} to finish...")
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield True
+
+    def _list_theme(self, dest_dir):
+        """Describes every directory, file (with checksum) and symbolic link of a built theme."""
+        listing = {'format': 1, 'dirs': [], 'files': {}, 'links': {}}
+        for root, dirs, files in os.walk(dest_dir):
+            dirs.sort()
+            root = Path(root)
+            for name in dirs:
+                path = root / name
+                if path.is_symlink():
+                    listing['links'][path.relative_to(dest_dir).as_posix()] = os.readlink(path)
+                else:
+                    listing['dirs'].append(path.relative_to(dest_dir).as_posix())
+            for name in sorted(files):
+                if name == BuildManifest.FILENAME:
+                    continue
+                path = root / name
+                relative = path.relative_to(dest_dir).as_posix()
+                st = os.lstat(path)
+                if stat.S_ISLNK(st.st_mode):
+                    listing['links'][relative] = os.readlink(path)
+                else:
+                    self.bytes_read += st.st_size
+                    listing['files'][relative] = {'sha256': hash_file(path), 'size': st.st_size, 
+                                                  'mode': stat.S_IMODE(st.st_mode)}
+        return listing
+
+    def _load_install_manifest(self, target):
+        try:
+            return json.loads((target / self.INSTALL_MANIFEST).read_text())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _matches_listing(target, listing):
+        """Cheaply checks that target holds exactly the entries of listing, with the recorded sizes."""
+        expected = set(listing['dirs']) | set(listing['files']) | set(listing['links'])
+        expected.add(Utilities.INSTALL_MANIFEST)
+        found = set()
+        try:
+            for root, dirs, files in os.walk(target):
+                for name in dirs + files:
+                    found.add((Path(root) / name).relative_to(target).as_posix())
+            if found != expected:
+                return False
+            for relative, entry in listing['files'].items():
+                if os.lstat(target / relative).st_size != entry['size']:
+                    return False
+            for relative, link in listing['links'].items():
+                if os.readlink(target / relative) != link:
+                    return False
+        except OSError:
+            return False
+        return True
+
+    def _stage_theme(self, dest_dir, target, staging, listing, previous):
+        """Fills staging with the theme. Returns the number of files reused from target."""
+        for relative in listing['dirs']:
+            (staging / relative).mkdir(parents=True, exist_ok=True)
+
+        reused = 0
+        previous_files = previous.get('files', {})
+        staged_inodes = {}
+        for relative, entry in listing['files'].items():
+            src = dest_dir / relative
+            dst = staging / relative
+            # Files hard-linked in the build stay hard-linked in the installed theme.
+            st = os.stat(src)
+            first = staged_inodes.setdefault((st.st_dev, st.st_ino), dst) if st.st_nlink > 1 else dst
+            if first != dst:
+                os.link(first, dst)
+                continue
+            old = previous_files.get(relative)
+            if old is not None and old['sha256'] == entry['sha256'] and old['mode'] == entry['mode']:
+                try:
+                    os.link(target / relative, dst)
+                    reused += 1
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(src, dst)
+            self.bytes_written += entry['size']
+
+        for relative, link in listing['links'].items():
+            os.symlink(link, staging / relative)
+        return reused
+
+    def _swap_into_place(self, staging, target):
+        """Moves staging to target so that target is never missing or half-written."""
+        if not os.path.lexists(target):
+            os.rename(staging, target)
+            return
+        if _exchange_paths(staging, target):
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        # Without renameat2 the old theme is moved aside first; the theme is
+        # briefly absent but never partially written.
+        retired = Path(tempfile.mkdtemp(dir=target.parent, prefix=f".{target.name}.ccpy-old-"))
+        os.rename(target, retired / target.name)
+        os.rename(staging, target)
+        shutil.rmtree(retired, ignore_errors=True)
+
+    @staticmethod
+    def _remove_leftovers(icons_dir, name, min_age=None):
+        """Removes directories left behind by an interrupted install.
+
+        Only directories last modified at least min_age seconds ago are removed if it is set.
+        """
+        now = time.time()
+        for kind in ('staging', 'old'):
+            # mkdtemp adds eight random characters to the prefix.
+            for leftover in icons_dir.glob(f".{glob.escape(name)}.ccpy-{kind}-????????"):
+                try:
+                    if min_age is not None and now - leftover.stat().st_mtime < min_age:
+                        continue
+                except OSError:
+                    continue
+                shutil.rmtree(leftover, ignore_errors=True)
+
+
+def _exchange_paths(first, second):
+    """Atomically swaps two paths with renameat2(RENAME_EXCHANGE). Returns False if unsupported."""
+    libc = _libc()
+    renameat2 = getattr(libc, 'renameat2', None) if libc is not None else None
+    if renameat2 is None:
+        return False
+    result = renameat2(_AT_FDCWD, os.fsencode(first), _AT_FDCWD, os.fsencode(second), _RENAME_EXCHANGE)
+    if result != 0:
+        error = ctypes.get_errno()
+        if error in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+            return False
+        raise OSError(error, os.strerror(error), str(second))
+    return True
+
+
+def _libc():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        return None
+
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def destination_conflict(source_dir, dest_dir):
+    """Returns why a theme cannot be built from source_dir into dest_dir, or None if it can.
+
+    A full build deletes dest_dir first, so it must not be, be inside or contain source_dir.
+    """
+    source_res, dest_res = Path(source_dir).resolve(), Path(dest_dir).resolve()
+    if source_res == dest_res:
+        return "Source and destination directories cannot be the same."
+    if source_res in dest_res.parents:
+        return "Destination directory cannot be a subfolder of the source directory."
+    if dest_res in source_res.parents:
+        return "Destination directory cannot contain the source directory."
+    return None
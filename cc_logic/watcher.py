@@ -0,0 +1,266 @@
+"""Watch mode: rebuilds and reinstalls a theme whenever its source cursors or cursor map change."""
+import argparse
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .backends import BACKENDS
+from .cli import DEFAULT_MAP_FILE, EXIT_OK, EXIT_USAGE, parse_sizes
+from .main_logic import CursorConverterLogic
+from .theme_builder import ThemeBuilder
+from .utilities import _libc, destination_conflict
+
+# inotify(7) constants.
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+class InotifyWatcher:
+    """Reports files changed in a set of directories using Linux inotify."""
+    EVENT_HEADER = struct.Struct('iIII')
+    # Completed writes and renames only, so half-written files are never reported.
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_ATTRIB
+
+    def __init__(self, directories):
+        libc = _libc()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        self.directories = {}
+        try:
+            for directory in directories:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+                if wd < 0:
+                    error = ctypes.get_errno()
+                    raise OSError(error, f"Cannot watch {directory}: {os.strerror(error)}")
+                self.directories[wd] = Path(directory)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    @staticmethod
+    def is_available():
+        """Returns True if inotify can be used on this platform."""
+        libc = _libc() if sys.platform.startswith('linux') else None
+        return libc is not None and hasattr(libc, 'inotify_init1')
+
+    def wait(self, timeout):
+        """Waits up to timeout seconds and returns the set of changed paths."""
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if wd in self.directories and name:
+                    changed.add(self.directories[wd] / os.fsdecode(name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Reports files changed in a set of directories by comparing periodic snapshots."""
+    INTERVAL = 0.25
+
+    def __init__(self, directories, interval=INTERVAL):
+        self.directories = [Path(directory) for directory in directories]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        snapshot[Path(entry.path)] = (st.st_mtime_ns, st.st_size, st.st_mode)
+            except OSError:
+                continue
+        return snapshot
+
+    def wait(self, timeout):
+        """Waits up to timeout seconds and returns the set of changed paths."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class ThemeWatcher(QObject):
+    """Keeps a converted theme in sync with its sources.
+
+    After an initial build, the source directory and the cursor map are
+    watched. Bursts of changes are collected until no event arrives for
+    debounce seconds, then the configured CursorConverterLogic runs an
+    incremental build, which reconverts, relinks and reinstalls only the
+    cursors that changed.
+    """
+    status_update = pyqtSignal(str)
+    rebuilt = pyqtSignal(bool)
+
+    DEBOUNCE = 0.1
+
+    def __init__(self, logic, use_inotify=True, debounce=DEBOUNCE, poll_interval=PollingWatcher.INTERVAL, parent=None):
+        super().__init__(parent)
+        self.logic = logic
+        self.use_inotify = use_inotify
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._results = []
+        self.logic.finished.connect(self._results.append)
+
+    def stop(self):
+        """Makes run() return after the current build."""
+        self._stop.set()
+
+    def _is_relevant(self, path):
+        if path == Path(self.logic.map_file_path).absolute():
+            return True
+        return path.parent == Path(self.logic.source_path).absolute() and path.suffix.lower() in ('.cur', '.ani')
+
+    def _create_watcher(self):
+        directories = {Path(self.logic.source_path).absolute(), Path(self.logic.map_file_path).absolute().parent}
+        if self.use_inotify and InotifyWatcher.is_available():
+            try:
+                return InotifyWatcher(directories)
+            except OSError as e:
+                self.status_update.emit(f"inotify is unavailable ({e}), falling back to polling.")
+        return PollingWatcher(directories, self.poll_interval)
+
+    def rebuild(self, changed=()):
+        """Runs one incremental build. Returns True on success."""
+        self._results.clear()
+        self.logic.incremental = True
+        start = time.perf_counter()
+        self.logic.run_conversion()
+        # The environment only needs re-checking for the first build.
+        self.logic.dependencies_manager.refresh_environment = False
+        success = bool(self._results and self._results[0])
+        names = ', '.join(sorted(path.name for path in changed))
+        self.status_update.emit(f"{'Rebuilt' if success else 'Rebuild failed'} in {time.perf_counter() - start:.2f}s"
+                                + (f" (changed: {names})." if names else "."))
+        self.rebuilt.emit(success)
+        return success
+
+    def run(self):
+        """Builds the theme, then rebuilds it on every change until stop() is called."""
+        watcher = self._create_watcher()
+        try:
+            self.rebuild()
+            self.status_update.emit(f"Watching {self.logic.source_path} and {self.logic.map_file_path} "
+                                    f"({'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'})...")
+            while not self._stop.is_set():
+                changed = {path for path in watcher.wait(0.5) if self._is_relevant(path)}
+                if not changed:
+                    continue
+                while True:
+                    more = {path for path in watcher.wait(self.debounce) if self._is_relevant(path)}
+                    if not more:
+                        break
+                    changed |= more
+                self.rebuild(changed)
+        finally:
+            watcher.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='colorcursor-converter-watch',
+        description='Convert a Windows cursor theme and keep the Linux theme in sync while its files are edited.')
+    parser.add_argument('source_dir', help='Directory containing the Windows theme.')
+    parser.add_argument('-o', '--output', required=True, help='Directory that receives the converted theme.')
+    parser.add_argument('-m', '--map', default=str(DEFAULT_MAP_FILE), help='Cursor map JSON file.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Conversion workers (default: CPU count).')
+    parser.add_argument('--no-install', action='store_true', help='Do not reinstall the theme into ~/.icons.')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Conversion backend.')
+    parser.add_argument('--link-strategy', choices=ThemeBuilder.LINK_STRATEGIES, default='symlink',
+                        help='How cursor aliases are written.')
+    parser.add_argument('--sizes', type=parse_sizes, default=(), metavar='N[,N...]',
+                        help='Extra nominal sizes to include in every cursor.')
+    parser.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify.')
+    parser.add_argument('--debounce', type=int, default=int(ThemeWatcher.DEBOUNCE * 1000), metavar='MS',
+                        help='Wait until no change arrives for MS milliseconds before rebuilding.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every status message.')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    source_dir = Path(args.source_dir)
+    if not source_dir.is_dir():
+        print(f"Error: Source directory does not exist: {source_dir}", file=sys.stderr)
+        return EXIT_USAGE
+    if not Path(args.map).is_file():
+        print(f"Error: Cursor map file does not exist: {args.map}", file=sys.stderr)
+        return EXIT_USAGE
+    dest_dir = Path(args.output) / source_dir.name
+    conflict = destination_conflict(source_dir, dest_dir)
+    if conflict:
+        print(f"Error: {conflict}", file=sys.stderr)
+        return EXIT_USAGE
+
+    logic = CursorConverterLogic()
+    logic.set_conversion_parameters(str(source_dir), str(dest_dir), args.map,
+                                    False, not args.no_install, max_workers=args.jobs, backend=args.backend,
+                                    link_strategy=args.link_strategy, incremental=True, sizes=args.sizes)
+    # Without --verbose, status messages are only shown for builds that fail.
+    messages = []
+    if args.verbose:
+        logic.status_update.connect(lambda message: print(message, flush=True))
+    else:
+        logic.status_update.connect(messages.append)
+
+    def on_rebuilt(success):
+        if not success:
+            print('\n'.join(messages), flush=True)
+        messages.clear()
+
+    watcher = ThemeWatcher(logic, use_inotify=not args.poll, debounce=args.debounce / 1000)
+    watcher.status_update.connect(lambda message: print(message, flush=True))
+    watcher.rebuilt.connect(on_rebuilt)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,562 @@
+"""Native Windows cursor decoder and Xcursor writer built on NumPy.
+
+Reads CUR/ICO images (32/24-bit and palettized DIBs with AND masks, and
+PNG-compressed entries) and ANI (RIFF) animations, and writes Xcursor
+files with the same layout as win2xcur's X11 writer, without Wand or
+ImageMagick.
+"""
+import functools
+import hashlib
+import struct
+import zlib
+
+import numpy as np
+
+# Bumped whenever decoding, encoding or resampling output changes, to invalidate caches.
+NATIVE_VERSION = '1'
+RESAMPLE_VERSION = '1'
+
+ICON_DIR = struct.Struct('<HHH')
+ICON_DIR_ENTRY = struct.Struct('<BBBBHHII')
+BITMAP_INFO_HEADER = struct.Struct('<IiiHHIIiiII')
+ICO_TYPE_ICON = 1
+ICO_TYPE_CUR = 2
+BI_RGB = 0
+BI_BITFIELDS = 3
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_CHUNK_HEADER = struct.Struct('>I4s')
+PNG_IHDR = struct.Struct('>IIBBBBB')
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+RIFF_HEADER = struct.Struct('<4sI4s')
+CHUNK_HEADER = struct.Struct('<4sI')
+ANIH_HEADER = struct.Struct('<IIIIIIIII')
+ANI_ICON_FLAG = 0x1
+
+XCURSOR_MAGIC = b'Xcur'
+XCURSOR_VERSION = 0x1_0000
+XCURSOR_FILE_HEADER = struct.Struct('<4sIII')
+XCURSOR_TOC_CHUNK = struct.Struct('<III')
+XCURSOR_CHUNK_IMAGE = 0xFFFD0002
+XCURSOR_IMAGE_HEADER = struct.Struct('<IIIIIIIII')
+
+
+class CursorFormatError(ValueError):
+    """Raised when a cursor file uses a feature the native decoder cannot read."""
+
+
+def _rejects_malformed(kind):
+    """Makes truncated or malformed input raise CursorFormatError, like read_xcursor does."""
+    def decorator(parse):
+        @functools.wraps(parse)
+        def wrapper(data):
+            try:
+                return parse(data)
+            except CursorFormatError:
+                raise
+            except (struct.error, IndexError, ValueError, zlib.error) as e:
+                raise CursorFormatError(f'Malformed {kind}: {e}') from e
+        return wrapper
+    return decorator
+
+
+class CursorImage:
+    """A single cursor image as straight (non-premultiplied) BGRA pixels of shape (H, W, 4)."""
+
+    def __init__(self, pixels, hotspot, nominal):
+        self.pixels = pixels
+        self.hotspot = hotspot
+        self.nominal = nominal
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+
+class CursorFrame:
+    """The images shown for one animation step, with the step's delay in seconds."""
+
+    def __init__(self, images, delay=0.0):
+        self.images = images
+        self.delay = delay
+
+    def __iter__(self):
+        return iter(self.images)
+
+    def __len__(self):
+        return len(self.images)
+
+
+def _unfilter_png(raw, height, stride, bpp):
+    """Reverses PNG scanline filtering and returns a (height, stride) uint8 array."""
+    data = np.frombuffer(raw, dtype=np.uint8)
+    if data.size < height * (stride + 1):
+        raise CursorFormatError('Truncated PNG image data')
+    data = data[:height * (stride + 1)].reshape(height, stride + 1)
+    out = np.empty((height, stride), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        filter_type = data[y, 0]
+        line = data[y, 1:]
+        if filter_type == 0:
+            cur = line
+        elif filter_type == 1:
+            # Sub is a running sum per byte position within a pixel.
+            cur = (np.cumsum(line.reshape(-1, bpp), axis=0, dtype=np.uint32) & 0xFF).astype(np.uint8).ravel()
+        elif filter_type == 2:
+            cur = line + prev
+        elif filter_type in (3, 4):
+            # Average and Paeth depend on the already decoded left neighbour.
+            cur = bytearray(line.tobytes())
+            up = prev.tobytes()
+            for i in range(stride):
+                left = cur[i - bpp] if i >= bpp else 0
+                if filter_type == 3:
+                    cur[i] = (cur[i] + ((left + up[i]) >> 1)) & 0xFF
+                else:
+                    upper_left = up[i - bpp] if i >= bpp else 0
+                    p = left + up[i] - upper_left
+                    pa, pb, pc = abs(p - left), abs(p - up[i]), abs(p - upper_left)
+                    predictor = left if pa <= pb and pa <= pc else (up[i] if pb <= pc else upper_left)
+                    cur[i] = (cur[i] + predictor) & 0xFF
+            cur = np.frombuffer(bytes(cur), dtype=np.uint8)
+        else:
+            raise CursorFormatError(f'Unknown PNG filter type {filter_type}')
+        out[y] = cur
+        prev = out[y]
+    return out
+
+
+def _unpack_samples(rows, width, bit_depth, channels):
+    """Expands packed scanlines into a (height, width * channels) array of 8-bit samples."""
+    height = rows.shape[0]
+    count = width * channels
+    if bit_depth == 8:
+        return rows[:, :count]
+    if bit_depth == 16:
+        return (rows[:, :count * 2].reshape(height, count, 2)[:, :, 0]).copy()
+    bits = np.unpackbits(rows, axis=1)
+    bits = bits[:, :count * bit_depth].reshape(height, count, bit_depth)
+    weights = (1 << np.arange(bit_depth - 1, -1, -1)).astype(np.uint8)
+    return (bits * weights).sum(axis=2, dtype=np.uint8)
+
+
+@_rejects_malformed('PNG image')
+def decode_png(data):
+    """Decodes a non-interlaced PNG into straight BGRA pixels."""
+    offset = len(PNG_SIGNATURE)
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    while offset + PNG_CHUNK_HEADER.size <= len(data):
+        length, name = PNG_CHUNK_HEADER.unpack_from(data, offset)
+        body = data[offset + PNG_CHUNK_HEADER.size:offset + PNG_CHUNK_HEADER.size + length]
+        offset += PNG_CHUNK_HEADER.size + length + 4
+        if name == b'IHDR':
+            header = PNG_IHDR.unpack(body[:PNG_IHDR.size])
+        elif name == b'PLTE':
+            palette = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3)
+        elif name == b'tRNS':
+            transparency = np.frombuffer(body, dtype=np.uint8)
+        elif name == b'IDAT':
+            idat.append(body)
+        elif name == b'IEND':
+            break
+    if header is None:
+        raise CursorFormatError('PNG image has no IHDR chunk')
+
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if interlace:
+        raise CursorFormatError('Interlaced PNG images are not supported')
+    if color_type not in PNG_CHANNELS:
+        raise CursorFormatError(f'Unsupported PNG color type {color_type}')
+
+    channels = PNG_CHANNELS[color_type]
+    bits_per_pixel = channels * bit_depth
+    stride = (width * bits_per_pixel + 7) // 8
+    rows = _unfilter_png(zlib.decompress(b''.join(idat)), height, stride, max(1, bits_per_pixel // 8))
+    samples = _unpack_samples(rows, width, bit_depth, channels).reshape(height, width, channels)
+
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    if color_type == 3:
+        if palette is None:
+            raise CursorFormatError('Palettized PNG image has no PLTE chunk')
+        alpha = np.full(len(palette), 255, dtype=np.uint8)
+        if transparency is not None:
+            alpha[:min(len(transparency), len(alpha))] = transparency[:len(alpha)]
+        index = np.minimum(samples[:, :, 0], len(palette) - 1)
+        rgba[:, :, :3] = palette[index]
+        rgba[:, :, 3] = alpha[index]
+    elif color_type in (0, 4):
+        if bit_depth < 8:
+            samples = samples * (255 // ((1 << bit_depth) - 1))
+        rgba[:, :, :3] = samples[:, :, :1]
+        rgba[:, :, 3] = samples[:, :, 1] if color_type == 4 else 255
+    else:
+        rgba[:, :, :3] = samples[:, :, :3]
+        rgba[:, :, 3] = samples[:, :, 3] if color_type == 6 else 255
+    return np.ascontiguousarray(rgba[:, :, [2, 1, 0, 3]])
+
+
+@_rejects_malformed('bitmap')
+def decode_dib(data):
+    """Decodes an icon DIB (XOR bitmap followed by the AND mask) into straight BGRA pixels."""
+    (header_size, width, height, _, bit_count, compression, _, _, _, colors_used, _) = \
+        BITMAP_INFO_HEADER.unpack_from(data, 0)
+    if header_size < BITMAP_INFO_HEADER.size:
+        raise CursorFormatError(f'Unsupported bitmap header size {header_size}')
+    if compression not in (BI_RGB, BI_BITFIELDS):
+        raise CursorFormatError(f'Unsupported bitmap compression {compression}')
+    if bit_count not in (1, 2, 4, 8, 24, 32):
+        raise CursorFormatError(f'Unsupported bitmap depth {bit_count}')
+
+    # The height covers both the XOR bitmap and the AND mask.
+    bottom_up = height > 0
+    height = abs(height) // 2
+    offset = header_size
+    if compression == BI_BITFIELDS and header_size == BITMAP_INFO_HEADER.size:
+        offset += 12
+
+    palette = None
+    if bit_count <= 8:
+        count = colors_used or (1 << bit_count)
+        palette = np.frombuffer(data, dtype=np.uint8, count=count * 4, offset=offset).reshape(count, 4)
+        offset += count * 4
+
+    stride = ((width * bit_count + 31) // 32) * 4
+    if len(data) < offset + stride * height:
+        raise CursorFormatError('Truncated bitmap data')
+    xor = np.frombuffer(data, dtype=np.uint8, count=stride * height, offset=offset).reshape(height, stride)
+    offset += stride * height
+
+    mask_stride = ((width + 31) // 32) * 4
+    if len(data) >= offset + mask_stride * height:
+        mask_bytes = np.frombuffer(data, dtype=np.uint8, count=mask_stride * height, offset=offset)
+        transparent = np.unpackbits(mask_bytes.reshape(height, mask_stride), axis=1)[:, :width].astype(bool)
+    else:
+        transparent = np.zeros((height, width), dtype=bool)
+    mask_alpha = np.where(transparent, 0, 255).astype(np.uint8)
+
+    bgra = np.empty((height, width, 4), dtype=np.uint8)
+    if bit_count == 32:
+        bgra[:] = xor[:, :width * 4].reshape(height, width, 4)
+        if not bgra[:, :, 3].any():
+            bgra[:, :, 3] = mask_alpha
+    elif bit_count == 24:
+        bgra[:, :, :3] = xor[:, :width * 3].reshape(height, width, 3)
+        bgra[:, :, 3] = mask_alpha
+    else:
+        index = _unpack_samples(xor, width, bit_count, 1)
+        index = np.minimum(index, len(palette) - 1)
+        bgra[:, :, :3] = palette[index, :3]
+        bgra[:, :, 3] = mask_alpha
+
+    if bottom_up:
+        bgra = bgra[::-1]
+    return np.ascontiguousarray(bgra)
+
+
+def decode_image(data):
+    """Decodes one icon directory entry, which is either a PNG or a DIB."""
+    if data[:len(PNG_SIGNATURE)] == PNG_SIGNATURE:
+        return decode_png(data)
+    return decode_dib(data)
+
+
+@_rejects_malformed('CUR or ICO file')
+def parse_icon_dir(blob):
+    """Returns (hotspot, image data) for every entry of a CUR or ICO file."""
+    if len(blob) < ICON_DIR.size:
+        raise CursorFormatError('Truncated icon directory')
+    reserved, ico_type, count = ICON_DIR.unpack_from(blob, 0)
+    if reserved != 0 or ico_type not in (ICO_TYPE_ICON, ICO_TYPE_CUR):
+        raise CursorFormatError('Not a CUR or ICO file')
+    if count == 0:
+        raise CursorFormatError('Icon directory has no images')
+
+    entries = []
+    for i in range(count):
+        _, _, _, _, hx, hy, size, offset = ICON_DIR_ENTRY.unpack_from(blob, ICON_DIR.size + i * ICON_DIR_ENTRY.size)
+        data = blob[offset:offset + size]
+        if len(data) != size:
+            raise CursorFormatError(f'Icon directory entry {i} points outside the file')
+        hotspot = (hx, hy) if ico_type == ICO_TYPE_CUR else (0, 0)
+        entries.append((hotspot, data))
+    return entries
+
+
+def decode_icon(blob):
+    """Decodes every image of a CUR or ICO file into CursorImage objects."""
+    images = []
+    for hotspot, data in parse_icon_dir(blob):
+        pixels = decode_image(data)
+        images.append(CursorImage(pixels, hotspot, pixels.shape[1]))
+    return images
+
+
+class CursorFile:
+    """A parsed cursor whose frames are decoded lazily, one icon at a time.
+
+    delays are in seconds; sequence maps animation steps to icon indices.
+    """
+
+    def __init__(self, icons, sequence, delays):
+        self.icons = icons
+        self.sequence = sequence
+        self.delays = delays
+        self._decoded = {}
+
+    @property
+    def frame_count(self):
+        return len(self.sequence)
+
+    def icon(self, index):
+        if index not in self._decoded:
+            self._decoded[index] = decode_icon(self.icons[index])
+        return self._decoded[index]
+
+    def frame(self, step):
+        return CursorFrame(self.icon(self.sequence[step]), self.delays[step])
+
+    def frames(self):
+        return [self.frame(step) for step in range(self.frame_count)]
+
+
+@_rejects_malformed('ANI file')
+def parse_ani(blob):
+    """Parses an ANI (RIFF ACON) container without decoding any frame."""
+    signature, riff_size, form = RIFF_HEADER.unpack_from(blob, 0)
+    if signature != b'RIFF' or form != b'ACON':
+        raise CursorFormatError('Not an ANI file')
+
+    end = min(len(blob), 8 + riff_size)
+    offset = RIFF_HEADER.size
+    header = None
+    icons = []
+    sequence = None
+    rates = None
+    while offset + CHUNK_HEADER.size <= end:
+        name, size = CHUNK_HEADER.unpack_from(blob, offset)
+        body_start = offset + CHUNK_HEADER.size
+        body = blob[body_start:body_start + size]
+        if name == b'anih':
+            header = ANIH_HEADER.unpack(body[:ANIH_HEADER.size])
+        elif name == b'rate':
+            rates = [rate for rate, in struct.iter_unpack('<I', body[:len(body) // 4 * 4])]
+        elif name == b'seq ':
+            sequence = [index for index, in struct.iter_unpack('<I', body[:len(body) // 4 * 4])]
+        elif name == b'LIST' and body[:4] == b'fram':
+            sub = 4
+            while sub + CHUNK_HEADER.size <= len(body):
+                sub_name, sub_size = CHUNK_HEADER.unpack_from(body, sub)
+                if sub_name == b'icon':
+                    icons.append(body[sub + CHUNK_HEADER.size:sub + CHUNK_HEADER.size + sub_size])
+                sub += CHUNK_HEADER.size + sub_size + (sub_size & 1)
+        offset = body_start + size + (size & 1)
+
+    if header is None:
+        raise CursorFormatError('ANI file has no anih chunk')
+    _, frame_count, step_count, _, _, _, _, display_rate, flags = header
+    if not flags & ANI_ICON_FLAG:
+        raise CursorFormatError('ANI files with raw bitmap frames are not supported')
+    if not icons:
+        raise CursorFormatError('ANI file has no frames')
+
+    if sequence is None:
+        sequence = list(range(len(icons)))
+    if not sequence:
+        raise CursorFormatError('ANI sequence is empty')
+    if any(index >= len(icons) for index in sequence):
+        raise CursorFormatError('ANI sequence refers to a missing frame')
+    if rates is None or len(rates) != len(sequence):
+        rates = [display_rate] * len(sequence)
+    return CursorFile(icons, sequence, [rate / 60 for rate in rates])
+
+
+def open_cursor(blob):
+    """Parses a .cur, .ico or .ani file into a CursorFile."""
+    if blob[:4] == b'RIFF':
+        return parse_ani(blob)
+    parse_icon_dir(blob)
+    return CursorFile([blob], [0], [0.0])
+
+
+def premultiply_alpha(pixels):
+    """Premultiplies BGRA pixels by alpha, rounding like win2xcur.utils.premultiply_alpha."""
+    buffer = pixels.astype(np.double)
+    buffer[..., :3] *= buffer[..., 3:4] / 255.0
+    return buffer.astype(np.uint8)
+
+
+def write_xcursor_images(images, share_identical=False):
+    """Encodes image dicts (as returned by read_xcursor) as an Xcursor file.
+
+    With share_identical, image chunks that are byte-for-byte identical
+    (pixels, hotspot and delay) are stored once and referenced from several
+    table-of-contents entries.
+    """
+    chunks = []
+    for image in images:
+        pixels = image['pixels']
+        hx, hy = image['hotspot']
+        header = XCURSOR_IMAGE_HEADER.pack(XCURSOR_IMAGE_HEADER.size, XCURSOR_CHUNK_IMAGE, image['nominal'], 1, 
+                                           pixels.shape[1], pixels.shape[0], hx, hy, image['delay'])
+        chunks.append((image['nominal'], header + np.ascontiguousarray(pixels, dtype=np.uint8).tobytes()))
+
+    header = XCURSOR_FILE_HEADER.pack(XCURSOR_MAGIC, XCURSOR_FILE_HEADER.size, XCURSOR_VERSION, len(chunks))
+    offset = XCURSOR_FILE_HEADER.size + len(chunks) * XCURSOR_TOC_CHUNK.size
+    toc = []
+    body = []
+    positions = {}
+    for nominal, chunk in chunks:
+        position = positions.get(chunk) if share_identical else None
+        if position is None:
+            position = offset
+            positions[chunk] = position
+            body.append(chunk)
+            offset += len(chunk)
+        toc.append(XCURSOR_TOC_CHUNK.pack(XCURSOR_CHUNK_IMAGE, nominal, position))
+    return b''.join([header] + toc + body)
+
+
+def write_xcursor(frames):
+    """Encodes CursorFrame objects as an Xcursor file, laid out like win2xcur's to_x11."""
+    images = []
+    for frame in frames:
+        for image in frame:
+            images.append({
+                'nominal': image.nominal,
+                'hotspot': image.hotspot,
+                'delay': int(frame.delay * 1000),
+                'pixels': premultiply_alpha(image.pixels),
+            })
+    return write_xcursor_images(images)
+
+
+def read_xcursor(blob):
+    """Returns the image chunks of an Xcursor file in table-of-contents order.
+
+    Each chunk is a dict with nominal, hotspot, delay (milliseconds) and
+    premultiplied BGRA pixels.
+    """
+    try:
+        return _read_xcursor_chunks(blob)
+    except CursorFormatError:
+        raise
+    except (struct.error, ValueError) as e:
+        raise CursorFormatError(f'Truncated Xcursor file: {e}') from e
+
+
+def _read_xcursor_chunks(blob):
+    magic, header_size, version, toc_size = XCURSOR_FILE_HEADER.unpack_from(blob, 0)
+    if magic != XCURSOR_MAGIC:
+        raise CursorFormatError('Not an Xcursor file')
+    if version != XCURSOR_VERSION:
+        raise CursorFormatError(f'Unsupported Xcursor version 0x{version:08x}')
+
+    images = []
+    for i in range(toc_size):
+        chunk_type, nominal, position = XCURSOR_TOC_CHUNK.unpack_from(blob, header_size + i * XCURSOR_TOC_CHUNK.size)
+        if chunk_type != XCURSOR_CHUNK_IMAGE:
+            continue
+        (_, _, _, _, width, height, hx, hy, delay) = XCURSOR_IMAGE_HEADER.unpack_from(blob, position)
+        start = position + XCURSOR_IMAGE_HEADER.size
+        pixels = np.frombuffer(blob, dtype=np.uint8, count=width * height * 4, offset=start)
+        images.append({
+            'nominal': nominal,
+            'hotspot': (hx, hy),
+            'delay': delay,
+            'pixels': pixels.reshape(height, width, 4),
+        })
+    return images
+
+
+def _resample_weights(source, target):
+    """Returns a (target, source) matrix of triangle-filter weights, widened when downscaling."""
+    scale = target / source
+    support = max(1.0, 1.0 / scale)
+    centers = (np.arange(target) + 0.5) / scale - 0.5
+    distance = np.abs(np.arange(source)[None, :] - centers[:, None]) / support
+    weights = np.clip(1.0 - distance, 0.0, None)
+    return (weights / weights.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def resample_images(images, size):
+    """Scales premultiplied image dicts from their nominal size to size.
+
+    Images of the same shape (e.g. all frames of an animation) are stacked
+    and resampled together with two matrix products.
+    """
+    results = [None] * len(images)
+    groups = {}
+    for i, image in enumerate(images):
+        groups.setdefault(image['pixels'].shape, []).append(i)
+
+    for (height, width, _), indices in groups.items():
+        scale = size / images[indices[0]]['nominal']
+        out_height, out_width = max(1, round(height * scale)), max(1, round(width * scale))
+        rows = _resample_weights(height, out_height)
+        cols = _resample_weights(width, out_width)
+        batch = np.stack([images[i]['pixels'] for i in indices]).astype(np.float32)
+        # (n, h, w, c) -> (n, out_h, w, c) -> (n, out_h, out_w, c)
+        batch = np.einsum('oh,nhwc->nowc', rows, batch)
+        batch = np.einsum('pw,nowc->nopc', cols, batch)
+        batch = np.clip(np.rint(batch), 0, 255).astype(np.uint8)
+        # Premultiplied colour channels may not exceed alpha.
+        np.minimum(batch[..., :3], batch[..., 3:4], out=batch[..., :3])
+        for i, pixels in zip(indices, batch):
+            hx, hy = images[i]['hotspot']
+            results[i] = {
+                'nominal': size,
+                'hotspot': (min(round(hx * scale), out_width - 1), min(round(hy * scale), out_height - 1)),
+                'delay': images[i]['delay'],
+                'pixels': pixels,
+            }
+    return results
+
+
+def images_for_size(images, size):
+    """Returns resampled images adding nominal size to a cursor, or [] if it already has it.
+
+    The animation at the smallest nominal size not below size (or the largest
+    available) is used as the source.
+    """
+    if not images:
+        raise CursorFormatError('Cursor has no images to resample')
+    by_nominal = {}
+    for image in images:
+        by_nominal.setdefault(image['nominal'], []).append(image)
+    if size in by_nominal:
+        return []
+    nominals = sorted(by_nominal)
+    source = next((nominal for nominal in nominals if nominal >= size), nominals[-1])
+    return resample_images(by_nominal[source], size)
+
+
+def merge_duplicate_frames(images):
+    """Merges runs of identical frames in each nominal size's animation.
+
+    A frame equal to the previous frame of the same size (pixels and
+    hotspot) is dropped and its delay added to that previous frame, so the
+    timing of the animation is unchanged.
+    """
+    merged = []
+    previous = {}
+    for image in images:
+        digest = hashlib.blake2b(image['pixels'].tobytes(), digest_size=16)
+        digest.update(struct.pack('<IIII', *image['hotspot'], *image['pixels'].shape[:2]))
+        digest = digest.digest()
+        last = previous.get(image['nominal'])
+        if last is not None and last[0] == digest:
+            last[1]['delay'] += image['delay']
+            continue
+        image = dict(image)
+        merged.append(image)
+        previous[image['nominal']] = (digest, image)
+    return merged
@@ -0,0 +1,206 @@
+import time
+from pathlib import Path
+from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel,
+                             QListWidget, QListWidgetItem, QListView)
+from PyQt6.QtGui import QImage, QPixmap, QIcon
+from PyQt6.QtCore import Qt, QPoint, QSize, QThread, QTimer
+
+from cc_logic.preview import PreviewDecoder, list_cursor_files
+
+THUMBNAIL_SIZE = 48
+ANIMATION_TICK_MS = 20
+PATH_ROLE = Qt.ItemDataRole.UserRole
+
+
+class CursorPreviewWindow(QWidget):
+    """Grid of cursor thumbnails for the source theme and the converted theme.
+
+    Thumbnails are decoded by a PreviewDecoder on a background thread, and
+    only for the items currently scrolled into view. Animated cursors play
+    while they are visible; each step is requested when it is due, so
+    frames that are never shown are never decoded.
+    """
+
+    def __init__(self, source_dir_getter, destination_dir_getter, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.source_dir_getter = source_dir_getter
+        self.destination_dir_getter = destination_dir_getter
+        self.decoder = None
+        self.decoder_thread = None
+        # Per path: [current step, frame count, monotonic time the next step is due, request pending].
+        self.states = {}
+        self.items = {}
+        # Paths in view, refreshed after scrolling or resizing rather than on every animation tick.
+        self.visible = set()
+        self.initUI()
+        QApplication.instance().aboutToQuit.connect(self.stop_decoder)
+
+    def initUI(self):
+        self.setWindowTitle('Cursor Preview')
+        self.resize(560, 480)
+        layout = QVBoxLayout()
+
+        header_layout = QHBoxLayout()
+        self.theme_combo = QComboBox()
+        self.theme_combo.addItems(['Source cursors', 'Converted cursors'])
+        self.theme_combo.currentIndexChanged.connect(self.reload)
+        self.summary_label = QLabel()
+        header_layout.addWidget(self.theme_combo)
+        header_layout.addWidget(self.summary_label)
+        header_layout.addStretch()
+        layout.addLayout(header_layout)
+
+        self.grid = QListWidget()
+        self.grid.setViewMode(QListView.ViewMode.IconMode)
+        self.grid.setResizeMode(QListView.ResizeMode.Adjust)
+        self.grid.setMovement(QListView.Movement.Static)
+        self.grid.setUniformItemSizes(True)
+        self.grid.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.grid.setGridSize(QSize(THUMBNAIL_SIZE + 64, THUMBNAIL_SIZE + 32))
+        self.grid.verticalScrollBar().valueChanged.connect(self._schedule_visible_check)
+        layout.addWidget(self.grid)
+        self.setLayout(layout)
+
+        # Scrolling and resizing fire in bursts; visible items are looked up once per burst.
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(0)
+        self.visible_timer.timeout.connect(self.load_visible)
+
+        self.animation_timer = QTimer(self)
+        self.animation_timer.setInterval(ANIMATION_TICK_MS)
+        self.animation_timer.timeout.connect(self.advance_animations)
+
+    def _start_decoder(self):
+        """Starts the decoder thread the first time a thumbnail is needed."""
+        self.decoder_thread = QThread(self)
+        self.decoder = PreviewDecoder(THUMBNAIL_SIZE)
+        self.decoder.moveToThread(self.decoder_thread)
+        self.decoder.frame_ready.connect(self.show_frame)
+        self.decoder.failed.connect(self.show_failure)
+        self.decoder_thread.finished.connect(self.decoder.deleteLater)
+        self.decoder_thread.start()
+
+    def stop_decoder(self):
+        if self.decoder_thread is not None:
+            self.decoder.retain(())
+            self.decoder_thread.quit()
+            self.decoder_thread.wait()
+            self.decoder = self.decoder_thread = None
+
+    def current_directory(self):
+        if self.theme_combo.currentIndex() == 0:
+            return Path(self.source_dir_getter())
+        return Path(self.destination_dir_getter()) / 'cursors'
+
+    def reload(self):
+        """Lists the cursors of the selected theme; thumbnails follow as they come into view."""
+        self.grid.clear()
+        self.states.clear()
+        self.items.clear()
+        self.visible = set()
+        if self.decoder is not None:
+            self.decoder.retain(())
+        paths = list_cursor_files(self.current_directory())
+        for path in paths:
+            item = QListWidgetItem(path.stem)
+            item.setData(PATH_ROLE, str(path))
+            item.setToolTip(str(path))
+            self.grid.addItem(item)
+            self.items[str(path)] = item
+        self.summary_label.setText(f"{len(paths)} cursor(s) in {self.current_directory()}")
+        self._schedule_visible_check()
+
+    def visible_paths(self):
+        viewport = self.grid.viewport().rect()
+        grid_size = self.grid.gridSize()
+        first = self.grid.indexAt(viewport.topLeft() + QPoint(grid_size.width() // 2, grid_size.height() // 2))
+        start = first.row() if first.isValid() else 0
+        paths = []
+        # Items are laid out in order, so the scan stops at the first row below the viewport.
+        for row in range(start, self.grid.count()):
+            item = self.grid.item(row)
+            rect = self.grid.visualItemRect(item)
+            if rect.top() > viewport.bottom():
+                break
+            if rect.intersects(viewport):
+                paths.append(item.data(PATH_ROLE))
+        return paths
+
+    def _schedule_visible_check(self):
+        if self.isVisible():
+            self.visible_timer.start()
+
+    def load_visible(self):
+        """Requests the first frame of every visible cursor that has none yet."""
+        visible = self.visible_paths()
+        if self.decoder is None and visible:
+            self._start_decoder()
+        if self.decoder is None:
+            return
+        # Requests for cursors scrolled out of view are dropped, so they can be made again later.
+        self.decoder.retain(visible)
+        visible = self.visible = set(visible)
+        for path in [path for path, state in self.states.items() if state[3] and path not in visible]:
+            if self.states[path][1] is None:
+                del self.states[path]
+            else:
+                self.states[path][3] = False
+        for path in visible:
+            if path not in self.states:
+                self.states[path] = [0, None, 0.0, True]
+                self.decoder.request(path, 0)
+        if any(self.states[path][1] and self.states[path][1] > 1 for path in visible):
+            self.animation_timer.start()
+        else:
+            self.animation_timer.stop()
+
+    def advance_animations(self):
+        """Requests the next step of every visible animation whose current step has expired."""
+        now = time.monotonic()
+        for path in self.visible:
+            state = self.states.get(path)
+            if state is None or state[3] or not state[1] or state[1] < 2 or now < state[2]:
+                continue
+            state[3] = True
+            self.decoder.request(path, (state[0] + 1) % state[1])
+
+    def show_frame(self, path, step, frame):
+        item = self.items.get(path)
+        state = self.states.get(path)
+        if item is None or state is None:
+            return
+        height, width = frame.pixels.shape[:2]
+        data = frame.pixels.tobytes()
+        image = QImage(data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+        item.setIcon(QIcon(QPixmap.fromImage(image)))
+        # Animation steps of 0 seconds would spin the timer; treat them as one tick.
+        state[:] = [step, frame.frame_count, time.monotonic() + max(frame.delay, ANIMATION_TICK_MS / 1000), False]
+        if frame.frame_count > 1 and not self.animation_timer.isActive():
+            self.animation_timer.start()
+
+    def show_failure(self, path, message):
+        item = self.items.get(path)
+        if item is not None:
+            item.setToolTip(f"{path}\nCannot preview: {message}")
+            self.states[path] = [0, 1, 0.0, False]
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.reload()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.animation_timer.stop()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule_visible_check()
+
+    def closeEvent(self, event):
+        # The decoder and its cache are kept, so reopening the preview is instant.
+        if self.decoder is not None:
+            self.decoder.retain(())
+        self.states.clear()
+        self.visible = set()
+        super().closeEvent(event)
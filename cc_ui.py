@@ -1,20 +1,30 @@
 import sys
+import time
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, 
                              QLabel, QLineEdit, QPushButton, 
-                             QTextEdit, QFileDialog, QCheckBox,
-                             QProgressBar, QMessageBox)
-from PyQt6.QtCore import Qt, QThread
+                             QPlainTextEdit, QFileDialog, QCheckBox,
+                             QProgressBar, QMessageBox, QHBoxLayout, QComboBox)
+from PyQt6.QtCore import Qt, QThread, QTimer
 from pathlib import Path
 import os
 
-from cc_logic.main_logic import CursorConverterLogic
+# The conversion logic, the service client and the preview (which pulls in
+# NumPy) are imported on first use, so the window appears without waiting for them.
+from cc_logic.log_buffer import StatusLogBuffer
+
+# Number of recent lines kept in the status log view; the full log can be saved.
+MAX_LOG_LINES = 2000
+LOG_FLUSH_INTERVAL_MS = 100
+# When set, the app prints the time of its first paint and quits once startup finishes (see benchmarks.bench_startup).
+STARTUP_BENCHMARK_ENV = 'CCPY_STARTUP_BENCHMARK'
 
 def resource_path(relative_path):
     """ Get the absolute path to a resource, works for dev and for PyInstaller """
     try:
         base_path = sys._MEIPASS
     except Exception:
-        base_path = os.path.abspath(".")
+        # Next to this module, where cc_logic is in a checkout and in an installed copy.
+        base_path = os.path.dirname(os.path.abspath(__file__))
 
     return os.path.join(base_path, relative_path)
 
@@ -22,12 +32,42 @@ class CursorConverterApp(QWidget):
     def __init__(self):
         super().__init__()
         
-        self.thread = QThread()
-        self.logic = CursorConverterLogic()
-        self.logic.moveToThread(self.thread)
+        self.thread = None
+        self.logic = None
+        self.preview_window = None
+        self.first_paint = None
+        self.log_buffer = StatusLogBuffer()
         
         self.initUI()
-        
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint is None:
+            self.first_paint = time.monotonic()
+            # Runs after this first frame has been handed to the window system.
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Loads what the window does not need to show its first frame."""
+        from cc_logic.archive import available_formats
+        self.archive_format_combo.addItems([fmt for fmt in available_formats() 
+                                            if self.archive_format_combo.findText(fmt) < 0])
+        if os.environ.get(STARTUP_BENCHMARK_ENV):
+            print(f"first-paint {self.first_paint:.6f}", flush=True)
+            print(f"ready {time.monotonic():.6f}", flush=True)
+            QApplication.quit()
+
+    def _create_worker(self):
+        """Creates the logic worker and its thread for one conversion run."""
+        from cc_logic.main_logic import CursorConverterLogic
+        from cc_logic.service import RemoteConverterLogic, ServiceClient
+
+        self.thread = QThread()
+        # Hand conversions to the background service when one is running.
+        self.logic = RemoteConverterLogic() if ServiceClient.is_running() else CursorConverterLogic()
+        self.logic.moveToThread(self.thread)
+        self._connect_logic_signals()
+
         self.thread.started.connect(self.logic.run_conversion)
         
         self.logic.finished.connect(self.thread.quit)
@@ -35,7 +75,6 @@ class CursorConverterApp(QWidget):
         self.logic.finished.connect(self.logic.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
 
-
     def initUI(self):
         self.setWindowTitle('ColorCursor Converter')
         self.setFixedSize(600, 550) 
@@ -48,8 +87,6 @@ class CursorConverterApp(QWidget):
         self._create_control_widgets(main_layout)
         self._create_status_widgets(main_layout)
 
-        self._connect_logic_signals()
-
         self.setLayout(main_layout)
 
     def _create_path_widgets(self, layout):
@@ -69,7 +106,7 @@ class CursorConverterApp(QWidget):
         map_label = QLabel('Cursor Map File (.json):')
         self.map_file_input = QLineEdit()
         
-        default_map_path = resource_path("cursor_map.json")
+        default_map_path = resource_path(os.path.join("cc_logic", "cursor_map.json"))
         self.map_file_input.setText(default_map_path)
         
         self.map_file_input.setPlaceholderText('Enter path to cursor map JSON file...')
@@ -83,16 +120,36 @@ class CursorConverterApp(QWidget):
 
     def _create_option_widgets(self, layout):
         """Creates and adds the checkbox option widgets to the layout."""
-        self.zip_checkbox = QCheckBox('Zip theme?')
+        self.zip_checkbox = QCheckBox('Archive theme?')
+        self.archive_format_combo = QComboBox()
+        # zip is always available; finish_startup() adds the formats that need checking.
+        self.archive_format_combo.addItem('zip')
         self.install_checkbox = QCheckBox('Install theme?')
-        layout.addWidget(self.zip_checkbox)
+        self.incremental_checkbox = QCheckBox('Incremental rebuild? (reuse unchanged outputs)')
+        archive_layout = QHBoxLayout()
+        archive_layout.addWidget(self.zip_checkbox)
+        archive_layout.addWidget(self.archive_format_combo)
+        archive_layout.addStretch()
+        layout.addLayout(archive_layout)
         layout.addWidget(self.install_checkbox)
+        self.refresh_env_checkbox = QCheckBox('Refresh environment? (re-check Python, pip and win2xcur)')
+        layout.addWidget(self.incremental_checkbox)
+        layout.addWidget(self.refresh_env_checkbox)
 
     def _create_control_widgets(self, layout):
         """Creates and adds the main control buttons and progress bar."""
         self.convert_button = QPushButton('Start Conversion')
         self.convert_button.clicked.connect(self.start_conversion_process)
-        layout.addWidget(self.convert_button)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.convert_button)
+        button_layout.addWidget(self.cancel_button)
+        self.preview_button = QPushButton('Preview')
+        self.preview_button.clicked.connect(self.show_preview)
+        button_layout.addWidget(self.preview_button)
+        layout.addLayout(button_layout)
 
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setValue(0)
@@ -100,15 +157,29 @@ class CursorConverterApp(QWidget):
 
     def _create_status_widgets(self, layout):
         """Creates and adds the status log widgets."""
+        header_layout = QHBoxLayout()
         status_label = QLabel('Status Log:')
-        self.status_log = QTextEdit()
+        self.save_log_button = QPushButton('Save Log')
+        self.save_log_button.clicked.connect(self.save_status_log)
+        header_layout.addWidget(status_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.save_log_button)
+
+        self.status_log = QPlainTextEdit()
         self.status_log.setReadOnly(True)
-        layout.addWidget(status_label)
+        self.status_log.setMaximumBlockCount(MAX_LOG_LINES)
+        layout.addLayout(header_layout)
         layout.addWidget(self.status_log)
 
+        # Messages are buffered by the worker and appended here in batches.
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_status_log)
+
     def _connect_logic_signals(self):
         """Connects signals from the logic worker to UI slots."""
-        self.logic.status_update.connect(self.update_status_log)
+        # Direct connection: the worker appends to the buffer without a cross-thread event per message.
+        self.logic.status_update.connect(self.log_buffer.append, Qt.ConnectionType.DirectConnection)
         self.logic.finished.connect(self.conversion_finished)
         self.logic.progress_update.connect(self.progress_bar.setValue)
 
@@ -127,6 +198,17 @@ class CursorConverterApp(QWidget):
         if file_path:
             self.map_file_input.setText(file_path)
 
+    def show_preview(self):
+        """Opens the cursor preview window, creating it on first use."""
+        if self.preview_window is None:
+            from cc_preview import CursorPreviewWindow
+            self.preview_window = CursorPreviewWindow(lambda: self.source_path_input.text().strip(),
+                                                      lambda: self.destination_path_input.text().strip(), self)
+        if self.preview_window.isVisible():
+            self.preview_window.reload()
+        self.preview_window.show()
+        self.preview_window.raise_()
+
     def _show_error_message(self, title, message):
         """Helper to display a critical error message box."""
         msg = QMessageBox()
@@ -157,13 +239,10 @@ class CursorConverterApp(QWidget):
             self._show_error_message("Validation Error", f"Cursor map file does not exist:\n{map_file}")
             return False
 
-        source_res, dest_res = source_dir.resolve(), dest_dir.resolve()
-
-        if source_res == dest_res:
-            self._show_error_message("Validation Error", "Source and destination directories cannot be the same.")
-            return False
-        if source_res in dest_res.parents:
-            self._show_error_message("Validation Error", "Destination directory cannot be a subfolder of the source directory.")
+        from cc_logic.utilities import destination_conflict
+        conflict = destination_conflict(source_dir, dest_dir)
+        if conflict:
+            self._show_error_message("Validation Error", conflict)
             return False
 
         return True
@@ -172,59 +251,122 @@ class CursorConverterApp(QWidget):
         if not self._validate_inputs():
             return
 
+        from cc_logic.manifest import BuildManifest
+
         destination_path = self.destination_path_input.text().strip()
+        incremental = self.incremental_checkbox.isChecked()
+        resumable = (Path(destination_path) / BuildManifest.CHECKPOINT_FILENAME).is_file()
         msg = QMessageBox()
         msg.setWindowTitle("Confirm Conversion")
         msg.setIcon(QMessageBox.Icon.Question)
         msg.setText("Are you sure you want to start the conversion?")
-        msg.setInformativeText(f"The directory '{destination_path}' and its contents will be overwritten.")
+        if incremental:
+            start_over_text = f"Outputs in '{destination_path}' will be updated where their inputs changed."
+        else:
+            start_over_text = f"The directory '{destination_path}' and its contents will be overwritten."
         msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         msg.setDefaultButton(QMessageBox.StandardButton.No)
+        start_over_button = None
+        if resumable:
+            # An interrupted run left a checkpoint; Yes resumes it and Start Over ignores it.
+            msg.setInformativeText(f"An interrupted conversion in '{destination_path}' will be resumed, keeping "
+                                   f"the cursors it already finished.\n\nWith Start Over: {start_over_text}")
+            msg.button(QMessageBox.StandardButton.Yes).setText("Resume")
+            start_over_button = msg.addButton("Start Over", QMessageBox.ButtonRole.DestructiveRole)
+        else:
+            msg.setInformativeText(start_over_text)
         
-        reply = msg.exec()
+        msg.exec()
+        clicked = msg.clickedButton()
         
-        if reply == QMessageBox.StandardButton.No:
-            self.status_log.append("Conversion canceled by user.")
+        if clicked is None or clicked == msg.button(QMessageBox.StandardButton.No):
+            self.update_status_log("Conversion canceled by user.")
             return
+        resume = clicked != start_over_button
 
         self.convert_button.setEnabled(False)
         self.source_browse_button.setEnabled(False)
         self.destination_browse_button.setEnabled(False)
         self.map_browse_button.setEnabled(False)
         self.zip_checkbox.setEnabled(False)
+        self.archive_format_combo.setEnabled(False)
         self.install_checkbox.setEnabled(False)
+        self.incremental_checkbox.setEnabled(False)
+        self.refresh_env_checkbox.setEnabled(False)
 
         self.status_log.clear()
+        self.log_buffer.clear()
+        self.log_timer.start()
         self.progress_bar.setValue(0)
         
         source_path = self.source_path_input.text().strip()
         map_file_path = self.map_file_input.text().strip()
         zip_theme = self.zip_checkbox.isChecked()
         install_theme = self.install_checkbox.isChecked()
+        refresh_environment = self.refresh_env_checkbox.isChecked()
         
-        self.logic.set_conversion_parameters(source_path, destination_path, map_file_path, zip_theme, install_theme)
+        self._create_worker()
+        self.logic.set_conversion_parameters(source_path, destination_path, map_file_path, zip_theme, install_theme, 
+                                             incremental=incremental, refresh_environment=refresh_environment, 
+                                             archive_format=self.archive_format_combo.currentText(), resume=resume)
+        self.cancel_button.setEnabled(True)
         self.thread.start()
 
+    def cancel_conversion(self):
+        """Stops the running conversion; the next run resumes where it stopped."""
+        if self.logic is None:
+            return
+        self.cancel_button.setEnabled(False)
+        self.update_status_log("Cancelling conversion...")
+        # Called directly: the worker thread is busy, and cancel() is thread-safe.
+        self.logic.cancel()
+
 
     def update_status_log(self, message):
-        self.status_log.append(message)
+        self.log_buffer.append(message)
+        self.flush_status_log()
+
+    def flush_status_log(self):
+        """Appends all buffered messages to the log view in one update."""
+        messages = self.log_buffer.drain()
+        if messages:
+            self.status_log.appendPlainText('\n'.join(messages))
+
+    def save_status_log(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Status Log", "ccpy-log.txt", "Text Files (*.txt)")
+        if file_path:
+            try:
+                self.log_buffer.save(file_path)
+            except OSError as e:
+                self._show_error_message("Save Error", f"Could not save the log:\n{e}")
 
     def conversion_finished(self, success):
+        self.log_timer.stop()
+        self.logic = None
+        self.cancel_button.setEnabled(False)
         if success:
-            self.status_log.append("Conversion process finished successfully!")
+            self.update_status_log("Conversion process finished successfully!")
             self.progress_bar.setValue(100)
         else:
-            self.status_log.append("Conversion process finished with errors.")
+            self.update_status_log("Conversion process finished with errors.")
         
         self.convert_button.setEnabled(True)
         self.source_browse_button.setEnabled(True)
         self.destination_browse_button.setEnabled(True)
         self.map_browse_button.setEnabled(True)
         self.zip_checkbox.setEnabled(True)
+        self.archive_format_combo.setEnabled(True)
         self.install_checkbox.setEnabled(True)
+        self.incremental_checkbox.setEnabled(True)
+        self.refresh_env_checkbox.setEnabled(True)
+        if self.preview_window is not None and self.preview_window.isVisible():
+            self.preview_window.reload()
 
-if __name__ == '__main__':
+def main():
     app = QApplication(sys.argv)
     ex = CursorConverterApp()
     ex.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+if __name__ == '__main__':
+    sys.exit(main())
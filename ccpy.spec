@@ -1,5 +1,11 @@
 # -*- mode: python ; coding: utf-8 -*-
+import argparse
 
+# Options follow a "--" on the command line, e.g. `pyinstaller ccpy.spec -- --onedir`.
+parser = argparse.ArgumentParser()
+parser.add_argument('--onedir', action='store_true',
+                    help='Build dist/ccpy/ as a directory that starts without unpacking itself on every launch.')
+options = parser.parse_args()
 
 block_cipher = None
 
@@ -8,7 +14,7 @@ a = Analysis(
     ['cc_ui.py'],
     pathex=[],
     binaries=[],
-    datas=[('cursor_map.json', '.')], # Change the destination to 'data'
+    datas=[('cc_logic/cursor_map.json', 'cc_logic')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -19,23 +25,52 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='ccpy',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=True,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
\ No newline at end of file
+if options.onedir:
+    # Libraries stay uncompressed on disk (no UPX), so they are mapped directly at startup.
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='ccpy',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='ccpy',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='ccpy',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
@@ -0,0 +1,95 @@
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from cc_logic import xcursor
+from cc_logic.backends import ConversionError
+from cc_logic.conversion import CursorConverter
+from cc_logic.main_logic import CursorConverterLogic
+
+
+class FakeBackend:
+    """Writes a small Xcursor file derived from the source bytes, without win2xcur.
+
+    Sources starting with b'bad' fail with ConversionError.
+    """
+    name = 'fake'
+    version = '1'
+    options = {}
+
+    def __init__(self):
+        self.converted = []
+
+    def convert(self, input_file, output_file):
+        data = input_file.read_bytes()
+        self.converted.append(input_file.stem)
+        if data.startswith(b'bad'):
+            raise ConversionError(f"cannot convert {input_file.name}")
+        seed = int.from_bytes(hashlib.sha256(data).digest()[:4], 'little')
+        pixels = np.random.default_rng(seed).integers(0, 256, (8, 8, 4), dtype=np.uint8)
+        image = {'nominal': 8, 'hotspot': (0, 0), 'delay': 0, 'pixels': pixels}
+        output_file.write_bytes(xcursor.write_xcursor_images([image]))
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    """A theme folder with one distinct source file per required cursor."""
+    source = tmp_path / 'source'
+    source.mkdir()
+    for name in CursorConverter.FILES:
+        (source / f"{name}.cur").write_bytes(f"cursor {name}".encode())
+    return source
+
+
+@pytest.fixture
+def map_file(tmp_path):
+    """A cursor map giving every cursor a primary name and two aliases."""
+    path = tmp_path / 'map.json'
+    path.write_text(json.dumps({name: f"{name.lower()} {name.lower()}-a {name.lower()}-b"
+                                for name in CursorConverter.FILES}))
+    return path
+
+
+class Run:
+    """The outcome of one run_conversion call."""
+
+    def __init__(self, logic, success, messages):
+        self.logic = logic
+        self.success = success
+        self.messages = messages
+
+
+@pytest.fixture
+def convert(tmp_path, monkeypatch, backend, source_dir, map_file):
+    """Returns a function that runs the whole pipeline with the fake backend.
+
+    Keyword arguments are passed to set_conversion_parameters. The conversion
+    cache is off unless use_cache is given, so backend.converted lists every
+    cursor a run converted.
+    """
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.setattr(CursorConverterLogic, '_create_backend', lambda self: backend)
+
+    def run(dest_dir, **params):
+        params.setdefault('use_cache', False)
+        logic = CursorConverterLogic()
+        messages = []
+        result = []
+        logic.status_update.connect(messages.append)
+        logic.finished.connect(result.append)
+        logic.set_conversion_parameters(str(params.pop('source_dir', source_dir)), str(dest_dir), str(map_file),
+                                        params.pop('zip_theme', False), params.pop('install_theme', False),
+                                        max_workers=params.pop('max_workers', 2), **params)
+        backend.converted.clear()
+        logic.run_conversion()
+        return Run(logic, result == [True], messages)
+
+    return run
@@ -0,0 +1,290 @@
+"""Builds the cursor files in tests/corpus from known pixels.
+
+Valid samples ("ok-*") come with the frames the decoder must produce.
+Malformed samples ("bad-*") must be rejected with CursorFormatError. To
+regenerate the corpus after adding a sample:
+
+    python tests/cursor_samples.py
+"""
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+CORPUS_DIR = Path(__file__).resolve().parent / 'corpus'
+
+ICON_DIR = struct.Struct('<HHH')
+ICON_DIR_ENTRY = struct.Struct('<BBBBHHII')
+BITMAP_INFO_HEADER = struct.Struct('<IiiHHIIiiII')
+ANIH_HEADER = struct.Struct('<IIIIIIIII')
+
+
+def pattern(width, height, seed):
+    """Returns BGRA pixels with opaque, transparent and partly transparent areas."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
+    pixels[0, :, 3] = 255
+    pixels[-1, :, 3] = 0
+    return pixels
+
+
+def transparent_mask(width, height):
+    """A checkerboard AND mask: True where the pixel is transparent."""
+    return (np.add.outer(np.arange(height), np.arange(width)) % 3) == 0
+
+
+def _pack_bits(values, bit_count):
+    """Packs a row of small integers MSB first, as DIBs and PNGs store them."""
+    values = np.asarray(values, dtype=np.uint8)
+    bits = np.unpackbits(values[:, None], axis=1)[:, 8 - bit_count:]
+    return np.packbits(bits.ravel()).tobytes()
+
+
+def dib(width, height, bit_count, rows, palette=b'', mask=None, top_down=False, colors_used=0,
+        header_size=BITMAP_INFO_HEADER.size, compression=0, include_mask=True):
+    """Encodes rows (top row first, unpadded bytes) and an AND mask as an icon DIB."""
+    stride = ((width * bit_count + 31) // 32) * 4
+    xor = [row.ljust(stride, b'\0') for row in rows]
+    mask_stride = ((width + 31) // 32) * 4
+    if mask is None:
+        mask = np.zeros((height, width), dtype=bool)
+    and_mask = [_pack_bits(row, 1).ljust(mask_stride, b'\0') for row in mask]
+    if not top_down:
+        xor.reverse()
+        and_mask.reverse()
+    height_field = -2 * height if top_down else 2 * height
+    header = BITMAP_INFO_HEADER.pack(header_size, width, height_field, 1, bit_count, compression,
+                                     0, 0, 0, colors_used, 0)
+    return header + palette + b''.join(xor) + (b''.join(and_mask) if include_mask else b'')
+
+
+def _png_chunk(name, body):
+    return struct.pack('>I', len(body)) + name + body + struct.pack('>I', zlib.crc32(name + body))
+
+
+def _paeth(left, up, upper_left):
+    p = left + up - upper_left
+    pa, pb, pc = abs(p - left), abs(p - up), abs(p - upper_left)
+    return left if pa <= pb and pa <= pc else (up if pb <= pc else upper_left)
+
+
+def _filter_row(filter_type, row, prev, bpp):
+    if filter_type > 4:
+        # Invalid filter types, for the malformed samples, leave the row as it is.
+        return bytes(row)
+    out = bytearray(len(row))
+    for i, value in enumerate(row):
+        left = row[i - bpp] if i >= bpp else 0
+        upper_left = prev[i - bpp] if i >= bpp else 0
+        predictor = (0, left, prev[i], (left + prev[i]) >> 1, _paeth(left, prev[i], upper_left))[filter_type]
+        out[i] = (value - predictor) & 0xFF
+    return bytes(out)
+
+
+def png(width, height, color_type, bit_depth, rows, palette=None, transparency=None, interlace=0,
+        filters=(0, 1, 2, 3, 4)):
+    """Encodes rows (unpadded bytes) as a PNG, cycling through the given filter types."""
+    bpp = max(1, {6: 4, 3: 1}[color_type] * bit_depth // 8)
+    raw = bytearray()
+    prev = bytes(len(rows[0]))
+    for y, row in enumerate(rows):
+        filter_type = filters[y % len(filters)]
+        raw += bytes((filter_type,)) + _filter_row(filter_type, row, prev, bpp)
+        prev = row
+    chunks = [_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, bit_depth, color_type, 0, 0, interlace))]
+    if palette is not None:
+        chunks.append(_png_chunk(b'PLTE', palette))
+    if transparency is not None:
+        chunks.append(_png_chunk(b'tRNS', transparency))
+    chunks.append(_png_chunk(b'IDAT', zlib.compress(bytes(raw))))
+    chunks.append(_png_chunk(b'IEND', b''))
+    return b'\x89PNG\r\n\x1a\n' + b''.join(chunks)
+
+
+def icon_file(images, ico_type=2):
+    """Builds a CUR (ico_type 2) or ICO (1) file from (image data, width, height, hotspot) tuples."""
+    offset = ICON_DIR.size + ICON_DIR_ENTRY.size * len(images)
+    entries = []
+    for data, width, height, (hx, hy) in images:
+        entries.append(ICON_DIR_ENTRY.pack(width % 256, height % 256, 0, 0, hx, hy, len(data), offset))
+        offset += len(data)
+    return ICON_DIR.pack(0, ico_type, len(images)) + b''.join(entries) + b''.join(d for d, *_ in images)
+
+
+def _riff_chunk(name, data):
+    return struct.pack('<4sI', name, len(data)) + data + (b'\0' if len(data) % 2 else b'')
+
+
+def ani(icons, sequence=None, rates=None, display_rate=6, flags=0x1, form=b'ACON', anih_size=None):
+    """Builds an ANI file from CUR blobs, with optional seq and rate chunks."""
+    steps = len(sequence) if sequence is not None else len(icons)
+    anih = ANIH_HEADER.pack(ANIH_HEADER.size, len(icons), steps, 0, 0, 0, 0, display_rate, flags)
+    body = form
+    if anih_size != 0:
+        body += _riff_chunk(b'anih', anih[:anih_size])
+    if rates is not None:
+        body += _riff_chunk(b'rate', struct.pack(f'<{len(rates)}I', *rates))
+    if sequence is not None:
+        body += _riff_chunk(b'seq ', struct.pack(f'<{len(sequence)}I', *sequence))
+    body += _riff_chunk(b'LIST', b'fram' + b''.join(_riff_chunk(b'icon', icon) for icon in icons))
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def _true_color(width, height, bit_count, seed, top_down=False, zero_alpha=False, include_mask=True):
+    """Returns (DIB, expected BGRA pixels) for a 24 or 32-bit image."""
+    pixels = pattern(width, height, seed)
+    mask = transparent_mask(width, height)
+    mask_alpha = np.where(mask, 0, 255).astype(np.uint8) if include_mask else np.full((height, width), 255, np.uint8)
+    if bit_count == 32 and zero_alpha:
+        pixels[:, :, 3] = 0
+    rows = [pixels[y, :, :bit_count // 8].tobytes() for y in range(height)]
+    data = dib(width, height, bit_count, rows, mask=mask, top_down=top_down, include_mask=include_mask)
+    expected = pixels.copy()
+    if bit_count == 24 or zero_alpha:
+        expected[:, :, 3] = mask_alpha
+    return data, expected
+
+
+def _palettized(width, height, bit_count, seed, colors_used=0):
+    """Returns (DIB, expected BGRA pixels) for a 1, 4 or 8-bit image."""
+    rng = np.random.default_rng(seed)
+    count = colors_used or (1 << bit_count)
+    palette = rng.integers(0, 256, (count, 4), dtype=np.uint8)
+    palette[:, 3] = 0
+    # Indices past a short palette are clamped to its last entry.
+    index = rng.integers(0, 1 << bit_count, (height, width), dtype=np.uint8)
+    mask = transparent_mask(width, height)
+    rows = [_pack_bits(index[y], bit_count) for y in range(height)]
+    data = dib(width, height, bit_count, rows, palette=palette.tobytes(), mask=mask, colors_used=colors_used)
+    expected = np.empty((height, width, 4), dtype=np.uint8)
+    expected[:, :, :3] = palette[np.minimum(index, count - 1), :3]
+    expected[:, :, 3] = np.where(mask, 0, 255)
+    return data, expected
+
+
+def _png_rgba(width, height, seed):
+    pixels = pattern(width, height, seed)
+    rgba = pixels[:, :, [2, 1, 0, 3]]
+    return png(width, height, 6, 8, [rgba[y].tobytes() for y in range(height)]), pixels
+
+
+def _png_palette(width, height, seed):
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, (16, 3), dtype=np.uint8)
+    transparency = rng.integers(0, 256, 10, dtype=np.uint8)
+    index = rng.integers(0, 16, (height, width), dtype=np.uint8)
+    data = png(width, height, 3, 4, [_pack_bits(index[y], 4) for y in range(height)],
+               palette=palette.tobytes(), transparency=transparency.tobytes())
+    alpha = np.concatenate([transparency, np.full(6, 255, np.uint8)])
+    expected = np.empty((height, width, 4), dtype=np.uint8)
+    expected[:, :, :3] = palette[index][:, :, ::-1]
+    expected[:, :, 3] = alpha[index]
+    return data, expected
+
+
+def valid_samples():
+    """Returns {file name: (bytes, [(delay in seconds, [(BGRA pixels, hotspot)])])}."""
+    samples = {}
+
+    def static(name, images, ico_type=2):
+        blob = icon_file([(data, pixels.shape[1], pixels.shape[0], hotspot) for data, pixels, hotspot in images],
+                         ico_type)
+        hotspots = [hotspot if ico_type == 2 else (0, 0) for _, _, hotspot in images]
+        samples[name] = (blob, [(0.0, [(pixels, h) for (_, pixels, _), h in zip(images, hotspots)])])
+
+    static('ok-32bit.cur', [(*_true_color(6, 5, 32, 1), (2, 3))])
+    static('ok-32bit-top-down.cur', [(*_true_color(6, 5, 32, 2, top_down=True), (0, 0))])
+    static('ok-32bit-mask-alpha.cur', [(*_true_color(4, 4, 32, 3, zero_alpha=True), (1, 1))])
+    static('ok-24bit-padded.cur', [(*_true_color(5, 3, 24, 4), (4, 2))])
+    static('ok-24bit-no-mask.cur', [(*_true_color(4, 2, 24, 5, include_mask=False), (0, 1))])
+    static('ok-8bit.cur', [(*_palettized(7, 3, 8, 6), (3, 0))])
+    static('ok-4bit.cur', [(*_palettized(9, 2, 4, 7), (0, 0))])
+    static('ok-1bit.cur', [(*_palettized(33, 2, 1, 8), (32, 1))])
+    static('ok-8bit-short-palette.cur', [(*_palettized(4, 4, 8, 9, colors_used=5), (0, 0))])
+    static('ok-png-rgba.cur', [(*_png_rgba(7, 10, 10), (6, 9))])
+    static('ok-png-palette.cur', [(*_png_palette(9, 5, 11), (1, 2))])
+    static('ok-1x1.cur', [(*_true_color(1, 1, 32, 12), (0, 0))])
+    static('ok-multi-size.cur', [(*_true_color(4, 4, 32, 13), (1, 1)), (*_png_rgba(8, 8, 14), (2, 2))])
+    static('ok-icon.ico', [(*_true_color(4, 4, 32, 15), (3, 3))], ico_type=1)
+
+    frames = [_true_color(4, 4, 32, 20 + i) for i in range(3)]
+    icons = [icon_file([(data, 4, 4, (1, 2))]) for data, _ in frames]
+    sequence = [0, 2, 1, 2]
+    rates = [6, 12, 3, 30]
+    samples['ok-sequence.ani'] = (ani(icons, sequence, rates),
+                                  [(rate / 60, [(frames[i][1], (1, 2))]) for i, rate in zip(sequence, rates)])
+    samples['ok-display-rate.ani'] = (ani(icons, display_rate=10),
+                                      [(10 / 60, [(pixels, (1, 2))]) for _, pixels in frames])
+    # A rate chunk that does not match the sequence is ignored in favour of the display rate.
+    samples['ok-mismatched-rate.ani'] = (ani(icons, rates=[1, 2], display_rate=4),
+                                         [(4 / 60, [(pixels, (1, 2))]) for _, pixels in frames])
+    # Odd-sized chunks are followed by a padding byte.
+    odd = [icon + b'\0' if len(icon) % 2 == 0 else icon for icon in icons]
+    samples['ok-odd-chunks.ani'] = (ani(odd), [(6 / 60, [(pixels, (1, 2))]) for _, pixels in frames])
+    return samples
+
+
+def malformed_samples():
+    """Returns {file name: bytes} of files the decoder must reject."""
+    good, _ = _true_color(4, 4, 32, 30)
+    cur = icon_file([(good, 4, 4, (0, 0))])
+    png_data, _ = _png_rgba(4, 4, 31)
+    entry_data_offset = ICON_DIR.size + ICON_DIR_ENTRY.size
+    icon = cur
+
+    def with_image(data):
+        return icon_file([(data, 4, 4, (0, 0))])
+
+    def patched_png(offset, value):
+        data = bytearray(png_data)
+        data[offset] = value
+        return with_image(bytes(data))
+
+    rows = [bytes(16)] * 4
+    samples = {
+        'bad-empty.cur': b'',
+        'bad-truncated-dir.cur': ICON_DIR.pack(0, 2, 1),
+        'bad-no-entries.cur': ICON_DIR.pack(0, 2, 0),
+        'bad-not-a-cursor.cur': ICON_DIR.pack(0, 3, 1) + cur[ICON_DIR.size:],
+        'bad-reserved.cur': ICON_DIR.pack(1, 2, 1) + cur[ICON_DIR.size:],
+        'bad-entry-outside-file.cur': cur[:entry_data_offset + 10],
+        'bad-entry-count-too-high.cur': ICON_DIR.pack(0, 2, 2) + cur[ICON_DIR.size:],
+        'bad-bitmap-header-size.cur': with_image(dib(4, 4, 32, rows, header_size=12)),
+        'bad-bitmap-compression.cur': with_image(dib(4, 4, 32, rows, compression=1)),
+        'bad-bitmap-depth.cur': with_image(dib(4, 4, 16, [bytes(8)] * 4)),
+        'bad-bitmap-truncated-header.cur': with_image(good[:20]),
+        'bad-bitmap-truncated-pixels.cur': with_image(good[:BITMAP_INFO_HEADER.size + 20]),
+        'bad-bitmap-truncated-palette.cur': with_image(dib(4, 4, 8, [bytes(4)] * 4)[:BITMAP_INFO_HEADER.size + 100]),
+        'bad-png-truncated.cur': with_image(png_data[:40]),
+        'bad-png-no-header.cur': with_image(png_data[:8] + png_data[33:]),
+        'bad-png-corrupt-data.cur': with_image(png_data[:41] + b'\xff' * 8 + png_data[49:]),
+        'bad-png-interlaced.cur': with_image(png(4, 4, 6, 8, [bytes(16)] * 4, interlace=1)),
+        'bad-png-filter.cur': with_image(png(4, 4, 6, 8, [bytes(16)] * 4, filters=(7,))),
+        'bad-png-color-type.cur': patched_png(25, 5),
+        'bad-png-palette-missing.cur': with_image(png(4, 4, 3, 4, [bytes(2)] * 4)),
+        'bad-riff-truncated.ani': b'RIFF',
+        'bad-not-acon.ani': ani([icon], form=b'WAVE'),
+        'bad-no-anih.ani': ani([icon], anih_size=0),
+        'bad-truncated-anih.ani': ani([icon], anih_size=8),
+        'bad-raw-frames.ani': ani([icon], flags=0),
+        'bad-no-frames.ani': ani([]),
+        'bad-empty-sequence.ani': ani([icon], sequence=[]),
+        'bad-sequence-out-of-range.ani': ani([icon], sequence=[0, 1]),
+        'bad-frame-data.ani': ani([b'not a cursor']),
+        'bad-frame-no-entries.ani': ani([ICON_DIR.pack(0, 2, 0)]),
+    }
+    return samples
+
+
+def write_corpus(directory=CORPUS_DIR):
+    directory.mkdir(exist_ok=True)
+    for old in directory.iterdir():
+        old.unlink()
+    for name, (data, _) in valid_samples().items():
+        (directory / name).write_bytes(data)
+    for name, data in malformed_samples().items():
+        (directory / name).write_bytes(data)
+
+
+if __name__ == '__main__':
+    write_corpus()
@@ -0,0 +1,127 @@
+import os
+import posixpath
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from cc_logic.archive import ThemeArchive, archive_path, available_formats
+from cc_logic.manifest import BuildManifest
+
+FORMATS = [f for f in ('zip', 'tar.gz', 'tar.xz') if f in available_formats()]
+
+
+def read_entries(path, archive_format):
+    """Returns {name: ('file', data) or ('link', target)} for the files and links in an archive."""
+    entries = {}
+    if archive_format == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                kind = 'link' if stat.S_ISLNK(info.external_attr >> 16) else 'file'
+                data = archive.read(info)
+                entries[info.filename] = (kind, data.decode() if kind == 'link' else data)
+        return entries
+    with tarfile.open(path) as archive:
+        for info in archive.getmembers():
+            if info.issym():
+                entries[info.name] = ('link', info.linkname)
+            elif info.isfile():
+                entries[info.name] = ('file', archive.extractfile(info).read())
+    return entries
+
+
+def resolve(entries):
+    """Follows link entries, returning {name: data}."""
+    def data_of(name, depth=0):
+        kind, value = entries[name]
+        if kind == 'file':
+            return value
+        assert depth < 10, f"link loop at {name}"
+        return data_of(posixpath.normpath(posixpath.join(posixpath.dirname(name), value)), depth + 1)
+
+    return {name: data_of(name) for name in entries}
+
+
+@pytest.mark.parametrize('archive_format', FORMATS)
+def test_identical_content_is_stored_once(tmp_path, archive_format):
+    path = tmp_path / f"Theme.{archive_format}"
+    with ThemeArchive(path, archive_format) as archive:
+        archive.add_bytes('Theme/cursors/left_ptr', b'pointer', mtime=0)
+        archive.add_bytes('Theme/cursors/default', b'pointer', mtime=0)
+        archive.add_bytes('Theme/index.theme', b'[Icon Theme]\n', mtime=0)
+    assert archive.duplicates == 1
+    assert archive.duplicate_bytes == len(b'pointer')
+
+    entries = read_entries(path, archive_format)
+    assert entries['Theme/cursors/left_ptr'] == ('file', b'pointer')
+    assert entries['Theme/cursors/default'] == ('link', 'left_ptr')
+    assert resolve(entries)['Theme/cursors/default'] == b'pointer'
+
+
+@pytest.mark.parametrize('archive_format', FORMATS)
+def test_symlinks_are_stored_as_links(tmp_path, archive_format):
+    theme = tmp_path / 'Theme'
+    (theme / 'cursors').mkdir(parents=True)
+    (theme / 'cursors' / 'left_ptr').write_bytes(b'pointer')
+    os.symlink('left_ptr', theme / 'cursors' / 'arrow')
+
+    path = tmp_path / f"Theme.{archive_format}"
+    with ThemeArchive(path, archive_format) as archive:
+        for name in ('left_ptr', 'arrow'):
+            archive.add_path(theme / 'cursors' / name, f"Theme/cursors/{name}")
+    assert archive.members == {'Theme/cursors/left_ptr', 'Theme/cursors/arrow'}
+    assert read_entries(path, archive_format)['Theme/cursors/arrow'] == ('link', 'left_ptr')
+
+
+def test_failure_removes_partial_archive(tmp_path):
+    path = tmp_path / 'Theme.zip'
+    with pytest.raises(RuntimeError):
+        with ThemeArchive(path) as archive:
+            archive.add_bytes('Theme/index.theme', b'[Icon Theme]\n')
+            raise RuntimeError('interrupted')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_discard_keeps_previous_archive(tmp_path):
+    path = tmp_path / 'Theme.zip'
+    path.write_bytes(b'previous')
+    archive = ThemeArchive(path)
+    archive.open()
+    archive.add_bytes('Theme/index.theme', b'[Icon Theme]\n')
+    archive.close(discard=True)
+    assert path.read_bytes() == b'previous'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_invalid_options_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ThemeArchive(tmp_path / 'Theme.rar', 'rar')
+    with pytest.raises(ValueError):
+        ThemeArchive(tmp_path / 'Theme.zip', 'zip', level=10)
+
+
+@pytest.mark.parametrize('archive_format', FORMATS)
+def test_streamed_archive_matches_theme_directory(tmp_path, convert, archive_format):
+    dest = tmp_path / 'Theme'
+    run = convert(dest, zip_theme=True, archive_format=archive_format)
+    assert run.success
+
+    expected = {}
+    for root, dirs, files in os.walk(dest):
+        for name in files:
+            if name != BuildManifest.FILENAME:
+                file_path = os.path.join(root, name)
+                expected[os.path.relpath(file_path, tmp_path).replace(os.sep, '/')] = open(file_path, 'rb').read()
+    entries = read_entries(archive_path(dest, archive_format), archive_format)
+    assert resolve(entries) == expected
+    assert entries['Theme/cursors/text-a'] == ('link', 'text')
+    assert not list(tmp_path.glob('*.part'))
+
+
+def test_failed_run_leaves_no_archive(tmp_path, convert, source_dir):
+    (source_dir / 'Move.cur').write_bytes(b'bad cursor')
+    dest = tmp_path / 'Theme'
+    assert not convert(dest, zip_theme=True).success
+    assert not archive_path(dest, 'zip').exists()
+    assert not list(tmp_path.glob('*.part'))
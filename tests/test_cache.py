@@ -0,0 +1,100 @@
+import os
+
+from cc_logic.cache import ConversionCache
+from cc_logic.conversion import CursorConverter
+
+
+class Backend:
+    def __init__(self, name='fake', version='1', options=None):
+        self.name = name
+        self.version = version
+        self.options = options or {}
+
+
+def test_key_depends_on_content_backend_and_options():
+    cache = ConversionCache('unused')
+    key = cache.key(b'cursor', Backend())
+    assert key == cache.key(b'cursor', Backend())
+    assert key != cache.key(b'other', Backend())
+    assert key != cache.key(b'cursor', Backend(name='native'))
+    assert key != cache.key(b'cursor', Backend(version='2'))
+    assert key != cache.key(b'cursor', Backend(options={'scale': 2}))
+    assert key != cache.key(b'cursor', Backend(), {'size': 48})
+
+
+def test_fetch_returns_stored_output_and_counts_lookups(tmp_path):
+    cache = ConversionCache(tmp_path / 'cache')
+    output = tmp_path / 'out'
+    key = cache.key(b'cursor', Backend())
+
+    assert not cache.fetch(key, output)
+    output.write_bytes(b'converted')
+    cache.store(key, output)
+    output.unlink()
+    assert cache.fetch(key, output)
+    assert output.read_bytes() == b'converted'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_and_put_leave_hit_counts_alone(tmp_path):
+    cache = ConversionCache(tmp_path / 'cache')
+    assert cache.get('ab' * 32) is None
+    cache.put('ab' * 32, b'size variant')
+    assert cache.get('ab' * 32) == b'size variant'
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    cache = ConversionCache(tmp_path / 'cache', max_size=250)
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.put(key, b'x' * 100)
+        # Oldest first: keys[0] was used longest ago.
+        os.utime(cache._entry_path(key), (1000 + age, 1000 + age))
+
+    assert cache.evict() == 2
+    assert [cache.get(key) is not None for key in keys] == [False, False, True, True]
+
+
+def test_fetch_refreshes_entry_for_eviction(tmp_path):
+    cache = ConversionCache(tmp_path / 'cache', max_size=150)
+    old, new = 'aa' * 32, 'bb' * 32
+    cache.put(old, b'x' * 100)
+    cache.put(new, b'y' * 100)
+    os.utime(cache._entry_path(old), (1000, 1000))
+    os.utime(cache._entry_path(new), (2000, 2000))
+
+    assert cache.fetch(old, tmp_path / 'out')
+    cache.evict()
+    assert cache.get(old) is not None
+    assert cache.get(new) is None
+
+
+def test_converter_reuses_cached_results(tmp_path, source_dir, backend):
+    cache = ConversionCache(tmp_path / 'cache')
+    first = tmp_path / 'first'
+    second = tmp_path / 'second'
+    first.mkdir()
+    second.mkdir()
+
+    CursorConverter(backend, 2, cache).convert_files(source_dir, first)
+    assert len(backend.converted) == len(CursorConverter.FILES)
+    backend.converted.clear()
+
+    CursorConverter(backend, 2, cache).convert_files(source_dir, second)
+    assert backend.converted == []
+    assert cache.hits == len(CursorConverter.FILES)
+    for name in CursorConverter.FILES:
+        assert (second / name).read_bytes() == (first / name).read_bytes()
+
+
+def test_changed_source_misses_cache(tmp_path, source_dir, backend):
+    cache = ConversionCache(tmp_path / 'cache')
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    CursorConverter(backend, 2, cache).convert_files(source_dir, dest)
+    backend.converted.clear()
+
+    (source_dir / 'Move.cur').write_bytes(b'edited')
+    CursorConverter(backend, 2, cache).convert_files(source_dir, dest)
+    assert backend.converted == ['Move']
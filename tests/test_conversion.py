@@ -0,0 +1,38 @@
+import time
+
+from cc_logic.conversion import CursorConverter
+
+
+def test_failed_cursor_is_reported_once(tmp_path, convert, source_dir):
+    (source_dir / 'Move.cur').write_bytes(b'bad cursor')
+    run = convert(tmp_path / 'Theme')
+    assert not run.success
+    failures = [m for m in run.messages if 'Move.cur' in m and 'fail' in m.lower()]
+    assert failures == ["Conversion failed for Move.cur: cannot convert Move.cur"]
+    assert not any(m.startswith("An unexpected error occurred") for m in run.messages)
+    assert run.messages[-1].startswith("Conversion failed.")
+
+
+def test_cursors_finishing_after_a_failure_are_kept_for_resume(tmp_path, convert, backend, source_dir):
+    failing = CursorConverter.FILES[0]
+    (source_dir / f"{failing}.cur").write_bytes(b'bad cursor')
+    fast_convert = backend.convert
+
+    def slow_convert(input_file, output_file):
+        # The other cursors are still running when the failure is reported.
+        if input_file.stem != failing:
+            time.sleep(0.05)
+        fast_convert(input_file, output_file)
+
+    backend.convert = slow_convert
+    dest = tmp_path / 'Theme'
+    assert not convert(dest).success
+    finished = set(backend.converted) - {failing}
+    assert finished
+    cursors = dest / 'cursors'
+    expected = {f"{name.lower()}{suffix}" for name in finished for suffix in ('', '-a', '-b')}
+    assert {path.name for path in cursors.iterdir()} == expected
+
+    (source_dir / f"{failing}.cur").write_bytes(b'fixed cursor')
+    assert convert(dest).success
+    assert set(backend.converted) == set(CursorConverter.FILES) - finished
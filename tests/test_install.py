@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+import pytest
+from PyQt6.QtCore import Qt
+
+from cc_logic import utilities
+from cc_logic.utilities import Utilities
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    return tmp_path / 'home'
+
+
+def build_theme(path, pointer=b'pointer'):
+    (path / 'cursors').mkdir(parents=True, exist_ok=True)
+    (path / 'index.theme').write_text('[Icon Theme]\nName=Theme\n')
+    (path / 'cursors' / 'left_ptr').write_bytes(pointer)
+    (path / 'cursors' / 'text').write_bytes(b'text')
+    if not (path / 'cursors' / 'arrow').is_symlink():
+        os.symlink('left_ptr', path / 'cursors' / 'arrow')
+    return path
+
+
+def install(dest_dir):
+    messages = []
+    tools = Utilities()
+    tools.status_update.connect(messages.append)
+    return tools.install_theme(dest_dir), messages
+
+
+def hidden_entries(icons_dir):
+    return sorted(path.name for path in icons_dir.iterdir() if path.name.startswith('.'))
+
+
+def test_install_copies_theme_and_reuses_unchanged_files(tmp_path, home):
+    theme = build_theme(tmp_path / 'Theme')
+    assert install(theme)[0]
+    target = home / '.icons' / 'Theme'
+    assert (target / 'cursors' / 'left_ptr').read_bytes() == b'pointer'
+    assert os.readlink(target / 'cursors' / 'arrow') == 'left_ptr'
+    text_inode = os.stat(target / 'cursors' / 'text').st_ino
+
+    ok, messages = install(theme)
+    assert ok
+    assert messages[-1] == f"Installed theme at {target} is already up to date."
+
+    build_theme(theme, pointer=b'new pointer')
+    ok, messages = install(theme)
+    assert ok
+    assert "(2 unchanged file(s) reused" in messages[-1]
+    assert (target / 'cursors' / 'left_ptr').read_bytes() == b'new pointer'
+    assert os.stat(target / 'cursors' / 'text').st_ino == text_inode
+    assert not any(name.startswith('.Theme.ccpy-') and not name.endswith('-lock')
+                   for name in hidden_entries(home / '.icons'))
+
+
+def test_install_removes_leftovers_of_the_same_theme_only(tmp_path, home):
+    icons_dir = home / '.icons'
+    for name in ('.Theme.ccpy-staging-abcd1234', '.Theme.ccpy-old-abcd1234', '.Th[e]me.ccpy-staging-abcd1234',
+                 '.Theme.ccpy-staging-abcd1234.ccpy-staging-abcd1234'):
+        (icons_dir / name).mkdir(parents=True)
+
+    assert install(build_theme(tmp_path / 'Th[e]me'))[0]
+    assert '.Th[e]me.ccpy-staging-abcd1234' not in hidden_entries(icons_dir)
+    assert '.Theme.ccpy-staging-abcd1234' in hidden_entries(icons_dir)
+
+    assert install(build_theme(tmp_path / 'Theme'))[0]
+    assert hidden_entries(icons_dir) == ['.Th[e]me.ccpy-lock', '.Theme.ccpy-lock',
+                                         '.Theme.ccpy-staging-abcd1234.ccpy-staging-abcd1234']
+
+
+def test_without_locks_only_old_leftovers_are_removed(tmp_path, home, monkeypatch):
+    monkeypatch.setattr(utilities, 'fcntl', None)
+    icons_dir = home / '.icons'
+    old = icons_dir / '.Theme.ccpy-staging-old00000'
+    recent = icons_dir / '.Theme.ccpy-staging-new00000'
+    old.mkdir(parents=True)
+    recent.mkdir()
+    an_hour_too_old = time.time() - Utilities.STALE_LEFTOVER_AGE - 3600
+    os.utime(old, (an_hour_too_old, an_hour_too_old))
+
+    assert install(build_theme(tmp_path / 'Theme'))[0]
+    assert not old.exists()
+    assert recent.exists()
+
+
+def test_install_waits_for_a_running_install(tmp_path, home):
+    fcntl = pytest.importorskip('fcntl')
+    icons_dir = home / '.icons'
+    staging = icons_dir / '.Theme.ccpy-staging-running0'
+    staging.mkdir(parents=True)
+    theme = build_theme(tmp_path / 'Theme')
+
+    waiting = threading.Event()
+    tools = Utilities()
+    # Delivered on the installing thread, as there is no event loop here.
+    tools.status_update.connect(lambda message: message.startswith('Waiting') and waiting.set(),
+                                Qt.ConnectionType.DirectConnection)
+    result = []
+    with open(icons_dir / '.Theme.ccpy-lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        thread = threading.Thread(target=lambda: result.append(tools.install_theme(theme)))
+        thread.start()
+        assert waiting.wait(5)
+        # The staging directory belongs to the install holding the lock.
+        assert staging.exists()
+        assert not (icons_dir / 'Theme').exists()
+    thread.join(5)
+    assert result == [True]
+    assert (icons_dir / 'Theme' / 'index.theme').exists()
@@ -0,0 +1,106 @@
+import os
+import stat
+
+from cc_logic.conversion import CursorConverter
+from cc_logic.manifest import BuildManifest
+
+
+def manifest_for(tmp_path, converter='fake:1', link_strategy='symlink', **sources):
+    """Records a manifest for source files with the given contents."""
+    source_dir = tmp_path / 'sources'
+    source_dir.mkdir(exist_ok=True)
+    paths = {}
+    for name, content in sources.items():
+        paths[name] = source_dir / f"{name}.cur"
+        paths[name].write_bytes(content)
+    map_file = tmp_path / 'map.json'
+    map_file.write_text('{}')
+    manifest = BuildManifest()
+    manifest.record_inputs(converter, map_file, {name: name.lower() for name in sources}, link_strategy, paths)
+    return manifest
+
+
+def test_save_and_load_round_trip(tmp_path):
+    manifest = manifest_for(tmp_path, Normal=b'a')
+    manifest.stages['archive'] = 'digest'
+    manifest.save(tmp_path)
+    assert BuildManifest.load(tmp_path).data == manifest.data
+    assert not list(tmp_path.glob('.tmp-manifest-*'))
+
+
+def test_load_ignores_missing_corrupt_and_foreign_files(tmp_path):
+    empty = BuildManifest().data
+    assert BuildManifest.load(tmp_path).data == empty
+    (tmp_path / BuildManifest.FILENAME).write_text('{not json')
+    assert BuildManifest.load(tmp_path).data == empty
+    (tmp_path / BuildManifest.FILENAME).write_text('{"format": 99}')
+    assert BuildManifest.load(tmp_path).data == empty
+
+
+def test_saved_files_get_the_same_mode_as_other_theme_files(tmp_path):
+    (tmp_path / 'index.theme').write_text('[Icon Theme]\n')
+    BuildManifest().save(tmp_path)
+    BuildManifest().save(tmp_path, BuildManifest.CHECKPOINT_FILENAME)
+    expected = stat.S_IMODE(os.stat(tmp_path / 'index.theme').st_mode)
+    for filename in (BuildManifest.FILENAME, BuildManifest.CHECKPOINT_FILENAME):
+        assert stat.S_IMODE(os.stat(tmp_path / filename).st_mode) == expected
+
+
+def test_stale_cursors_follow_source_hashes(tmp_path):
+    cursor_dir = tmp_path / 'cursors'
+    cursor_dir.mkdir()
+    for name in ('normal', 'text'):
+        (cursor_dir / name).write_bytes(b'converted')
+    previous = manifest_for(tmp_path, Normal=b'a', Text=b'b')
+
+    assert previous.stale_cursors(manifest_for(tmp_path, Normal=b'a', Text=b'b'), cursor_dir) == []
+    assert previous.stale_cursors(manifest_for(tmp_path, Normal=b'a', Text=b'changed'), cursor_dir) == ['Text']
+    assert previous.stale_cursors(manifest_for(tmp_path, Normal=b'a', Text=b'b', Move=b'c'), cursor_dir) == ['Move']
+
+
+def test_missing_output_is_stale(tmp_path):
+    cursor_dir = tmp_path / 'cursors'
+    cursor_dir.mkdir()
+    (cursor_dir / 'normal').write_bytes(b'converted')
+    previous = manifest_for(tmp_path, Normal=b'a', Text=b'b')
+    assert previous.stale_cursors(manifest_for(tmp_path, Normal=b'a', Text=b'b'), cursor_dir) == ['Text']
+
+
+def test_converter_change_makes_everything_stale_but_link_strategy_does_not(tmp_path):
+    cursor_dir = tmp_path / 'cursors'
+    cursor_dir.mkdir()
+    for name in ('normal', 'text'):
+        (cursor_dir / name).write_bytes(b'converted')
+    previous = manifest_for(tmp_path, Normal=b'a', Text=b'b')
+
+    other_converter = manifest_for(tmp_path, converter='native:1', Normal=b'a', Text=b'b')
+    assert sorted(previous.stale_cursors(other_converter, cursor_dir)) == ['Normal', 'Text']
+    other_strategy = manifest_for(tmp_path, link_strategy='copy', Normal=b'a', Text=b'b')
+    assert previous.stale_cursors(other_strategy, cursor_dir) == []
+
+
+def test_incremental_run_converts_only_changed_cursors(tmp_path, convert, backend, source_dir):
+    dest = tmp_path / 'Theme'
+    assert convert(dest, incremental=True).success
+    assert sorted(backend.converted) == sorted(CursorConverter.FILES)
+
+    run = convert(dest, incremental=True)
+    assert run.success
+    assert backend.converted == []
+    assert "All converted cursors are up to date." in run.messages
+
+    (source_dir / 'Text.cur').write_bytes(b'edited')
+    assert convert(dest, incremental=True).success
+    assert backend.converted == ['Text']
+
+
+def test_link_strategy_change_relinks_without_converting(tmp_path, convert, backend):
+    dest = tmp_path / 'Theme'
+    assert convert(dest, incremental=True).success
+    assert (dest / 'cursors' / 'text-a').is_symlink()
+
+    assert convert(dest, incremental=True, link_strategy='hardlink').success
+    assert backend.converted == []
+    alias = dest / 'cursors' / 'text-a'
+    assert not alias.is_symlink()
+    assert os.path.samefile(alias, dest / 'cursors' / 'text')
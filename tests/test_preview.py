@@ -0,0 +1,72 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from cc_logic.backends import NativeBackend
+from cc_logic.preview import PreviewDecoder
+
+import cursor_samples
+
+VALID = cursor_samples.valid_samples()
+MALFORMED = cursor_samples.malformed_samples()
+
+
+def process(decoder, *paths):
+    """Serves requests for the first step of each path; returns the frames and the failures."""
+    frames, failures = {}, {}
+    decoder.frame_ready.connect(lambda path, step, frame: frames.__setitem__(path, frame))
+    decoder.failed.connect(lambda path, message: failures.__setitem__(path, message))
+    for path in paths:
+        decoder.request(path)
+    decoder.process()
+    return frames, failures
+
+
+@pytest.mark.parametrize('name', sorted(VALID))
+def test_valid_samples_preview(name):
+    path = str(cursor_samples.CORPUS_DIR / name)
+    frames, failures = process(PreviewDecoder(size=8), path)
+    assert failures == {}
+    frame = frames[path]
+    assert frame.frame_count == len(VALID[name][1])
+    # Thumbnails are scaled by nominal size, which is the image width.
+    assert frame.pixels.shape[1] <= 8
+
+
+def test_malformed_samples_fail_only_their_own_item():
+    paths = [str(cursor_samples.CORPUS_DIR / name) for name in sorted(MALFORMED)]
+    valid = str(cursor_samples.CORPUS_DIR / 'ok-sequence.ani')
+    frames, failures = process(PreviewDecoder(), *paths, valid)
+    assert sorted(failures) == sorted(paths)
+    assert list(frames) == [valid]
+
+
+def test_unexpected_errors_fail_only_their_own_item(monkeypatch):
+    decoder = PreviewDecoder()
+    decode = decoder.decode
+
+    def flaky_decode(path, step=0):
+        if path.endswith('ok-1bit.cur'):
+            raise ZeroDivisionError('integer division or modulo by zero')
+        return decode(path, step)
+
+    monkeypatch.setattr(decoder, 'decode', flaky_decode)
+    broken, valid = (str(cursor_samples.CORPUS_DIR / name) for name in ('ok-1bit.cur', 'ok-8bit.cur'))
+    frames, failures = process(decoder, broken, valid)
+    assert failures == {broken: 'integer division or modulo by zero'}
+    assert list(frames) == [valid]
+
+
+def test_later_steps_wrap_around_and_converted_cursors_preview(tmp_path):
+    source = tmp_path / 'busy.ani'
+    shutil.copy(cursor_samples.CORPUS_DIR / 'ok-sequence.ani', source)
+    converted = tmp_path / 'busy'
+    NativeBackend().convert(source, converted)
+
+    decoder = PreviewDecoder(size=8)
+    steps = len(VALID['ok-sequence.ani'][1])
+    for path in (source, converted):
+        first, wrapped = decoder.decode(str(path), 0), decoder.decode(str(path), steps)
+        np.testing.assert_array_equal(first.pixels, wrapped.pixels)
+        assert first.frame_count == steps
@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+from cc_logic.service import ConversionService, RemoteConverterLogic, ServiceError
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """A service whose jobs do nothing, so submitted parameters can be inspected."""
+    monkeypatch.setattr(ConversionService, '_run', lambda self, job: None)
+    service = ConversionService(max_jobs=1, max_workers=1)
+    yield service
+    service.shutdown()
+
+
+def job(tmp_path, **options):
+    return dict(options, source_path=str(tmp_path / 'source'), destination_path=str(tmp_path / 'dest'))
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'sizes': 'abc'}, "invalid size list"),
+    ({'sizes': [32, 'x']}, "list of integers"),
+    ({'sizes': [0]}, "between 1 and 512"),
+    ({'sizes': {'a': 1}}, "list of integers"),
+    ({'incremental': 'yes'}, "'incremental' must be true or false"),
+    ({'backend': 'magic'}, "unknown backend"),
+    ({'link_strategy': 'reflink'}, "unknown link strategy"),
+    ({'archive_format': 'rar'}, "unknown archive format"),
+    ({'compression_level': 10}, "between 0 and 9"),
+    ({'archive_format': 'tar.xz', 'compression_level': '5'}, "between 0 and 9"),
+    ({'compression_workers': 0}, "at least 1"),
+    ({'map_file_path': 5}, "'map_file_path' must be a string"),
+    ({'trace_path': '/tmp/trace'}, "unknown job option(s): trace_path"),
+])
+def test_invalid_options_are_rejected_at_submit(tmp_path, service, options, error):
+    with pytest.raises(ServiceError, match=re.escape(error)):
+        service.handle({'op': 'submit', 'job': job(tmp_path, **options)})
+    assert service.jobs == {}
+
+
+def test_sizes_are_normalized(tmp_path, service):
+    first = service.submit(job(tmp_path, sizes=[64, 32, 64]))
+    second = service.submit(job(tmp_path, sizes='48, 24'))
+    assert first.params['sizes'] == [32, 64]
+    assert second.params['sizes'] == [24, 48]
+
+
+def test_job_is_listed_only_once_it_has_a_future(tmp_path, service):
+    submit = service.job_pool.submit
+    seen = []
+
+    def checking_submit(fn, job):
+        seen.append(job.id in service.jobs)
+        return submit(fn, job)
+
+    service.job_pool.submit = checking_submit
+    job_id = service.handle({'op': 'submit', 'job': job(tmp_path)})['id']
+    assert seen == [False]
+    assert service.get(job_id).future is not None
+    assert service.handle({'op': 'cancel', 'id': job_id})['ok']
+
+
+def test_remote_logic_forwards_job_options_and_rejects_local_ones():
+    logic = RemoteConverterLogic('/nonexistent/service.sock')
+    logic.set_conversion_parameters('/themes/a', '/out/a', None, False, True, refresh_environment=True,
+                                    archive_format='tar.gz')
+    assert logic.job['refresh_environment'] is True
+    assert logic.job['archive_format'] == 'tar.gz'
+    with pytest.raises(ServiceError, match='trace_path'):
+        logic.set_conversion_parameters('/themes/a', '/out/a', None, False, False, trace_path='trace.json')
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from cc_logic import xcursor
+from cc_logic.backends import ConversionError, NativeBackend
+
+import cursor_samples
+
+VALID = cursor_samples.valid_samples()
+MALFORMED = cursor_samples.malformed_samples()
+
+
+def decode_all(blob):
+    """Parses and decodes every frame, as NativeBackend and the preview do."""
+    cursor = xcursor.open_cursor(blob)
+    return [(frame.delay, [(image.pixels, image.hotspot) for image in frame]) for frame in cursor.frames()]
+
+
+def test_corpus_is_up_to_date():
+    expected = {name: data for name, (data, _) in VALID.items()}
+    expected.update(MALFORMED)
+    found = {path.name: path.read_bytes() for path in cursor_samples.CORPUS_DIR.iterdir()}
+    assert found == expected, "run `python tests/cursor_samples.py` to regenerate tests/corpus"
+
+
+@pytest.mark.parametrize('name', sorted(VALID))
+def test_valid_sample_decodes_to_known_pixels(name):
+    blob, expected = VALID[name]
+    frames = decode_all((cursor_samples.CORPUS_DIR / name).read_bytes())
+    assert len(frames) == len(expected)
+    for (delay, images), (expected_delay, expected_images) in zip(frames, expected):
+        assert delay == pytest.approx(expected_delay)
+        assert len(images) == len(expected_images)
+        for (pixels, hotspot), (expected_pixels, expected_hotspot) in zip(images, expected_images):
+            assert hotspot == expected_hotspot
+            np.testing.assert_array_equal(pixels, expected_pixels)
+
+
+@pytest.mark.parametrize('name', sorted(MALFORMED))
+def test_malformed_sample_is_rejected(name):
+    with pytest.raises(xcursor.CursorFormatError):
+        decode_all((cursor_samples.CORPUS_DIR / name).read_bytes())
+
+
+@pytest.mark.parametrize('name', ['ok-32bit.cur', 'ok-8bit.cur', 'ok-png-rgba.cur', 'ok-sequence.ani'])
+def test_every_truncation_decodes_or_is_rejected(name):
+    blob, _ = VALID[name]
+    for length in range(len(blob)):
+        try:
+            frames = decode_all(memoryview(blob)[:length])
+        except xcursor.CursorFormatError:
+            continue
+        assert frames and all(images for _, images in frames)
+
+
+@pytest.mark.parametrize('name', ['bad-no-entries.cur', 'bad-empty-sequence.ani', 'bad-frame-no-entries.ani'])
+def test_native_backend_writes_nothing_for_empty_cursors(tmp_path, name):
+    source = cursor_samples.CORPUS_DIR / name
+    output = tmp_path / 'out'
+    with pytest.raises(ConversionError):
+        NativeBackend().convert(source, output)
+    assert not output.exists()
+
+
+def test_native_backend_hands_unreadable_files_to_fallback(tmp_path, backend):
+    output = tmp_path / 'out'
+    NativeBackend(fallback=backend).convert(cursor_samples.CORPUS_DIR / 'bad-truncated-dir.cur', output)
+    assert backend.converted == ['bad-truncated-dir']
+    assert output.exists()
+
+
+def test_native_output_round_trips_through_read_xcursor(tmp_path):
+    output = tmp_path / 'out'
+    NativeBackend().convert(cursor_samples.CORPUS_DIR / 'ok-sequence.ani', output)
+    images = xcursor.read_xcursor(output.read_bytes())
+    _, expected = VALID['ok-sequence.ani']
+    assert [image['delay'] for image in images] == [int(delay * 1000) for delay, _ in expected]
+    for image, (_, [(pixels, hotspot)]) in zip(images, expected):
+        assert image['hotspot'] == hotspot
+        np.testing.assert_array_equal(image['pixels'], xcursor.premultiply_alpha(pixels))
+
+
+def test_truncated_xcursor_is_rejected(tmp_path):
+    output = tmp_path / 'out'
+    NativeBackend().convert(cursor_samples.CORPUS_DIR / 'ok-32bit.cur', output)
+    data = output.read_bytes()
+    for length in (0, 10, 20, len(data) - 1):
+        with pytest.raises(xcursor.CursorFormatError):
+            xcursor.read_xcursor(data[:length])
+
+
+def test_images_for_size_resamples_nearest_larger_size():
+    images = [{'nominal': n, 'hotspot': (n // 2, 0), 'delay': 0, 'pixels': np.zeros((n, n, 4), np.uint8)}
+              for n in (16, 64)]
+    assert xcursor.images_for_size(images, 16) == []
+    [resampled] = xcursor.images_for_size(images, 32)
+    assert resampled['nominal'] == 32
+    assert resampled['pixels'].shape == (32, 32, 4)
+    assert resampled['hotspot'] == (16, 0)
+
+
+def test_images_for_size_rejects_empty_cursor():
+    with pytest.raises(xcursor.CursorFormatError):
+        xcursor.images_for_size([], 32)
+
+
+def test_merge_duplicate_frames_adds_up_delays():
+    def frame(value, delay):
+        return {'nominal': 4, 'hotspot': (0, 0), 'delay': delay, 'pixels': np.full((4, 4, 4), value, np.uint8)}
+
+    merged = xcursor.merge_duplicate_frames([frame(1, 50), frame(1, 50), frame(2, 30), frame(1, 20)])
+    assert [(image['pixels'][0, 0, 0], image['delay']) for image in merged] == [(1, 100), (2, 30), (1, 20)]